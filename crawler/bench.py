@@ -0,0 +1,569 @@
+# bench.py
+# Benchmark the crawl strategies against a generated website served from
+# localhost, so runs are repeatable and can be compared over time.
+#
+# Usage:
+#   python bench.py                                    # BFS, BestFirst, adaptive
+#   python bench.py --fanout 8 --depth 3 --latency-ms 50 --js-ratio 0.2
+#   python bench.py --rate-429 0.05 --rate-403 0.02 --crawl-depth 1 2 3
+#   python bench.py --modes bfs bestfirst -o bench-new.json --compare bench-old.json
+#   python bench.py --assets 12 --block-profiles off layout-safe text-only
+#   python bench.py --waits smart fixed --js-ratio 0.3
+#   python bench.py --modes bestfirst --scoring learned keyword -m 100
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+TOPICS = ["pricing", "docs", "blog", "careers", "support", "product", "about", "news"]
+VOCAB = (
+    "crawler page content market price plan team guide release update feature "
+    "account billing customer service order shipping return policy contact api "
+    "reference tutorial install config example support question answer product"
+).split()
+MODES = ("bfs", "bestfirst", "adaptive")
+
+
+class SyntheticSite:
+    """
+    A tree-shaped website generated on the fly and served on 127.0.0.1.
+
+    Every page below the root lives at /<topic>/<i>-<j>-...; depth is the
+    number of indices, and pages above `depth` link to `fanout` children
+    plus the home page. Topics, texts and which pages are JS-rendered or
+    answer 403 are derived from `seed`, so the same arguments always serve
+    the same site. 429s are drawn per request (with Retry-After), and every
+    response is delayed by `latency_ms`. The root never fails. With
+    `assets`, every page also embeds that many images of `asset_bytes`
+    unique to the page (like product photos) plus a shared stylesheet and
+    web font, so resource blocking has something to save.
+    """
+
+    def __init__(
+        self,
+        fanout: int = 5,
+        depth: int = 3,
+        page_bytes: int = 4000,
+        latency_ms: float = 20.0,
+        js_ratio: float = 0.0,
+        rate_429: float = 0.0,
+        rate_403: float = 0.0,
+        seed: int = 0,
+        assets: int = 0,
+        asset_bytes: int = 30_000,
+    ):
+        self.fanout = fanout
+        self.depth = depth
+        self.page_bytes = page_bytes
+        self.latency_ms = latency_ms
+        self.js_ratio = js_ratio
+        self.rate_429 = rate_429
+        self.rate_403 = rate_403
+        self.seed = seed
+        self.assets = assets
+        self.asset_bytes = asset_bytes
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.by_status = Counter()
+        self.bytes_sent = 0
+        self.asset_requests = 0
+        self._server = None
+
+    def spec(self) -> dict:
+        return {
+            "fanout": self.fanout,
+            "depth": self.depth,
+            "page_bytes": self.page_bytes,
+            "latency_ms": self.latency_ms,
+            "js_ratio": self.js_ratio,
+            "rate_429": self.rate_429,
+            "rate_403": self.rate_403,
+            "seed": self.seed,
+            "assets": self.assets,
+            "asset_bytes": self.asset_bytes,
+            "pages": sum(self.fanout**d for d in range(self.depth + 1)),
+        }
+
+    # --- content ---
+    def _page_rng(self, ids) -> random.Random:
+        return random.Random(f"{self.seed}:{'-'.join(map(str, ids))}")
+
+    def topic(self, ids) -> str:
+        return self._page_rng(ids).choice(TOPICS) if ids else "home"
+
+    def path(self, ids) -> str:
+        return f"/{self.topic(ids)}/{'-'.join(map(str, ids))}" if ids else "/"
+
+    def savable(self, keywords, max_depth: int) -> int:
+        """Pages within `max_depth` whose URL has every keyword (what a crawl can save)."""
+        count, level = 0, [[]]
+        for _ in range(min(max_depth, self.depth)):
+            level = [[*ids, i] for ids in level for i in range(self.fanout)]
+            count += sum(all(k in self.path(ids) for k in keywords) for ids in level)
+        return count
+
+    def _parse(self, path: str):
+        """URL path -> page ids, or None if the site has no such page."""
+        if path in ("", "/"):
+            return []
+        parts = path.strip("/").split("/")
+        if len(parts) != 2:
+            return None
+        try:
+            ids = [int(i) for i in parts[1].split("-")]
+        except ValueError:
+            return None
+        if len(ids) > self.depth or any(not 0 <= i < self.fanout for i in ids):
+            return None
+        return ids if parts[0] == self.topic(ids) else None
+
+    def render(self, ids) -> tuple[int, str]:
+        """(status, html) for one page; 429s are decided by the server."""
+        rng = self._page_rng(ids)
+        if ids and rng.random() < self.rate_403:
+            return 403, "<html><body><h1>Forbidden</h1></body></html>"
+        topic = self.topic(ids)
+        title = f"{topic.title()} {'-'.join(map(str, ids)) or 'home'}"
+
+        paragraphs, size = [], 0
+        while size < self.page_bytes:
+            words = rng.choices(VOCAB, k=40)
+            words[rng.randrange(len(words))] = topic
+            text = " ".join(words).capitalize() + "."
+            paragraphs.append(f"<p>{text}</p>")
+            size += len(text) + 7
+        links = ['<a href="/">Home</a>']
+        if len(ids) < self.depth:
+            for i in range(self.fanout):
+                child = [*ids, i]
+                links.append(
+                    f'<a href="{self.path(child)}">{self.topic(child).title()} {i}</a>'
+                )
+        body = f"<h1>{title}</h1><nav>{' '.join(links)}</nav>{''.join(paragraphs)}"
+        head = f"<title>{title}</title>"
+        if self.assets:
+            slug = "-".join(map(str, ids)) or "home"
+            head += '<link rel="stylesheet" href="/assets/site.css">'
+            body += "".join(
+                f'<img src="/assets/{slug}/img-{k}.jpg" width="300" height="200" alt="">'
+                for k in range(self.assets)
+            )
+
+        if rng.random() < self.js_ratio:
+            # Nothing useful without JavaScript
+            data = json.dumps({"html": body}).replace("</", "<\\/")
+            body = (
+                '<div id="app">Loading...</div><script>'
+                f"document.getElementById('app').innerHTML = {data}.html;"
+                "</script>"
+            )
+        return 200, f"<html><head>{head}</head><body>{body}</body></html>"
+
+    def asset(self, path: str):
+        """(content type, body) of an embedded resource, or None."""
+        if path == "/assets/site.css":
+            css = (
+                '@font-face{font-family:Bench;src:url("/assets/bench.woff2")}'
+                "body{font-family:Bench,sans-serif}"
+            )
+            return "text/css", css.encode()
+        if path == "/assets/bench.woff2":
+            return "font/woff2", bytes(self.asset_bytes)
+        if path.endswith(".jpg"):
+            return "image/jpeg", bytes(self.asset_bytes)
+        return None
+
+    # --- server ---
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        path = urlsplit(handler.path).path
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        asset = self.asset(path) if path.startswith("/assets/") else None
+        if path == "/robots.txt":
+            status, body = 200, "User-agent: *\nAllow: /\n"
+            headers["Content-Type"] = "text/plain"
+        elif asset is not None:
+            status, body = 200, None
+            headers["Content-Type"] = asset[0]
+        else:
+            ids = self._parse(path)
+            with self._lock:
+                throttled = bool(ids) and self._rng.random() < self.rate_429
+            if ids is None:
+                status, body = 404, "<html><body>Not found</body></html>"
+            elif throttled:
+                status, body = 429, "<html><body>Too many requests</body></html>"
+                headers["Retry-After"] = "1"
+            else:
+                status, body = self.render(ids)
+
+        payload = asset[1] if asset is not None else body.encode("utf-8")
+        handler.send_response(status)
+        for k, v in headers.items():
+            handler.send_header(k, v)
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+        with self._lock:
+            self.requests += 1
+            self.by_status[status] += 1
+            self.bytes_sent += len(payload)
+            self.asset_requests += asset is not None
+
+    def start(self, port: int = 0) -> str:
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.by_status = Counter()
+            self.bytes_sent = 0
+            self.asset_requests = 0
+
+    def counters(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "by_status": {str(k): v for k, v in sorted(self.by_status.items())},
+                "bytes_sent": self.bytes_sent,
+                "asset_requests": self.asset_requests,
+            }
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ==============================
+# One benchmark run (child process)
+# ==============================
+
+
+def _usage() -> dict:
+    """CPU seconds and peak RSS (MB) of this process and its reaped children."""
+    if resource is None:
+        return {"cpu_sec": time.process_time()}
+    scale = 1 / 1024**2 if sys.platform == "darwin" else 1 / 1024  # bytes vs KB
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "cpu_sec": own.ru_utime + own.ru_stime,
+        "peak_rss_mb": own.ru_maxrss * scale,
+        # Playwright driver + Chromium, once the browser has exited
+        "browser_cpu_sec": kids.ru_utime + kids.ru_stime,
+        "browser_peak_rss_mb": kids.ru_maxrss * scale,
+    }
+
+
+async def _run_adaptive(cs, seed, query):
+    """crawl4ai's AdaptiveCrawler with Crawler's adaptive config; pages saved as usual."""
+    from crawl4ai import AdaptiveCrawler, AsyncWebCrawler
+
+    inst = cs.Crawler(seed)
+    inst.enabled_adaptive_strategy = True
+    config = inst.get_adaptive_config()
+    config.max_pages = min(config.max_pages, cs.MAX_PAGES)
+    async with AsyncWebCrawler(config=cs.Crawler.get_browser_config()) as crawler:
+        state = await AdaptiveCrawler(crawler, config).digest(
+            start_url=seed["url"], query=query
+        )
+    with open(seed["jsonl_path"], "a", encoding="utf-8") as jf:
+        for r in getattr(state, "knowledge_base", None) or []:
+            inst.track(r)
+            inst.save_result(jf, r)
+    return {"seeds": 1, "written": inst.written, "fetched": inst.fetched}
+
+
+def _bench_child(mode, url, settings, workdir, queue):
+    os.chdir(workdir)  # state files, metrics.json and output stay in here
+    import crawl_seeded as cs
+    import helper
+    from config import Mode
+
+    helper.DATAPATH_BASE = Path(workdir) / "scraped"
+    for k, v in settings.items():
+        setattr(cs, k, v)
+    cs.STRATEGY = Mode.BFS_STRATEGY if mode == "bfs" else Mode.BESTFIRST_STRATEGY
+    cs.configure_logger()
+    seed = helper.initialize_single_url(url, suffix="")
+
+    error = None
+    totals = {"written": 0, "fetched": 0}
+    t0 = time.perf_counter()
+    try:
+        if mode == "adaptive":
+            totals = asyncio.run(_run_adaptive(cs, seed, " ".join(cs.KEYWORDS)))
+        else:
+            totals = asyncio.run(cs.run_scraper([seed]))
+    except Exception as e:
+        error = repr(e)
+    wall = time.perf_counter() - t0
+    cs.logger.close()
+
+    saved = []
+    if seed["jsonl_path"].exists():
+        with open(seed["jsonl_path"], encoding="utf-8") as f:
+            saved = [json.loads(line)["url"] for line in f if line.strip()]
+    stages, blocked = {}, {}
+    if cs.METRICS_FILE and Path(cs.METRICS_FILE).exists():
+        snap = json.loads(Path(cs.METRICS_FILE).read_text(encoding="utf-8"))
+        stages = {
+            name: {q: st[q] for q in ("count", "p50", "p95", "p99")}
+            for name, st in snap.get("stages", {}).items()
+            if st["count"]
+        }
+        blocked = snap.get("blocked", {})
+    queue.put(
+        {
+            "wall_sec": wall,
+            "pages_fetched": totals["fetched"],
+            "pages_saved": totals["written"],
+            "saved_urls": saved,
+            "stages": stages,
+            "blocked": blocked,
+            "error": error,
+            **_usage(),
+        }
+    )
+
+
+def run_mode(site: SyntheticSite, mode: str, settings: dict, keywords) -> dict:
+    """Run one mode in a fresh process (clean RSS/CPU counters) against `site`."""
+    site.reset_counters()
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    with tempfile.TemporaryDirectory(prefix=f"bench-{mode}-") as workdir:
+        proc = ctx.Process(
+            target=_bench_child, args=(mode, site.url, settings, workdir, queue)
+        )
+        proc.start()
+        try:
+            out = queue.get()
+        finally:
+            proc.join()
+
+    fetched, saved = out["pages_fetched"], out["pages_saved"]
+    if not out["error"] and saved <= 1 < site.savable(keywords, settings["MAX_DEPTH"]):
+        # e.g. keywords that no URL has all of: every number below is meaningless
+        out["error"] = f"saved {saved} of {fetched} fetched pages"
+    # /<topic>/<ids>: a saved page is relevant if its topic is a keyword
+    relevant = sum(
+        1 for u in out.pop("saved_urls") if urlsplit(u).path.split("/")[1] in keywords
+    )
+    return {
+        "mode": mode,
+        "max_depth": settings["MAX_DEPTH"],
+        "block": settings.get("BLOCK_PROFILE"),
+        "wait": "smart" if settings.get("SMART_WAIT", True) else "fixed",
+        "scoring": "learned" if settings.get("LEARNED_SCORING", True) else "keyword",
+        **out,
+        "pages_per_sec": round(fetched / out["wall_sec"], 3) if out["wall_sec"] else 0.0,
+        "saved_per_fetched": round(saved / fetched, 3) if fetched else 0.0,
+        "relevant_share": round(relevant / saved, 3) if saved else 0.0,
+        "server": site.counters(),
+    }
+
+
+# ==============================
+# Reporting
+# ==============================
+
+COMPARED = ("pages_per_sec", "saved_per_fetched", "cpu_sec", "peak_rss_mb", "wall_sec")
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    """Lines with the relative change of each COMPARED metric per mode/depth."""
+    key = lambda r: (r["mode"], r["max_depth"], r.get("block"), r.get("wait"), r.get("scoring"))
+    before = {key(r): r for r in old.get("runs", [])}
+    lines = []
+    for r in new["runs"]:
+        prev = before.get(key(r))
+        if not prev:
+            continue
+        deltas = []
+        for k in COMPARED:
+            a, b = prev.get(k), r.get(k)
+            if a and b is not None:
+                deltas.append(f"{k} {(b - a) / a:+.1%}")
+        lines.append(f"{_label(r)}: " + ", ".join(deltas))
+    return lines
+
+
+def _label(r: dict) -> str:
+    block = f" block={r['block']}" if r.get("block") else ""
+    wait = f" wait={r['wait']}" if r.get("wait") else ""
+    scoring = f" scoring={r['scoring']}" if r.get("scoring") and r["mode"] == "bestfirst" else ""
+    return f"{r['mode']:>9} d={r['max_depth']}{block}{wait}{scoring}"
+
+
+def _row(r: dict) -> str:
+    return (
+        f"{_label(r)}  {r['pages_fetched']:5d} fetched  "
+        f"{r['pages_saved']:5d} saved  {r['pages_per_sec']:7.2f} pages/s  "
+        f"saved/fetched {r['saved_per_fetched']:.2f}  relevant {r['relevant_share']:.2f}  "
+        f"cpu {r['cpu_sec']:.1f}s  rss {r.get('peak_rss_mb', 0):.0f}MB  "
+        f"server {r['server']['bytes_sent'] / 1048576:.1f}MB  "
+        f"render_wait p50 {r['stages'].get('render_wait', {}).get('p50', 0):.2f}s"
+        + (f"  ERROR {r['error']}" if r["error"] else "")
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark crawl strategies on a local synthetic site")
+    parser.add_argument("--fanout", help="Links to child pages per page", type=int, default=5)
+    parser.add_argument("--depth", help="Depth of the generated site", type=int, default=3)
+    parser.add_argument("--page-bytes", help="Approx. text per page", type=int, default=4000)
+    parser.add_argument("--latency-ms", help="Server delay per response", type=float, default=20.0)
+    parser.add_argument("--js-ratio", help="Share of pages rendered only by JavaScript", type=float, default=0.0)
+    parser.add_argument("--rate-429", help="Share of requests answered 429", type=float, default=0.0)
+    parser.add_argument("--rate-403", help="Share of pages that always answer 403", type=float, default=0.0)
+    parser.add_argument("--site-seed", help="Random seed of the generated site", type=int, default=0)
+    parser.add_argument("--assets", help="Images per page (plus a shared CSS file and font)", type=int, default=0)
+    parser.add_argument("--asset-bytes", help="Size of each image/font", type=int, default=30_000)
+    parser.add_argument("--modes", help="Strategies to run", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--crawl-depth", help="MAX_DEPTH values to run each mode at", type=int, nargs="+", default=[2])
+    parser.add_argument("-m", "--maxpages", help="MAX_PAGES per run", type=int, default=200)
+    parser.add_argument(
+        "--block-profiles",
+        help="BLOCK_PROFILE values to run each mode with (default: config)",
+        nargs="+",
+        choices=["off", "layout-safe", "text-only"],
+    )
+    parser.add_argument(
+        "--waits",
+        help="Page readiness to run each mode with: smart (SMART_WAIT) and/or fixed (1s + full scroll)",
+        nargs="+",
+        choices=["smart", "fixed"],
+    )
+    parser.add_argument(
+        "--scoring",
+        help="BestFirst link ranking to run with: learned (LEARNED_SCORING) and/or keyword",
+        nargs="+",
+        choices=["learned", "keyword"],
+    )
+    parser.add_argument(
+        "-k",
+        "--keywords",
+        help="KEYWORDS: links are ranked by them and a page is saved only if its URL has "
+        "every one (each page has a single topic, so pass one; none saves every page)",
+        nargs="*",
+        default=["pricing"],
+    )
+    parser.add_argument(
+        "--delay",
+        help="Per-host base delay (config pacing would dominate on localhost)",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument("-o", "--output", help="Results JSON (default bench-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    from config import BASE_CONCURRENCY, BLOCK_PROFILE, LEARNED_SCORING, SMART_WAIT
+
+    site = SyntheticSite(
+        fanout=args.fanout,
+        depth=args.depth,
+        page_bytes=args.page_bytes,
+        latency_ms=args.latency_ms,
+        js_ratio=args.js_ratio,
+        rate_429=args.rate_429,
+        rate_403=args.rate_403,
+        seed=args.site_seed,
+        assets=args.assets,
+        asset_bytes=args.asset_bytes,
+    )
+    base = {
+        "MAX_PAGES": args.maxpages,
+        "GLOBAL_MAX_PAGES": 0,
+        "KEYWORDS": args.keywords,
+        "BASE_DELAY_SEC": args.delay,
+        "DELAY_JITTER_MIN": 0.0,
+        "DELAY_JITTER_MAX": 0.0,
+        "SEARCH_INDEX": False,  # don't mix benchmark pages into scraped/_index
+        "LOG_LEVEL": "WARNING",
+    }
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "site": site.spec(),
+        "settings": {**base, "BASE_CONCURRENCY": BASE_CONCURRENCY},
+        "runs": [],
+    }
+    print(f"Site: {results['site']}")
+    if site.savable(args.keywords, max(args.crawl_depth)) <= 1:
+        parser.error(
+            f"no more than one page within --crawl-depth has every keyword of {args.keywords} "
+            f"in its URL; pass a single topic of {TOPICS}"
+        )
+    blocks = args.block_profiles or [BLOCK_PROFILE]
+    waits = args.waits or ["smart" if SMART_WAIT else "fixed"]
+    scorings = args.scoring or ["learned" if LEARNED_SCORING else "keyword"]
+    with site:
+        for depth, block, wait, mode in itertools.product(
+            args.crawl_depth, blocks, waits, args.modes
+        ):
+            # Scoring only changes BestFirst; other modes run once
+            for scoring in scorings if mode == "bestfirst" else scorings[:1]:
+                settings = {
+                    **base,
+                    "MAX_DEPTH": depth,
+                    "BLOCK_PROFILE": block,
+                    "SMART_WAIT": wait == "smart",
+                    "LEARNED_SCORING": scoring == "learned",
+                }
+                run = run_mode(site, mode, settings, args.keywords)
+                results["runs"].append(run)
+                print(_row(run))
+
+    out = Path(args.output or f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results: {out}")
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"Compared with {args.compare}:")
+        for line in compare(old, results):
+            print(line)
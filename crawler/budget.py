@@ -0,0 +1,138 @@
+# budget.py
+# Run-wide page budget shared by every Crawler (and every --workers process)
+
+import asyncio
+
+
+class PageBudget:
+    """
+    Caps the pages fetched by a whole job (GLOBAL_MAX_PAGES), not just per seed.
+
+    - `reserve(domain, n)` atomically grants up to `n` pages; 0 means stop
+    - per-domain sub-quotas (`domain_caps`) bound any single domain
+    - when the budget is tight, each active domain's grant is weighted by its
+      priority: it may take at most `remaining * w / sum(active w)` pages per
+      call (but always at least one while anything is left)
+    - reservations do not end the job: a batch reservation that takes the
+      last pages may be partly refunded, and the refunded pages go to the
+      next `reserve`. Deep crawls that reserve before each batch (their
+      `budget` is this one) simply get 0 once nothing is left
+    - the budget is `exhausted` (and every other registered crawl is shut
+      down and its task cancelled) only when a fetched page, counted with
+      `consume`, takes the last one; a later refund lifts the latch again
+
+    `shared_counter` (a multiprocessing.Value) makes the total global across
+    worker processes; caps and weights then apply within each process.
+    """
+
+    def __init__(
+        self,
+        total: int | None,
+        domain_caps: dict | None = None,
+        shared_counter=None,
+    ):
+        self.total = total or None  # None/0 -> unlimited
+        self.domain_caps = domain_caps or {}
+        self.shared = shared_counter
+        self._used = 0
+        self.used_by_domain: dict[str, int] = {}
+        self.weights: dict[str, float] = {}  # active domains only
+        self._running: dict[str, tuple] = {}  # key -> (domain, w, strategy, task)
+        self.exhausted = False
+        self.cancelled = 0
+
+    # --- accounting ---
+    @property
+    def used(self) -> int:
+        return self.shared.value if self.shared is not None else self._used
+
+    def remaining(self) -> float:
+        if self.total is None:
+            return float("inf")
+        return max(0, self.total - self.used)
+
+    def _grant(self, domain: str, n: int) -> int:
+        if self.total is not None:
+            left = self.remaining()
+            active = sum(self.weights.values()) or 1.0
+            share = int(left * self.weights.get(domain, 1.0) / active)
+            n = min(n, max(1, share), int(left))
+        cap = self.domain_caps.get(domain)
+        if cap is not None:
+            n = min(n, cap - self.used_by_domain.get(domain, 0))
+        return max(0, n)
+
+    def reserve(self, domain: str, n: int = 1) -> int:
+        """Grant up to `n` page fetches for `domain` (0 -> budget/quota spent)."""
+        if self.shared is not None:
+            with self.shared.get_lock():
+                granted = self._grant(domain, n)
+                self.shared.value += granted
+        else:
+            granted = self._grant(domain, n)
+            self._used += granted
+        if granted:
+            self.used_by_domain[domain] = self.used_by_domain.get(domain, 0) + granted
+        return granted
+
+    def consume(self, domain: str) -> bool:
+        """Count one fetched page; the one that spends the budget ends the job."""
+        if self.reserve(domain, 1) != 1:
+            return False
+        if self.total is not None and self.remaining() <= 0:
+            self._exhaust()
+        return True
+
+    def refund(self, domain: str, n: int):
+        """Give back reserved pages that were never fetched."""
+        if n <= 0:
+            return
+        if self.shared is not None:
+            with self.shared.get_lock():
+                self.shared.value -= n
+        else:
+            self._used -= n
+        self.used_by_domain[domain] = self.used_by_domain.get(domain, 0) - n
+        if self.exhausted and self.remaining() > 0:
+            self.exhausted = False  # pages are back: waiting seeds may use them
+
+    # --- running crawls ---
+    def register(self, key: str, domain: str, weight: float, strategy, task=None):
+        weight = weight if weight and weight > 0 else 1.0
+        self.weights[domain] = self.weights.get(domain, 0.0) + weight
+        self._running[key] = (domain, weight, strategy, task)
+
+    def unregister(self, key: str):
+        entry = self._running.pop(key, None)
+        if entry is None:
+            return
+        domain, weight = entry[0], entry[1]
+        left = self.weights.get(domain, 0.0) - weight
+        if left > 1e-9:
+            self.weights[domain] = left
+        else:
+            self.weights.pop(domain, None)
+
+    def _exhaust(self):
+        if self.exhausted:
+            return
+        self.exhausted = True
+        current = asyncio.current_task()
+        for _, _, strategy, task in list(self._running.values()):
+            if getattr(strategy, "budget", None) is self:
+                continue  # paid-for batch completes, next reserve() returns 0
+            shutdown = getattr(strategy, "shutdown", None)
+            if shutdown:
+                asyncio.ensure_future(shutdown())
+            if task is not None and task is not current and not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def stats(self) -> dict:
+        return {
+            "total": self.total,
+            "used": self.used,
+            "exhausted": self.exhausted,
+            "cancelled_crawls": self.cancelled,
+            "by_domain": dict(self.used_by_domain),
+        }
@@ -0,0 +1,340 @@
+# catalogue.py
+# Crawl catalogue: runs and per-seed counters in one SQLite file, kept up to
+# date while crawling so readers (the GUI) never scan scraped/.
+#
+# Usage:
+#   python catalogue.py                       # latest result per output directory
+#   python catalogue.py --runs                # recent runs with totals
+#   python catalogue.py -q shoes --status failed
+#   python catalogue.py --import scraped      # backfill directories crawled earlier
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT NOT NULL DEFAULT 'running',
+    pid INTEGER,
+    args TEXT,
+    settings TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS seeds (
+    run_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    out_dir TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    started REAL NOT NULL,
+    updated REAL NOT NULL,
+    finished REAL,
+    fetched INTEGER NOT NULL DEFAULT 0,
+    written INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    PRIMARY KEY (run_id, url)
+);
+CREATE INDEX IF NOT EXISTS seeds_out_dir ON seeds (out_dir, started);
+CREATE INDEX IF NOT EXISTS seeds_domain ON seeds (domain);
+"""
+
+COUNTERS = ("fetched", "written", "skipped", "bytes", "errors")
+
+
+def _page(page: int, per_page: int) -> tuple[int, int]:
+    page = max(1, int(page or 1))
+    per_page = max(1, min(int(per_page or 50), 500))
+    return page, per_page
+
+
+class Catalogue:
+    """
+    Several processes (--workers) may write the same file. Per-page counter
+    updates are only buffered in memory and flushed in one short
+    transaction every `commit_interval` seconds; starting and finishing
+    runs and seeds is written straight away.
+
+    One instance may be shared by threads (the GUI's request handlers):
+    every use of the connection holds `_lock`.
+    """
+
+    def __init__(self, path, commit_interval: float = 5.0, run_id: int | None = None):
+        self.path = str(path)
+        self.commit_interval = commit_interval
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        self.run_id = run_id
+        self._dirty = {}  # url -> counters not yet written
+        self._last_commit = time.monotonic()
+
+    # --- writer side ---
+    def start_run(self, args: str = "", settings: dict | None = None) -> int:
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (started, pid, args, settings) VALUES (?, ?, ?, ?)",
+                (time.time(), os.getpid(), args, json.dumps(settings or {}, default=str)),
+            )
+        self.run_id = cur.lastrowid
+        return self.run_id
+
+    def finish_run(self, status: str = "done", error: str | None = None):
+        self.commit()
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished = ?, status = ?, error = ? WHERE id = ?",
+                (now, status, error, self.run_id),
+            )
+            # Seeds interrupted with the run (Ctrl-C, GUI Stop)
+            self.conn.execute(
+                "UPDATE seeds SET status = ?, finished = ? "
+                "WHERE run_id = ? AND status = 'running'",
+                (status, now, self.run_id),
+            )
+
+    def start_seed(self, url: str, domain: str, out_dir):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO seeds (run_id, url, domain, out_dir, started, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_id, url, domain, str(Path(out_dir).resolve()), now, now),
+            )
+
+    def update_seed(self, url: str, **counters):
+        """Cheap: buffered until the next commit."""
+        with self._lock:
+            self._dirty[url] = counters
+        self.maybe_commit()
+
+    def finish_seed(self, url: str, status: str = "done", error: str | None = None, **counters):
+        now = time.time()
+        cols = "".join(f", {k} = ?" for k in counters if k in COUNTERS)
+        with self._lock, self.conn:
+            self._dirty.pop(url, None)
+            self.conn.execute(
+                f"UPDATE seeds SET status = ?, error = ?, updated = ?, finished = ?{cols} "
+                "WHERE run_id = ? AND url = ?",
+                (
+                    status,
+                    error,
+                    now,
+                    now,
+                    *(v for k, v in counters.items() if k in COUNTERS),
+                    self.run_id,
+                    url,
+                ),
+            )
+
+    def maybe_commit(self):
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self.commit()
+
+    def commit(self):
+        with self._lock:
+            if self._dirty:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE seeds SET fetched = ?, written = ?, skipped = ?, bytes = ?, "
+                        "errors = ?, updated = ? WHERE run_id = ? AND url = ?",
+                        (
+                            (*(c.get(k, 0) for k in COUNTERS), now, self.run_id, url)
+                            for url, c in self._dirty.items()
+                        ),
+                    )
+                self._dirty.clear()
+            self._last_commit = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self.conn.close()
+
+    # --- reader side ---
+    def runs(
+        self, page: int = 1, per_page: int = 20, status: str | None = None, run_id: int | None = None
+    ) -> dict:
+        """Runs, newest first, with totals summed over their seeds."""
+        page, per_page = _page(page, per_page)
+        clauses, params = [], []
+        if status:
+            clauses.append("r.status = ?")
+            params.append(status)
+        if run_id is not None:
+            clauses.append("r.id = ?")
+            params.append(run_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            total = self.conn.execute(
+                f"SELECT COUNT(*) FROM runs r {where}", params
+            ).fetchone()[0]
+            rows = self.conn.execute(
+                f"""
+                SELECT r.*, COUNT(s.url) AS seeds,
+                       COALESCE(SUM(s.fetched), 0) AS fetched,
+                       COALESCE(SUM(s.written), 0) AS written,
+                       COALESCE(SUM(s.skipped), 0) AS skipped,
+                       COALESCE(SUM(s.bytes), 0) AS bytes,
+                       COALESCE(SUM(s.errors), 0) AS errors,
+                       COALESCE(r.finished, MAX(s.updated), r.started) - r.started AS duration
+                FROM runs r LEFT JOIN seeds s ON s.run_id = r.id
+                {where}
+                GROUP BY r.id ORDER BY r.id DESC LIMIT ? OFFSET ?
+                """,
+                (*params, per_page, (page - 1) * per_page),
+            ).fetchall()
+        items = []
+        for row in rows:
+            item = dict(row)
+            item["settings"] = json.loads(item["settings"] or "{}")
+            item["duration"] = round(item["duration"] or 0.0, 1)
+            items.append(item)
+        return {"items": items, "total": total, "page": page, "per_page": per_page}
+
+    def run(self, run_id: int) -> dict | None:
+        """One run with its totals and every seed."""
+        with self._lock:
+            found = self.runs(run_id=run_id)["items"]
+            if not found:
+                return None
+            run = found[0]
+            run["seeds"] = self.seeds(run_id=run_id, latest=False, per_page=500)["items"]
+        return run
+
+    def seeds(
+        self,
+        page: int = 1,
+        per_page: int = 50,
+        q: str | None = None,
+        domain: str | None = None,
+        status: str | None = None,
+        run_id: int | None = None,
+        latest: bool = True,
+    ) -> dict:
+        """
+        Seed results, newest first. `latest` keeps only the most recent row
+        per output directory (what is on disk now); `q` matches the URL.
+        """
+        page, per_page = _page(page, per_page)
+        clauses, params = [], []
+        if q:
+            clauses.append("s.url LIKE ?")
+            params.append(f"%{q}%")
+        if domain:
+            clauses.append("s.domain = ?")
+            params.append(domain)
+        if status:
+            clauses.append("s.status = ?")
+            params.append(status)
+        if run_id is not None:
+            clauses.append("s.run_id = ?")
+            params.append(run_id)
+        if latest:
+            clauses.append(
+                "s.started = (SELECT MAX(started) FROM seeds l WHERE l.out_dir = s.out_dir)"
+            )
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            total = self.conn.execute(
+                f"SELECT COUNT(*) FROM seeds s {where}", params
+            ).fetchone()[0]
+            rows = self.conn.execute(
+                f"""
+                SELECT s.*, COALESCE(s.finished, s.updated) - s.started AS duration
+                FROM seeds s {where}
+                ORDER BY s.started DESC LIMIT ? OFFSET ?
+                """,
+                (*params, per_page, (page - 1) * per_page),
+            ).fetchall()
+        items = [{**dict(r), "duration": round(r["duration"] or 0.0, 1)} for r in rows]
+        return {"items": items, "total": total, "page": page, "per_page": per_page}
+
+    # --- backfill ---
+    def import_dirs(self, root) -> int:
+        """Add output directories crawled before the catalogue existed (one run)."""
+        root = Path(root)
+        with self._lock:
+            known = {r[0] for r in self.conn.execute("SELECT DISTINCT out_dir FROM seeds")}
+        dirs = [
+            d for d in sorted(root.iterdir())
+            if (d / "index.jsonl").exists() and str(d.resolve()) not in known
+        ]
+        if not dirs:
+            return 0
+        self.start_run(args="import", settings={"imported_from": str(root)})
+        for d in dirs:
+            jsonl = d / "index.jsonl"
+            with open(jsonl, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            url = records[0]["url"] if records else f"http://{d.name.replace('_single', '')}"
+            self.start_seed(url, d.name.replace("_single", ""), d)
+            errors = sum(1 for r in records if (r.get("status") or 0) >= 400)
+            self.finish_seed(
+                url, written=len(records), fetched=len(records), errors=errors,
+                bytes=sum(f.stat().st_size for f in d.rglob("*") if f.is_file()),
+            )
+            mtime = jsonl.stat().st_mtime
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "UPDATE seeds SET started = ?, updated = ?, finished = ? "
+                    "WHERE run_id = ? AND url = ?",
+                    (mtime, mtime, mtime, self.run_id, url),
+                )
+        self.finish_run()
+        return len(dirs)
+
+
+if __name__ == "__main__":
+    from config import CATALOGUE_DB
+
+    parser = argparse.ArgumentParser(description="Query the crawl catalogue")
+    parser.add_argument("--db", help="Catalogue file", default=CATALOGUE_DB)
+    parser.add_argument("--runs", help="List runs instead of seeds", action="store_true")
+    parser.add_argument("-q", help="Seed URL contains")
+    parser.add_argument("--domain", help="Seed domain")
+    parser.add_argument("--status", help="running, done, failed, cancelled, ...")
+    parser.add_argument("--run", help="Seeds of this run id", type=int)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--import", dest="import_root", help="Backfill from a scraped/ dir")
+    args = parser.parse_args()
+
+    cat = Catalogue(args.db)
+    if args.import_root:
+        print(f"Imported {cat.import_dirs(args.import_root)} directories")
+    if args.runs:
+        result = cat.runs(args.page, args.per_page, status=args.status)
+        for r in result["items"]:
+            print(
+                f"#{r['id']:<5} {time.strftime('%Y-%m-%d %H:%M', time.localtime(r['started']))} "
+                f"{r['status']:<9} {r['seeds']:4d} seeds {r['written']:6d}/{r['fetched']:<6d} pages "
+                f"{r['bytes'] / 1048576:8.1f} MB {r['errors']:5d} err {r['duration']:8.1f}s  {r['args'] or ''}"
+            )
+    else:
+        result = cat.seeds(
+            args.page, args.per_page, q=args.q, domain=args.domain,
+            status=args.status, run_id=args.run, latest=args.run is None,
+        )
+        for s in result["items"]:
+            print(
+                f"#{s['run_id']:<5} {s['status']:<9} {s['written']:6d}/{s['fetched']:<6d} pages "
+                f"{s['bytes'] / 1048576:8.1f} MB {s['errors']:5d} err {s['duration']:8.1f}s  {s['url']}"
+            )
+    print(f"# page {result['page']} of {max(1, -(-result['total'] // result['per_page']))} ({result['total']} total)")
+    cat.close()
@@ -0,0 +1,169 @@
+# chunks.py
+# Streaming RAG chunk stage: pages are chunked off the event loop as they are
+# saved and appended to <out_dir>/chunks.jsonl, one JSON record per chunk.
+#
+# Usage (ingestion side):
+#   python chunks.py scraped/<domain>/chunks.jsonl            # print new records
+#   python chunks.py scraped/<domain>/chunks.jsonl --follow   # keep tailing
+#   python chunks.py ... --offset N                            # resume at byte N
+
+import argparse
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+from helper import chunk_markdown
+
+
+def chunk_id(url: str, offset: int, text: str) -> str:
+    """Same URL + position + text -> same id, so re-crawls upsert cleanly."""
+    key = f"{url}\0{offset}\0{text}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=12).hexdigest()
+
+
+def chunk_page(url: str, md: str, target_tokens: int, overlap_tokens: int, meta=None) -> list[dict]:
+    """Runs in a pool worker: markdown -> chunk records."""
+    records = []
+    for i, (offset, text, tokens) in enumerate(
+        chunk_markdown(
+            md,
+            target_tokens=target_tokens,
+            overlap_tokens=overlap_tokens,
+            with_offsets=True,
+        )
+    ):
+        records.append(
+            {
+                "id": chunk_id(url, offset, text),
+                "url": url,
+                "chunk": i,
+                "offset": offset,
+                "tokens": tokens,
+                **(meta or {}),
+                "text": text,
+            }
+        )
+    return records
+
+
+class ChunkPipeline:
+    """
+    Chunks saved pages on a process pool and appends the records to the
+    page's `chunks.jsonl`. `submit` returns immediately; records are written
+    (whole lines, flushed) from the event loop as chunking finishes, so a
+    reader can tail the file while the crawl is still running.
+    """
+
+    def __init__(self, workers: int = 2, target_tokens: int = 512, overlap_tokens: int = 64):
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+        # spawn: never fork a process that is running asyncio + Playwright
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._files = {}
+        self._pending = set()
+        self.pages = 0
+        self.chunks = 0
+        self.errors = 0
+        self.last_error = None
+
+    def submit(self, path, url: str, md: str, **meta):
+        """Queue one page for chunking into `path` (call from the event loop)."""
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(
+            self.pool,
+            chunk_page,
+            url,
+            md,
+            self.target_tokens,
+            self.overlap_tokens,
+            meta,
+        )
+        self._pending.add(fut)
+        fut.add_done_callback(lambda f: self._write(Path(path), f))
+
+    def _write(self, path: Path, fut):
+        self._pending.discard(fut)
+        if fut.cancelled():
+            return
+        if fut.exception() is not None:
+            self.errors += 1
+            self.last_error = f"{path}: {fut.exception()!r}"
+            return
+        records = fut.result()
+        f = self._files.get(path)
+        if f is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = self._files[path] = open(path, "a", encoding="utf-8")
+        f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        f.flush()
+        self.pages += 1
+        self.chunks += len(records)
+
+    async def drain(self):
+        """Wait for every submitted page to be written."""
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        await self.drain()
+        self.pool.shutdown()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def stats(self) -> dict:
+        return {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "queued": len(self._pending),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+def tail_chunks(path, offset: int = 0):
+    """
+    Records appended to `path` since byte `offset`; returns (records, new_offset).
+    A partially written last line is left for the next call.
+    """
+    path = Path(path)
+    if not path.exists():
+        return [], offset
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                records.append(json.loads(line))
+    return records, offset
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tail a chunks.jsonl file")
+    parser.add_argument("path", help="scraped/<domain>/chunks.jsonl")
+    parser.add_argument("--offset", help="Start at this byte offset", type=int, default=0)
+    parser.add_argument("-f", "--follow", help="Keep polling for new chunks", action="store_true")
+    args = parser.parse_args()
+
+    offset = args.offset
+    try:
+        while True:
+            records, offset = tail_chunks(args.path, offset)
+            for rec in records:
+                print(json.dumps({k: v for k, v in rec.items() if k != "text"}))
+            if not args.follow:
+                break
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    print(f"# next offset: {offset}")
@@ -7,11 +7,13 @@ DEBUG = False
 SEEDS_FILE = "seeds.txt"
 MAX_DEPTH = 1  # 0 = only seeds; 1 = seeds + 1 hop; 2 = +2 hops
 MAX_PAGES = 100  # crawlers runs in concurrent manner, thus, this prolly controls the per-seed max(?)
-GLOBAL_MAX_PAGES = 200
+GLOBAL_MAX_PAGES = 200  # pages for the whole job across seeds/workers (0 = unlimited)
+DOMAIN_MAX_PAGES = {}  # optional per-domain sub-quotas, e.g. {"example.com": 50}
 
 
 # Crawl pacing (conservative)
-BASE_CONCURRENCY = 2  # fewer parallel tabs = friendlier
+BASE_CONCURRENCY = 2  # parallel tabs *per host*; fewer = friendlier
+GLOBAL_TAB_BUDGET = 16  # parallel tabs across all hosts (machine limit)
 BASE_DELAY_SEC = 1.2  # base delay between requests (polite)
 DELAY_JITTER_MIN = 0.6  # per-seed jitter
 DELAY_JITTER_MAX = 1.8
@@ -25,8 +27,146 @@ BACKOFF_THRESHOLD_RATE = 0.20  # if >=20% of pages look blocked, back off
 BACKOFF_MULTIPLIER = 1.8  # multiply the delay
 BACKOFF_MAX_DELAY = 6.0  # cap delay after backoff
 
+# Live (AIMD) rate control per host, applied while the crawl runs
+RATE_WINDOW = 20  # sliding window of recent pages per host
+RATE_MIN_SAMPLES = 5  # pages needed before the window block rate is trusted
+RATE_RECOVER_AFTER = 10  # clean pages in a row before speeding up again
+RATE_DELAY_STEP = 0.1  # additive delay decrease (sec) on recovery
+RATE_MAX_CONCURRENCY = 4  # per-host concurrency ceiling when recovering
+
+# Shared browser pool (one warm Chromium serves many seeds)
+POOL_BROWSERS = 1  # browsers kept alive for the whole run
+POOL_TABS_PER_BROWSER = 8  # concurrent seed leases per browser
+POOL_MAX_PAGES_PER_BROWSER = 500  # restart a browser after this many pages
+
+# Stream pages to disk as they arrive instead of holding a seed's whole
+# result list (HTML + markdown) in memory until the deep crawl ends
+STREAM_RESULTS = True
+
+# Checkpoint/resume: frontier, visited set and per-seed counters on disk
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DB = "frontier.sqlite"  # relative to the crawler's working dir
+CHECKPOINT_INTERVAL_SEC = 5.0  # max progress lost on a hard crash
+RESUME = False  # set by --resume
+VISITED_CAPACITY = 1_000_000  # URLs per Bloom filter before another is chained on
+VISITED_ERROR_RATE = 0.01  # Bloom false-positive rate (confirmed against the DB)
+
+# Query params dropped during URL canonicalisation ("*" = prefix match)
+TRACKING_PARAMS = [
+    "utm_*",
+    "gclid",
+    "gclsrc",
+    "dclid",
+    "fbclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "_hsenc",
+    "_hsmi",
+    "ref_src",
+]
+
+# Incremental recrawl: per-URL validators + markdown hashes kept across runs
+INCREMENTAL = False  # set by --incremental
+RECRAWL_DB = "recrawl.sqlite"  # relative to the crawler's working dir
+
+# Output layout: "files" = md/<name>.md per page; "segments" = compressed
+# records packed into large seg-NNNNN.dat files + offset index (segments.py)
+OUTPUT_BACKEND = "files"
+SEGMENT_MAX_BYTES = 256 * 1024 * 1024
+
+# Content-addressed markdown storage (md/<sha256>.md shared by exact
+# duplicates; "files" backend only)
+DEDUP_ENABLED = True
+DEDUP_DB = "dedup.sqlite"  # relative to the crawler's working dir
+# Opt-in near-duplicate detection (SimHash bits): such pages still get their
+# own file, index.jsonl only records `near_of`. 0 = exact duplicates only
+DEDUP_NEAR_DISTANCE = 0
+
+# Search index: saved pages are added to scraped/_index as they are written
+# (query with `python search.py "terms"` or the GUI search box)
+SEARCH_INDEX = True  # set by --index / --no-index
+SEARCH_FLUSH_DOCS = 500  # pages buffered before a segment is written
+SEARCH_FLUSH_SEC = 30.0  # ...or seconds, so results show up mid-crawl
+
+# RAG chunks: each saved page is chunked on a process pool into
+# <out_dir>/chunks.jsonl (tail it with `python chunks.py <path> --follow`)
+CHUNKS_ENABLED = False  # set by --chunks
+CHUNK_TARGET_TOKENS = 512  # approximate tokens (words + punctuation) per chunk
+CHUNK_OVERLAP_TOKENS = 64  # last tokens of a chunk repeated at the next one's start
+CHUNK_WORKERS = 2  # chunking processes
+
+# Logging (queue-backed, written off the event loop)
+LOG_LEVEL = "INFO"  # DEBUG also turns on crawl4ai's own verbose output
+LOG_TO_FILE = False  # set by --log-file
+LOG_FILE = "crawl.log.jsonl"  # one JSON record per line
+LOG_REPEAT_WINDOW_SEC = 10.0  # identical messages within this window are folded
+
+# Crawl catalogue: runs, seeds and their counters (read by the GUI)
+CATALOGUE_DB = "catalogue.sqlite"  # shared by --workers; "" disables
+CATALOGUE_COMMIT_SEC = 5.0  # max age of the per-page counters in the DB
+
+# Request blocking while rendering (blocking.py): resources the crawler never
+# keeps are aborted before Chromium downloads them
+BLOCK_PROFILE = "layout-safe"  # "off", "layout-safe" (images, media, fonts) or "text-only" (+ CSS); --block
+BLOCK_RESOURCE_TYPES = []  # extra Playwright resource types, e.g. ["script"] for static sites
+BLOCK_URL_PATTERNS = [  # ads and analytics, blocked by every profile but "off"
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*googletagmanager.com*",
+    "*google-analytics.com*",
+    "*adservice.google.*",
+    "*connect.facebook.net*",
+    "*hotjar.com*",
+    "*segment.io*",
+    "*scorecardresearch.com*",
+    "*criteo.*",
+    "*taboola.com*",
+    "*outbrain.com*",
+]
+
+# Page readiness (readiness.py): capture HTML once the DOM and network have
+# been quiet instead of a fixed delay + full-page scroll on every page
+SMART_WAIT = True  # --smart-wait / --no-smart-wait
+READY_QUIET_MS = 300  # quiet window that counts as settled
+READY_MAX_MS = 4000  # ceiling per page; learned per host from earlier pages
+READY_LEARN_AFTER = 5  # settled pages before a host's ceiling is learned
+READY_BUSY_AFTER = 3  # timeouts in a row before a host counts as never quiet
+READY_BUSY_MS = 1000  # wait per page on such a host (full ceiling re-probed now and then)
+READY_SCROLL_STEPS = 20  # viewports scrolled on lazy-loading pages
+READY_SCROLL_MIN_GAIN = 200  # chars a scroll must add to count as useful
+
+# Learned link scoring for BestFirst (linkscore.py): URL-path and anchor-text
+# weights trained on which fetched pages were saved
+LEARNED_SCORING = True  # --learned-scoring / --no-learned-scoring
+LEARN_RATE = 0.2  # SGD step per fetched page
+LEARN_RESCORE_EVERY = 20  # pages learned between re-ranks of the pending frontier
+
+# Per-stage timings, throughput, per-host errors (served as /metrics by the GUI)
+METRICS_FILE = "metrics.json"  # snapshot rewritten while crawling; "" disables
+METRICS_INTERVAL_SEC = 2.0  # min seconds between snapshot rewrites (GUI live counters)
+
+# Tiered fetching: keep-alive HTTP first, headless browser only when needed
+TIERED_FETCH = False  # set by --tiered (needs the frontier strategy: checkpoints or service jobs)
+TIERED_MIN_MARKDOWN_CHARS = 500  # thinner HTTP results are re-rendered in Chromium
+
 REQUEST_TIMEOUT_SEC = 40  # JS-heavy pages may need time
-MAX_WORKERS = 7
+MAX_WORKERS = 7  # upper bound for --workers (processes, one event loop + browser each)
+
+# Distributed mode (--coordinator / --join)
+COORDINATOR_ADDR = "127.0.0.1:8765"  # where --coordinator listens by default
+COORDINATOR_TOKEN = ""  # shared secret (--token); required to listen off loopback
+COORDINATOR_DB = "coordinator.sqlite"  # job state: frontier, visited set, counters
+LEASE_TTL_SEC = 60.0  # a worker silent for this long loses its URL leases
+
+# Crawl service: warm browsers, many jobs over a JSON API (service.py, GUI)
+SERVICE_ADDR = "127.0.0.1:8766"  # where `python service.py` listens by default
+SERVICE_TOKEN = ""  # shared secret (--token); required to listen off loopback
+SERVICE_KEEP_JOBS = 200  # finished jobs kept for /jobs before the oldest are dropped
 
 KEYWORDS = []
 BLOCKED_DOMAINS = []
@@ -42,4 +182,24 @@ class Mode(Enum):
 STRATEGY = Mode.BESTFIRST_STRATEGY
 CONTENT_RELEVANCE_QUERY = ""
 
-URL_FILTERS = []
\ No newline at end of file
+URL_FILTERS = []
+
+# Never fetched: checked against the URL path before the browser sees it
+SKIP_EXTENSIONS = [
+    ".pdf",
+    ".zip",
+    ".rar",
+    ".7z",
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".svg",
+    ".webp",
+    ".bmp",
+    ".mp4",
+    ".webm",
+    ".avi",
+    ".mp3",
+    ".wav",
+]
\ No newline at end of file
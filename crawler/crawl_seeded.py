@@ -5,6 +5,16 @@ import asyncio
 import json
 import argparse
 import random
+import signal
+import hashlib
+import multiprocessing
+import queue as queue_mod
+import os
+import socket
+import sys
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
 import math
 import uuid
 from pprint import pprint
@@ -25,7 +35,6 @@ from crawl4ai.deep_crawling import (
 from crawl4ai.deep_crawling.filters import (
     ContentRelevanceFilter,
     DomainFilter,
-    URLPatternFilter,
 )
 from crawl4ai.content_filter_strategy import BM25ContentFilter, PruningContentFilter
 from crawl4ai.deep_crawling.scorers import KeywordRelevanceScorer
@@ -34,11 +43,31 @@ from pprint import pprint
 
 
 from config import *
+from pool import BrowserPool, PoolExhausted, chain_hooks
+from scheduler import HostScheduler
+from ratecontrol import AdaptiveRateController
+from frontier import FrontierStore, FrontierCrawlStrategy
+from recrawl import RecrawlStore, ConditionalPrecheck, content_hash
+from dedup import ContentStore
+from urlfilters import CompiledURLFilter
+from fetcher import TieredFetcher
+from segments import SegmentWriter
+from budget import PageBudget
+from chunks import ChunkPipeline
+from search import IndexWriter, INDEX_ROOT
+from metrics import Metrics, merge_snapshots, write_snapshot
+from blocking import ResourceBlocker
+from readiness import ReadinessEngine
+from linkscore import LinkScorer
+from catalogue import Catalogue
+from distributed import Coordinator, RemoteFrontier, connect, serve
+from logs import logger
 from helper import (
-    BasicLogger,
     initialize_seeds_vars,
-    count_block_signals,
+    block_signal,
+    status_of,
     initialize_single_url,
+    indexed_urls,
 )
 
 # ==============================
@@ -47,7 +76,18 @@ from helper import (
 
 
 # ALL_SEEDS = initialize_seeds_vars(SEEDS_FILE)
-logger = BasicLogger()
+def configure_logger():
+    # The shared logs.logger (also used by helper) is created before config
+    # is read; flags and worker settings arrive later still
+    logger.configure(
+        level=LOG_LEVEL,
+        log_file=LOG_FILE,
+        file_enabled=LOG_TO_FILE,
+        repeat_window=LOG_REPEAT_WINDOW_SEC,
+    )
+
+
+configure_logger()
 
 
 def calculate_score(string: str, keywords: list[str]):
@@ -63,13 +103,58 @@ def calculate_score(string: str, keywords: list[str]):
 
 
 class Crawler:
-    def __init__(self, seed_dict):
+    def __init__(
+        self,
+        seed_dict,
+        pool=None,
+        scheduler=None,
+        rate_controller=None,
+        frontier=None,
+        recrawl=None,
+        precheck=None,
+        content_store=None,
+        fetcher=None,
+        budget=None,
+        chunker=None,
+        indexer=None,
+        metrics=None,
+        catalogue=None,
+        rules=None,
+        blocker=None,
+        readiness=None,
+    ):
+        # What to crawl (SHARED_SETTINGS + STRATEGY); `rules` overrides the
+        # module settings for one job of the crawl service
+        rules = {**crawl_rules(), **(rules or {})}
         self.seed_dict = seed_dict
+        self.pool = pool  # shared BrowserPool; None -> private browser per seed
+        self.scheduler = scheduler  # shared HostScheduler; None -> unpaced
+        self.rate_controller = rate_controller  # live AIMD backoff per host
+        self.frontier = frontier  # FrontierStore for checkpoint/resume
+        self.recrawl = recrawl  # RecrawlStore (incremental mode)
+        self.precheck = precheck  # conditional-GET pre-check (incremental mode)
+        self.skipped_unchanged = 0  # pages not re-written because nothing changed
+        self.content_store = content_store  # content-addressed md blobs (dedup)
+        self.fetcher = fetcher  # HTTP-first TieredFetcher (frontier strategy only)
+        self.segments = None  # SegmentWriter when OUTPUT_BACKEND == "segments"
+        self.budget = budget  # run-wide PageBudget (GLOBAL_MAX_PAGES)
+        self.chunker = chunker  # ChunkPipeline writing <out_dir>/chunks.jsonl
+        self.indexer = indexer  # search.IndexWriter (BM25 index over saved pages)
+        self.metrics = metrics  # metrics.Metrics (stage timings, host errors)
+        self.catalogue = catalogue  # catalogue.Catalogue (run/seed counters for the GUI)
+        self.blocker = blocker  # blocking.ResourceBlocker (images/fonts/ads never load)
+        self.readiness = readiness  # readiness.ReadinessEngine (settle-based waits)
+        self.strategy = None
         self.enabled_adaptive_strategy = False
-        self.enabled_bfs_strategy = not (Mode.BFS_STRATEGY.value - STRATEGY.value)
+        self.enabled_bfs_strategy = not (
+            Mode.BFS_STRATEGY.value - rules["STRATEGY"].value
+        )
         self.enabled_bestfirst_strategy = not (
-            Mode.BESTFIRST_STRATEGY.value - STRATEGY.value
+            Mode.BESTFIRST_STRATEGY.value - rules["STRATEGY"].value
         )
+        self.max_depth = rules["MAX_DEPTH"]
+        self.max_pages = rules["MAX_PAGES"]
+        self.keywords = rules["KEYWORDS"]
         self.pages_crawled = 0
         self.written = 0  # no. of md pages written (for tracking MAX_PAGES limit)
         self.results = []
@@ -79,19 +164,61 @@ class Crawler:
         self.jsonl_path = seed_dict["jsonl_path"]
         self.allowed_domain = seed_dict["allowed_domain"]
         self.blocked_rate = 0
-        self.blocked_domains = BLOCKED_DOMAINS
+        self.fetched = 0  # pages returned by the browser (saved or not)
+        self.block_score = 0.0  # running sum of block_signal() over fetched pages
+        self.errors = 0  # failed or 4xx/5xx pages
+        self.bytes_written = 0  # markdown + index.jsonl bytes written
+        self.blocked_domains = rules["BLOCKED_DOMAINS"]
         self.content_relevance_filter_q = CONTENT_RELEVANCE_QUERY
         self.enabled_url_matching = False
-        if KEYWORDS:
-            self.keyword_scorer = KeywordRelevanceScorer(keywords=KEYWORDS, weight=1)
+        if self.keywords:
+            self.keyword_scorer = KeywordRelevanceScorer(keywords=self.keywords, weight=1)
         else:
             self.keyword_scorer = None
+        self.link_scorer = None
+        if LEARNED_SCORING and self.enabled_bestfirst_strategy:
+            # Learns which links lead to saved pages (see save_result)
+            self.link_scorer = LinkScorer(self.keywords, lr=LEARN_RATE)
+        self.url_filter = CompiledURLFilter(
+            include=rules["URL_FILTERS"],
+            blocked=rules["BLOCKED_KEYWORDS"],
+            required=self.keywords,
+            skip_extensions=rules["SKIP_EXTENSIONS"],
+        )
 
         # Rudimentary Check
         seed = seed_dict["url"]
         if not seed:
             raise SystemExit("seed not accessible")
 
+        # Resuming: carry on counting from the last checkpoint
+        self.indexed = set()
+        if self.frontier is not None:
+            state = self.frontier.seed_state(seed)
+            if state:
+                self.written = state["written"]
+                self.pages_crawled = state["pages_crawled"]
+                self.fetched = state["fetched"]
+                # Pages saved after that checkpoint come back as PENDING;
+                # they are fetched again (for their links) but not re-indexed
+                self.indexed = indexed_urls(self.jsonl_path)
+
+    @staticmethod
+    def get_browser_config():
+        return BrowserConfig(
+            headless=True,
+            verbose=LOG_LEVEL == "DEBUG",
+            java_script_enabled=True,  # Enable JavaScript in browser
+            enable_stealth=True,
+            user_agent=(
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/120.0.0.0 Safari/537.36"
+            ),
+            browser_mode="pool",
+            sleep_on_close=True,
+        )
+
     def get_adaptive_config(self):
         if self.enabled_adaptive_strategy:
             high_precision_config = AdaptiveConfig(
@@ -143,52 +270,56 @@ class Crawler:
         #     threshold=0.6 if self.content_relevance_filter_q else 0,
         # )
 
-        if URL_FILTERS:
-            url_filter = URLPatternFilter(
-                patterns=URL_FILTERS,
-            )
-
-            if BLOCKED_KEYWORDS:
-                block_filter = URLPatternFilter(
-                    patterns=BLOCKED_KEYWORDS,
-                    reverse=True,
-                )
-                return FilterChain([domain_filter, block_filter, url_filter])
-
-            return FilterChain([domain_filter, url_filter])
-
-        if BLOCKED_KEYWORDS:
-            block_filter = URLPatternFilter(
-                patterns=BLOCKED_KEYWORDS,
-                reverse=True,
-            )
-            return FilterChain([domain_filter, block_filter])
-
-        return FilterChain([domain_filter])  # , url_filter])
+        # Extensions, URL patterns, blocked patterns and keywords share one
+        # compiled matcher, so rejected URLs never reach the browser
+        return FilterChain([domain_filter, self.url_filter])
 
     def get_strategy(self):
         strategy = None
-        if self.enabled_bestfirst_strategy:
+        if self.frontier is not None:
+            # Same BFS/BestFirst ordering, but the frontier lives on disk
+            if DEBUG:
+                logger.log_debug("Using FrontierCrawlStrategy")
+            strategy = FrontierCrawlStrategy(
+                store=self.frontier,
+                seed=self.seed_dict["url"],
+                max_depth=self.max_depth,
+                max_pages=self.max_pages,
+                filter_chain=self.get_filter(),
+                url_scorer=self.link_scorer or self.keyword_scorer,
+                best_first=self.enabled_bestfirst_strategy,
+                score_threshold=(
+                    0.1
+                    if self.keywords and self.enabled_bfs_strategy
+                    else float(-1 * math.inf)
+                ),
+                include_external=False,
+                precheck=self.precheck,
+                fetcher=self.fetcher,
+                budget=self.budget,
+                rescore_every=LEARN_RESCORE_EVERY if self.link_scorer else 0,
+            )
+        elif self.enabled_bestfirst_strategy:
             if DEBUG:
                 logger.log_debug("Using BestFirstStrategy")
             strategy = BestFirstCrawlingStrategy(
-                max_pages=MAX_PAGES,
-                max_depth=MAX_DEPTH,
+                max_pages=self.max_pages,
+                max_depth=self.max_depth,
                 include_external=False,
-                url_scorer=self.keyword_scorer if KEYWORDS else None,
+                url_scorer=self.link_scorer or self.keyword_scorer,
                 filter_chain=self.get_filter(),
             )
         elif self.enabled_bfs_strategy:
             if DEBUG:
                 logger.log_debug("Using BFSStrategy")
             strategy = BFSDeepCrawlStrategy(
-                max_depth=MAX_DEPTH,  # Crawl initial page + 2 levels deep
+                max_depth=self.max_depth,  # Crawl initial page + 2 levels deep
                 include_external=False,  # Stay within the same domain
-                max_pages=MAX_PAGES,  # Maximum number of pages to crawl (optional)
+                max_pages=self.max_pages,  # Maximum number of pages to crawl (optional)
                 score_threshold=(
-                    0.1 if KEYWORDS else float(-1 * math.inf)
+                    0.1 if self.keywords else float(-1 * math.inf)
                 ),  # Minimum score for URLs to be crawled (optional)
-                url_scorer=self.keyword_scorer if KEYWORDS else None,
+                url_scorer=self.keyword_scorer,
                 filter_chain=self.get_filter(),
             )
 
@@ -198,28 +329,20 @@ class Crawler:
         # Start with the configured base delay; adjust via backoff if needed
         per_seed_base_delay = BASE_DELAY_SEC
 
-        # for idx, seed in enumerate(seeds, start=1):
-        # Jitter per seed (makes crawl tempo less bot-like)
-        jitter = random.uniform(DELAY_JITTER_MIN, DELAY_JITTER_MAX)
-        per_seed_delay = min(per_seed_base_delay + jitter, BACKOFF_MAX_DELAY)
+        if self.scheduler:
+            # Per-host pacing (delay already includes the host's jitter)
+            host_state = self.scheduler.host(self.allowed_domain)
+            per_seed_delay = host_state.delay
+            concurrency = host_state.concurrency
+        else:
+            # Jitter per seed (makes crawl tempo less bot-like)
+            jitter = random.uniform(DELAY_JITTER_MIN, DELAY_JITTER_MAX)
+            per_seed_delay = min(per_seed_base_delay + jitter, BACKOFF_MAX_DELAY)
 
-        # Conservative concurrency (per seed)
-        concurrency = BASE_CONCURRENCY
+            # Conservative concurrency (per seed)
+            concurrency = BASE_CONCURRENCY
 
-        # --- Browser configuration (clean session per seed) ---
-        browser_cfg = BrowserConfig(
-            headless=True,
-            verbose=True,
-            java_script_enabled=True,  # Enable JavaScript in browser
-            enable_stealth=True,
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
-            browser_mode="pool",
-            sleep_on_close=True,
-        )
+        self.strategy = self.get_strategy()
 
         # --- Crawler run configuration ---
         run_cfg = CrawlerRunConfig(
@@ -227,196 +350,979 @@ class Crawler:
             check_robots_txt=False,
             page_timeout=REQUEST_TIMEOUT_SEC * 1000,  # Convert to milliseconds
             mean_delay=per_seed_delay,  # Use mean_delay instead of delay
+            semaphore_count=concurrency,  # tabs this seed may hold at once
             excluded_tags=["script", "style"],  # Exclude script tags if needed
             remove_overlay_elements=False,
             markdown_generator=DefaultMarkdownGenerator(
                 options={"links_as_footnotes": False, "wrap_tables": True},
             ),
-            verbose=True,
+            verbose=LOG_LEVEL == "DEBUG",
             # Additional parameters to handle dynamic content
             wait_until="domcontentloaded",  # Wait for DOM to load
-            delay_before_return_html=1,  # Small delay before capturing HTML
+            # With the readiness engine the capture waits for the DOM and
+            # network to go quiet (and scrolls only lazy-loading pages);
+            # otherwise a fixed delay and a full-page scroll
+            delay_before_return_html=0 if self.readiness else 1,
             # Configure deep crawling strategy
-            deep_crawl_strategy=self.get_strategy(),
-            scan_full_page=True,
+            deep_crawl_strategy=self.strategy,
+            scan_full_page=self.readiness is None,
         )
 
-        logger.log_info(f"Strategy: {self.get_strategy()}")
+        logger.log_info(f"Strategy: {self.strategy}")
 
-        print(f"[Seed X] {seed} | delay={per_seed_delay:.2f}s | conc={concurrency}")
-        target_pages = MAX_PAGES
+        logger.log_info(f"[Seed X] {seed} | delay={per_seed_delay:.2f}s | conc={concurrency}")
+        target_pages = self.max_pages
 
-        async with AsyncWebCrawler(config=browser_cfg) as crawler:
+        if STREAM_RESULTS:
+            # Results arrive one by one as an async iterator; nothing is retained
+            run_cfg = run_cfg.clone(stream=True)
 
-            self.batch = await crawler.arun(
-                url=seed,
-                config=run_cfg,
+        if OUTPUT_BACKEND == "segments":
+            self.segments = SegmentWriter(
+                self.out_dir / "segments", max_segment_bytes=SEGMENT_MAX_BYTES
             )
 
+        if self.budget is not None:
+            # Weighted share of the job budget; shut down once it runs out
+            self.budget.register(
+                seed,
+                self.allowed_domain,
+                self.seed_dict.get("priority", 1.0),
+                self.strategy,
+                asyncio.current_task(),
+            )
 
-            if not isinstance(self.batch, list):
-                self.batch = [self.batch] if self.batch else []
-
-            # for r in self.batch:
-            #     if calculate_score(r.url, KEYWORDS) != 1:
-            #         logger.log_info(f"SCORE: {calculate_score(r.url, KEYWORDS)}")
-            #         continue
+        t_seed = time.perf_counter()
+        try:
+            private = not self.pool
+            if self.pool:
+                try:
+                    # Leased tab(s) on a warm, shared browser
+                    async with self.pool.lease() as crawler:
+                        fetched = await self._fetch(crawler, seed, run_cfg)
+                        self.pool.record_pages(crawler, fetched)
+                except PoolExhausted as e:
+                    logger.log_error(f"Browser pool unusable ({e}); private browser for {seed}")
+                    private = True
+            if private:
+                await self._fetch_private(seed, run_cfg)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("seed", time.perf_counter() - t_seed)
+                self.metrics.queue_depth(self.seed_dict["url"], None)
+            if self.budget is not None:
+                self.budget.unregister(seed)
+            if self.segments is not None:
+                self.segments.close()  # sorts the offset index
 
         # Backoff heuristic: if we see many 429/403/empty, slow down future seeds
-        self.blocked_rate = count_block_signals(self.batch)
-        if self.blocked_rate >= BACKOFF_THRESHOLD_RATE:
-            print(
+        self.blocked_rate = (
+            self.block_score / self.fetched if self.fetched else 0.0
+        )
+        if self.rate_controller:
+            # Backoff already happened live; just report where the host ended up
+            state = self.rate_controller.state().get(self.allowed_domain)
+            if state:
+                logger.log_info(
+                    f"  -> Rate for {self.allowed_domain}: delay={state['delay']:.2f}s "
+                    f"conc={state['concurrency']} backoffs={state['backoffs']}"
+                )
+        elif self.blocked_rate >= BACKOFF_THRESHOLD_RATE:
+            logger.log_warning(
                 f"  -> Block signals high ({self.blocked_rate:.0%}). Backing off."
             )
             per_seed_base_delay = min(
                 per_seed_base_delay * BACKOFF_MULTIPLIER, BACKOFF_MAX_DELAY
             )
+
+        self.skipped_unchanged += getattr(self.strategy, "skipped_unchanged", 0)
+        self.finish_seed()
+        self.persist(status="done")
+        logger.log_info(f"Done. Total pages saved: {self.pages_crawled}. Output: {self.out_dir}")
+        if self.link_scorer is not None:
+            logger.log_info(f"Link scorer ({self.seed_dict['url']}): {self.link_scorer.stats()}")
+        if self.content_store is not None:
+            self.content_store.commit()
+        if self.recrawl is not None:
+            self.recrawl.commit()
+            logger.log_info(f"  -> Skipped {self.skipped_unchanged} unchanged pages (incremental).")
+
+    async def _fetch_private(self, seed, run_cfg) -> int:
+        """Clean browser session for this seed only (no pool, or pool dead)."""
+        async with AsyncWebCrawler(config=self.get_browser_config()) as crawler:
+            pacing = self.scheduler.before_goto_hook if self.scheduler else None
+            if self.metrics is not None:
+                hooks = self.metrics.browser_hooks(pacing)
+            else:
+                hooks = {"before_goto": pacing} if pacing else {}
+            # Readiness first, so metrics time its wait as render_wait
+            hooks = chain_hooks(
+                self.readiness and self.readiness.hooks(),
+                hooks,
+                self.scheduler and self.scheduler.release_hooks(),
+                self.blocker and self.blocker.hooks(),
+            )
+            for name, hook in hooks.items():
+                crawler.crawler_strategy.set_hook(name, hook)
+            return await self._fetch(crawler, seed, run_cfg)
+
+    async def _fetch(self, crawler, seed, run_cfg) -> int:
+        """Run the deep crawl for one seed; returns the no. of pages fetched."""
+        before = self.fetched
+        if run_cfg.stream:
+            # Streaming: every page hits the disk as soon as it arrives
+            with open(self.jsonl_path, "a", encoding="utf-8") as jf:
+                async for r in await crawler.arun(url=seed, config=run_cfg):
+                    if not self.track(r):
+                        break  # job-wide page budget spent
+                    if self.save_result(jf, r, await self.fingerprint(r)):
+                        jf.flush()
+        else:
+            self.batch = await crawler.arun(
+                url=seed,
+                config=run_cfg,
+            )
+            if not isinstance(self.batch, list):
+                self.batch = [self.batch] if self.batch else []
+            self.batch = [r for r in self.batch if self.track(r)]
+
+            # Save outputs - filter out unwanted file types at processing level
+            await self.save_json()
+            self.results.extend(self.batch)
+        return self.fetched - before
+
+    def track(self, r) -> bool:
+        """Per-page bookkeeping that must not hold on to the page itself.
+        Returns False once the job's page budget refuses this page."""
+        if not r:
+            return True
+        if (
+            self.budget is not None
+            and not isinstance(self.strategy, FrontierCrawlStrategy)
+            and not self.budget.consume(self.allowed_domain)
+        ):
+            # Stock strategies don't reserve up front: count here and stop
+            return False
+        self.fetched += 1
+        self.block_score += block_signal(r)
+        if not getattr(r, "success", False) or (status_of(r) or 0) >= 400:
+            self.errors += 1
+        self.persist()
+        if self.metrics is not None:
+            pending = getattr(self.strategy, "pending", None)
+            if pending is not None:
+                self.metrics.queue_depth(self.seed_dict["url"], pending)
+            self.metrics.page(r)
+        if self.rate_controller:
+            host = urlsplit(r.url).netloc or self.allowed_domain
+            self.rate_controller.record(host, r)
+        return True
+
+    async def save_json(self):
+        with open(self.jsonl_path, "a", encoding="utf-8") as jf:
+            for r in self.batch:
+                self.save_result(jf, r, await self.fingerprint(r))
+
+    async def fingerprint(self, r) -> int | None:
+        """Near-duplicate SimHash of a page's markdown, hashed off the event loop."""
+        if self.content_store is None or self.segments is not None or not r:
+            return None
+        if not getattr(r, "markdown", None):
+            return None
+        return await self.content_store.fingerprint(str(r.markdown))
+
+    def save_result(self, jf, r, fingerprint=None) -> bool:
+        """Write one page's markdown + index record; False if it was skipped."""
+        if not r:
+            return False
+        if not getattr(r, "markdown", None):
+            self.learn(r, False)
+            return False
+
+        # Links were filtered before the fetch; this catches the seed page,
+        # redirect targets and pages without the required KEYWORDS (fetched
+        # for their links only)
+        if not self.url_filter.savable(r.url):
+            if DEBUG:
+                logger.log_debug(f"Filtered after fetch: {r.url}")
+            self.learn(r, False)
+            return False
+
+        if r.url in self.indexed:
+            # Already in index.jsonl from before the crash; only count it
+            self.indexed.discard(r.url)
+            self.written += 1
+            self.pages_crawled += 1
+            self.persist()
+            self.learn(r, True)
+            return True
+
+        if urlsplit(r.url).path:
+            safe = (
+                urlsplit(r.url)
+                .path.replace("https://", "")
+                .replace("http://", "")
+                .replace("/", "*")
+                .replace("?", "%3F")
+                .replace("#", "%23")
+            )
+        else:
+            safe = (
+                r.url.replace("https://", "")
+                .replace("http://", "")
+                .replace("/", "_")
+                .replace("?", "%3F")
+                .replace("#", "%23")
+            )
+        if DEBUG:
+            logger.log_debug(str(r.markdown))
+
+        md_hash = None
+        if self.recrawl is not None:
+            # Same markdown as last run -> refresh validators, don't re-write
+            md_hash = content_hash(str(r.markdown))
+            if self.recrawl.unchanged(r.url, md_hash):
+                self.recrawl.put(r.url, r, md_hash)
+                self.skipped_unchanged += 1
+                self.learn(r, True)  # saved by an earlier run
+                return False
+        t_write = time.perf_counter()
+        # try:
+        #     page_md_path = self.md_dir / f"{safe}.md"
+        #     page_md_path.write_text(r.markdown, encoding="utf-8")
+        # except:
+        #     page_md_path = self.md_dir / f"{safe[:50]}.md"
+        #     page_md_path.write_text(r.markdown, encoding="utf-8")
+
+        ########## Path-like Directory Saving ###################
+        # parsed = urlparse(r.url)
+        # domain = parsed.netloc.replace("www.", "")
+        # path = parsed.path or "/"
+        # clean_path = re.sub(r"^/|/$", "", path)
+        # clean_path = re.sub(r"[<>|:*?\"\\]", "", clean_path)
+        # safe_name = f"{domain}_{clean_path}".strip("_")
+        # if not safe_name or safe_name.endswith("."):
+        #     safe_name = f"{domain}_index"
+        # safe_name = safe_name[:200]  # Prevent too-long names
+
+        # if DEBUG:
+        #     pprint(r.markdown)
+
+        sha = duplicate = near_of = location = None
+        if self.segments is not None:
+            # Packed backend: one compressed record appended to the domain's segments
+            location = self.segments.put(
+                r.url,
+                str(r.markdown),
+                title=getattr(r, "title", None),
+                status=status_of(r),
+            )
+        elif self.content_store is not None:
+            # One blob per distinct content; exact duplicates point at it
+            page_md_path, sha, duplicate, near_of = self.content_store.put(
+                self.md_dir, str(r.markdown), fingerprint
+            )
+        else:
+            page_md_path = self.md_dir / f"{safe}_{str(uuid.uuid4())}.md"
+            try:
+                page_md_path.parent.mkdir(parents=True, exist_ok=True)
+                page_md_path.write_text(r.markdown, encoding="utf-8")
+            except Exception as e:
+                logger.log_warning(f"Failed to write {page_md_path}: {e}")
+                safe_name = safe[:42] + "_" + str(uuid.uuid4())
+                page_md_path = self.md_dir / f"{safe_name}.md"
+                page_md_path.write_text(r.markdown, encoding="utf-8")
+
+        rec = {
+            "url": r.url,
+            "status": status_of(r),
+            "title": getattr(r, "title", None),
+        }
+        if location:
+            rec.update(location)  # segment file + byte offset
+        else:
+            rec["path_md"] = str(page_md_path.as_posix())
+        if sha:
+            rec["content_sha256"] = sha
+            rec["duplicate"] = duplicate  # None | "exact" | "near"
+        if near_of:
+            rec["near_of"] = near_of  # similar page's blob; this one has its own
+
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        jf.write(line)
+        if self.indexer is not None:
+            self.indexer.add(
+                r.url,
+                str(r.markdown),
+                title=rec["title"],
+                seed=self.seed_dict["url"],
+                **(location or {"path_md": rec["path_md"]}),
+            )
+        if self.chunker is not None and duplicate != "exact":
+            # Off the event loop; exact duplicates were chunked with their first copy
+            self.chunker.submit(
+                self.out_dir / "chunks.jsonl",
+                r.url,
+                str(r.markdown),
+                title=rec["title"],
+            )
+        if self.recrawl is not None:
+            self.recrawl.put(r.url, r, md_hash, rec.get("path_md"))
+        if location:
+            md_bytes = location.get("length", 0)
         else:
-            # slowly relax (optional): keep it steady to be safe
-            pass
+            md_bytes = 0 if duplicate == "exact" else len(str(r.markdown).encode("utf-8"))
+        n_bytes = md_bytes + len(line.encode("utf-8"))
+        self.bytes_written += n_bytes
+        if self.metrics is not None:
+            self.metrics.observe("write", time.perf_counter() - t_write)
+            self.metrics.written(n_bytes)
+
+        self.written += 1
+        self.pages_crawled += 1
+        self.persist()
+        self.learn(r, not duplicate)
+        return True
+
+    def learn(self, r, saved: bool):
+        """Tell the learned link scorer whether a fetched page was worth keeping."""
+        if self.link_scorer is not None:
+            self.link_scorer.update(r.url, saved)
+
+    def persist(self, status="running"):
+        """Mirror the per-seed counters into the catalogue and frontier store."""
+        if self.catalogue is not None:
+            self.catalogue.update_seed(self.seed_dict["url"], **self.counters())
+        if self.frontier is None:
+            return
+        self.frontier.update_seed(
+            self.seed_dict["url"],
+            status=status,
+            written=self.written,
+            pages_crawled=self.pages_crawled,
+            fetched=self.fetched,
+        )
 
+    def counters(self) -> dict:
+        return {
+            "fetched": self.fetched,
+            "written": self.written,
+            "skipped": self.skipped_unchanged,
+            "bytes": self.bytes_written,
+            "errors": self.errors,
+        }
+
+    def finish_seed(self):
+        logger.log_info(
+            f"  -> Seed wrote {self.written} pages (total so far: {self.pages_crawled})."
+        )
 
-        # Save outputs - filter out unwanted file types at processing level
-        self.save_json()
-        self.results.extend(self.batch)
-        print(f"Done. Total pages saved: {self.pages_crawled}. Output: {self.out_dir}")
+        # Respect a seed pause with jitter (looks more human, reduces burstiness)
+        # if idx < len(seeds):
+        pause = random.uniform(SEED_PAUSE_MIN_SEC, SEED_PAUSE_MAX_SEC)
+        if self.blocked_rate >= BACKOFF_THRESHOLD_RATE:
+            pause *= 1.5
 
-    def save_json(self):
-        with open(self.jsonl_path, "a", encoding="utf-8") as jf:
-            for r in self.batch:
-                if not r or not getattr(r, "markdown", None):
-                    continue
-
-                if KEYWORDS:
-                    if calculate_score(r.url, KEYWORDS) != 1:
-                        logger.log_info(f"SCORE: {calculate_score(r.url, KEYWORDS)}")
-                        continue
-
-                url_lower = r.url.lower()
-
-                if DEBUG:
-                    print(url_lower)
-
-                skip_extensions = [
-                    ".pdf",
-                    ".zip",
-                    ".rar",
-                    ".7z",
-                    ".jpg",
-                    ".jpeg",
-                    ".png",
-                    ".gif",
-                    ".svg",
-                    ".webp",
-                    ".bmp",
-                    ".mp4",
-                    ".webm",
-                    ".avi",
-                    ".mp3",
-                    ".wav",
-                ]
-                if any(url_lower.endswith(ext) for ext in skip_extensions):
-                    continue
-                if urlsplit(r.url).path:
-                    safe = (
-                        urlsplit(r.url)
-                        .path.replace("https://", "")
-                        .replace("http://", "")
-                        .replace("/", "*")
-                        .replace("?", "%3F")
-                        .replace("#", "%23")
-                    )
-                else:
-                    safe = (
-                        r.url.replace("https://", "")
-                        .replace("http://", "")
-                        .replace("/", "_")
-                        .replace("?", "%3F")
-                        .replace("#", "%23")
-                    )
-                if DEBUG:
-                    pprint(r.markdown)
-                # try:
-                #     page_md_path = self.md_dir / f"{safe}.md"
-                #     page_md_path.write_text(r.markdown, encoding="utf-8")
-                # except:
-                #     page_md_path = self.md_dir / f"{safe[:50]}.md"
-                #     page_md_path.write_text(r.markdown, encoding="utf-8")
-
-                ########## Path-like Directory Saving ###################
-                # parsed = urlparse(r.url)
-                # domain = parsed.netloc.replace("www.", "")
-                # path = parsed.path or "/"
-                # clean_path = re.sub(r"^/|/$", "", path)
-                # clean_path = re.sub(r"[<>|:*?\"\\]", "", clean_path)
-                # safe_name = f"{domain}_{clean_path}".strip("_")
-                # if not safe_name or safe_name.endswith("."):
-                #     safe_name = f"{domain}_index"
-                # safe_name = safe_name[:200]  # Prevent too-long names
-
-                # if DEBUG:
-                #     pprint(r.markdown)
-
-                page_md_path = self.md_dir / f"{safe}_{str(uuid.uuid4())}.md"
-                try:
-                    page_md_path.parent.mkdir(parents=True, exist_ok=True)
-                    page_md_path.write_text(r.markdown, encoding="utf-8")
-                except Exception as e:
-                    print(f"Failed to write {page_md_path}: {e}")
-                    safe_name = safe[:42] + "_" + str(uuid.uuid4())
-                    page_md_path = self.md_dir / f"{safe_name}.md"
-                    page_md_path.write_text(r.markdown, encoding="utf-8")
-
-                rec = {
-                    "url": r.url,
-                    "status": getattr(r, "http_status", None),
-                    "title": getattr(r, "title", None),
-                    "path_md": str(page_md_path.as_posix()),
-                }
-
-                jf.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-                self.written += 1
-                self.pages_crawled += 1
+        logger.log_debug(f"  -> Sleeping {pause:.1f}s before next seed…")
 
-            print(
-                f"  -> Seed wrote {self.written} pages (total so far: {self.pages_crawled})."
+        # await asyncio.sleep(pause)
+
+        # self.results.extend(self.batch)
+
+
+# Settings that decide *what* gets crawled; the coordinator ships them to
+# workers so every node applies the same depth, caps and URL rules, and
+# each job of the crawl service may override them (`rules`)
+SHARED_SETTINGS = (
+    "MAX_DEPTH",
+    "MAX_PAGES",
+    "GLOBAL_MAX_PAGES",
+    "KEYWORDS",
+    "URL_FILTERS",
+    "BLOCKED_KEYWORDS",
+    "BLOCKED_DOMAINS",
+    "SKIP_EXTENSIONS",
+)
+
+
+def crawl_rules() -> dict:
+    """The module's SHARED_SETTINGS plus STRATEGY (a Mode)."""
+    rules = {k: globals()[k] for k in SHARED_SETTINGS}
+    rules["STRATEGY"] = STRATEGY
+    return rules
+
+
+def run_settings(rules=None) -> dict:
+    """What a run was asked to do (stored with it in the catalogue)."""
+    rules = {**crawl_rules(), **(rules or {})}
+    return {
+        "strategy": rules["STRATEGY"].name,
+        "max_depth": rules["MAX_DEPTH"],
+        "max_pages": rules["MAX_PAGES"],
+        "global_max_pages": rules["GLOBAL_MAX_PAGES"],
+        "keywords": rules["KEYWORDS"],
+        "incremental": INCREMENTAL,
+        "output": OUTPUT_BACKEND,
+    }
+
+
+class CrawlResources:
+    """
+    What all seeds of one process share: host pacing and backoff, the warm
+    browser pool, metrics and the on-disk stores. run_scraper opens one per
+    call; the crawl service (service.py) keeps one open across jobs so the
+    browsers stay up between them.
+    """
+
+    def __init__(self):
+        self.scheduler = HostScheduler(
+            base_delay=BASE_DELAY_SEC,
+            jitter_min=DELAY_JITTER_MIN,
+            jitter_max=DELAY_JITTER_MAX,
+            per_host_concurrency=BASE_CONCURRENCY,
+            tab_budget=GLOBAL_TAB_BUDGET,
+            max_delay=BACKOFF_MAX_DELAY,
+            hold_sec=REQUEST_TIMEOUT_SEC * 2,  # page lost without a close event
+        )
+        self.rate_controller = AdaptiveRateController(
+            self.scheduler,
+            threshold=BACKOFF_THRESHOLD_RATE,
+            multiplier=BACKOFF_MULTIPLIER,
+            max_delay=BACKOFF_MAX_DELAY,
+            min_delay=BASE_DELAY_SEC,
+            window=RATE_WINDOW,
+            min_samples=RATE_MIN_SAMPLES,
+            recover_after=RATE_RECOVER_AFTER,
+            delay_step=RATE_DELAY_STEP,
+            max_concurrency=RATE_MAX_CONCURRENCY,
+            logger=logger,
+        )
+        self.metrics = Metrics(METRICS_FILE or None, interval=METRICS_INTERVAL_SEC)
+        self.blocker = ResourceBlocker.from_profile(
+            BLOCK_PROFILE,
+            extra_types=BLOCK_RESOURCE_TYPES,
+            patterns=BLOCK_URL_PATTERNS,
+            metrics=self.metrics,
+        )
+        self.readiness = None
+        if SMART_WAIT:
+            self.readiness = ReadinessEngine(
+                quiet_ms=READY_QUIET_MS,
+                max_ms=READY_MAX_MS,
+                scroll_steps=READY_SCROLL_STEPS,
+                min_gain=READY_SCROLL_MIN_GAIN,
+                learn_after=READY_LEARN_AFTER,
+                busy_after=READY_BUSY_AFTER,
+                busy_ms=READY_BUSY_MS,
+            )
+        self.pool = BrowserPool(
+            Crawler.get_browser_config(),
+            size=POOL_BROWSERS,
+            tabs_per_browser=POOL_TABS_PER_BROWSER,
+            max_pages_per_browser=POOL_MAX_PAGES_PER_BROWSER,
+            # Readiness first, so metrics time its wait as render_wait
+            hooks=chain_hooks(
+                self.readiness and self.readiness.hooks(),
+                self.metrics.browser_hooks(self.scheduler.before_goto_hook),
+                self.scheduler.release_hooks(),
+                self.blocker and self.blocker.hooks(),
+            ),
+        )
+
+        self.recrawl = self.precheck = None
+        if INCREMENTAL:
+            self.recrawl = RecrawlStore(RECRAWL_DB)
+            self.precheck = ConditionalPrecheck(
+                self.recrawl,
+                user_agent=Crawler.get_browser_config().user_agent,
+                timeout=REQUEST_TIMEOUT_SEC,
+                scheduler=self.scheduler,
+            )
+
+        self.fetcher = None
+        if TIERED_FETCH:
+            self.fetcher = TieredFetcher(
+                user_agent=Crawler.get_browser_config().user_agent,
+                http_concurrency=GLOBAL_TAB_BUDGET * 2,
+                min_chars=TIERED_MIN_MARKDOWN_CHARS,
+                scheduler=self.scheduler,
+            )
+
+        self.content_store = None
+        if DEDUP_ENABLED:
+            self.content_store = ContentStore(
+                DEDUP_DB, max_distance=DEDUP_NEAR_DISTANCE
             )
 
-            # Respect a seed pause with jitter (looks more human, reduces burstiness)
-            # if idx < len(seeds):
-            pause = random.uniform(SEED_PAUSE_MIN_SEC, SEED_PAUSE_MAX_SEC)
-            if self.blocked_rate >= BACKOFF_THRESHOLD_RATE:
-                pause *= 1.5
+        self.chunker = None
+        if CHUNKS_ENABLED:
+            self.chunker = ChunkPipeline(
+                workers=CHUNK_WORKERS,
+                target_tokens=CHUNK_TARGET_TOKENS,
+                overlap_tokens=CHUNK_OVERLAP_TOKENS,
+            )
 
-            print(f"  -> Sleeping {pause:.1f}s before next seed…")
+        self.indexer = None
+        if SEARCH_INDEX:
+            self.indexer = IndexWriter(
+                INDEX_ROOT, flush_docs=SEARCH_FLUSH_DOCS, flush_sec=SEARCH_FLUSH_SEC
+            )
 
-            # await asyncio.sleep(pause)
+    def crawler(self, seed_dict, **kwargs) -> "Crawler":
+        """A Crawler wired to the shared resources."""
+        return Crawler(
+            seed_dict,
+            pool=self.pool,
+            scheduler=self.scheduler,
+            rate_controller=self.rate_controller,
+            recrawl=self.recrawl,
+            precheck=self.precheck,
+            content_store=self.content_store,
+            fetcher=self.fetcher,
+            chunker=self.chunker,
+            indexer=self.indexer,
+            metrics=self.metrics,
+            blocker=self.blocker,
+            readiness=self.readiness,
+            **kwargs,
+        )
 
-            # self.results.extend(self.batch)
+    async def start(self):
+        if self.fetcher is not None:
+            await self.fetcher.start()
+        await self.pool.start()
+
+    def log_stats(self):
+        logger.log_info(f"Browser pool: {self.pool.stats()}")
+        logger.log_info(f"Scheduler: {self.scheduler.stats()}")
+        logger.log_info(f"Rate controller: {self.rate_controller.state()}")
+        if self.blocker is not None:
+            logger.log_info(f"Blocked resources ({BLOCK_PROFILE}): {self.blocker.stats()}")
+        if self.readiness is not None:
+            logger.log_info(f"Page readiness: {self.readiness.stats()}")
+
+    async def close(self, compact_index: bool = True):
+        await self.pool.close()
+        if self.indexer is not None:
+            self.indexer.close(compact=compact_index)
+            logger.log_info(f"Search index: {self.indexer.stats()}")
+        if self.chunker is not None:
+            await self.chunker.close()  # flush chunks still being cut
+            logger.log_info(f"Chunks: {self.chunker.stats()}")
+        if self.fetcher is not None:
+            logger.log_info(f"Fetch tiers: {self.fetcher.stats()}")
+            await self.fetcher.close()
+        self.metrics.dump()
+        logger.log_info(f"Metrics: {self.metrics.summary()}")
+        if self.metrics.path is not None:
+            logger.log_info(f"Metrics snapshot: {self.metrics.path}")
+        if self.content_store is not None:
+            logger.log_info(f"Dedup: {self.content_store.stats()}")
+            self.content_store.close()
+        if self.recrawl is not None:
+            await self.precheck.close()
+            self.recrawl.close()
+            logger.log_info(
+                f"Incremental: {self.precheck.skipped} pages skipped by conditional GET"
+            )
 
 
-async def run_scraper():
-    if not ALL_SEEDS:
-        print("No valid seeds found.")
-        return
+async def run_scraper(
+    seeds=None,
+    progress=None,
+    budget_counter=None,
+    frontier=None,
+    run_id=None,
+    resources=None,
+    rules=None,
+    seed_gate=None,
+    on_seed=None,
+):
+    """
+    Crawl `seeds` (default: ALL_SEEDS) on this event loop. `progress`, if
+    given, is called with a summary dict after every seed. `budget_counter`
+    shares the GLOBAL_MAX_PAGES count with other processes; `frontier`
+    replaces the local FrontierStore (e.g. a RemoteFrontier). `run_id` is a
+    catalogue run opened by the caller (--workers); otherwise this call
+    records its own run. Returns run totals.
+
+    The crawl service passes its long-lived `resources` (left open here),
+    the job's `rules` (see crawl_rules), a `seed_gate()` context manager
+    entered before each seed takes its tabs, and `on_seed`, called with
+    every Crawler as its seed starts.
+    """
+    seeds = ALL_SEEDS if seeds is None else seeds
+    totals = {"seeds": 0, "written": 0, "fetched": 0, "skipped_unchanged": 0}
+    if not seeds:
+        logger.log_warning("No valid seeds found.")
+        return totals
+
+    own_resources = resources is None
+    if own_resources:
+        resources = CrawlResources()
+    scheduler = resources.scheduler
+
+    # One checkpoint file per process run; service jobs keep their frontier in
+    # memory (one store per job), so the frontier strategy and what builds on
+    # it (--tiered, precheck, learned re-ranking, queue depth) work there too
+    if frontier is None and (CHECKPOINT_ENABLED or not own_resources):
+        frontier = FrontierStore(
+            CHECKPOINT_DB if own_resources else ":memory:",
+            checkpoint_interval=CHECKPOINT_INTERVAL_SEC,
+            resume=RESUME and own_resources,
+            visited_capacity=VISITED_CAPACITY,
+            visited_error_rate=VISITED_ERROR_RATE,
+        )
+    elif frontier is None and (TIERED_FETCH or INCREMENTAL or LEARNED_SCORING):
+        logger.log_info(
+            "Checkpointing is off: crawl4ai's own strategies run, so --tiered, "
+            "the --incremental precheck and learned re-ranking of the queue are not used"
+        )
 
-    semaphore = asyncio.Semaphore(BASE_CONCURRENCY)
+    catalogue = None
+    if CATALOGUE_DB:
+        catalogue = Catalogue(CATALOGUE_DB, CATALOGUE_COMMIT_SEC, run_id=run_id)
+        if run_id is None:
+            catalogue.start_run(" ".join(sys.argv[1:]), run_settings(rules))
+
+    budget = PageBudget(
+        {**crawl_rules(), **(rules or {})}["GLOBAL_MAX_PAGES"],
+        DOMAIN_MAX_PAGES,
+        budget_counter,
+    )
+    if isinstance(frontier, FrontierStore) and RESUME and budget_counter is None:
+        budget._used = frontier.total_fetched()  # pages spent before the restart
 
     async def sem_crawl(seed_dict):
-        async with semaphore:
-            crawler_instance = Crawler(seed_dict)
+        if frontier is not None:
+            state = frontier.seed_state(seed_dict["url"])
+            if state and state["status"] == "done":
+                logger.log_info(f"Skipping {seed_dict['url']} (finished before resume)")
+                return
+        async with AsyncExitStack() as slot:
+            if seed_gate is not None:
+                await slot.enter_async_context(seed_gate())
+            await slot.enter_async_context(
+                scheduler.seed_slot(seed_dict["allowed_domain"])
+            )
+            if budget.exhausted or not budget.remaining():
+                logger.log_info(f"Skipping {seed_dict['url']} (page budget spent)")
+                return
+            crawler_instance = resources.crawler(
+                seed_dict,
+                frontier=frontier,
+                budget=budget,
+                catalogue=catalogue,
+                rules=rules,
+            )
+            if on_seed is not None:
+                on_seed(crawler_instance)
+            if catalogue is not None:
+                catalogue.start_seed(
+                    seed_dict["url"], seed_dict["allowed_domain"], seed_dict["out_dir"]
+                )
+            error = None
+            status = "done"
             try:
-                print("Crawling...")
+                logger.log_debug(f"Crawling {seed_dict['url']}...")
                 await crawler_instance.crawl(seed_dict["url"])
                 # await crawler_instance.save_json()
+                if getattr(crawler_instance.strategy, "out_of_budget", False):
+                    # Stopped at its next reservation after finishing its batch
+                    error = "page budget exhausted"
+                    status = "budget"
+            except asyncio.CancelledError:
+                if not budget.exhausted:
+                    status = "cancelled"
+                    raise
+                # Cancelled by the budget: whatever was written so far stays
+                error = "page budget exhausted"
+                status = "budget"
+                crawler_instance.persist(status="done")
             except Exception as e:
+                error = str(e)
+                status = "failed"
                 logger.log_error(f"Failed crawling {seed_dict['url']}: {e}")
+            finally:
+                if catalogue is not None:
+                    catalogue.finish_seed(
+                        seed_dict["url"], status, error, **crawler_instance.counters()
+                    )
+
+            summary = {
+                "seed": seed_dict["url"],
+                "written": crawler_instance.written,
+                "fetched": crawler_instance.fetched,
+                "skipped_unchanged": crawler_instance.skipped_unchanged,
+                "error": error,
+            }
+            totals["seeds"] += 1
+            for k in ("written", "fetched", "skipped_unchanged"):
+                totals[k] += summary[k]
+            if progress:
+                progress(summary)
+
+    logger.log_info(
+        f"Starting crawl of {len(seeds)} seeds with "
+        f"per-host concurrency={BASE_CONCURRENCY}, tab budget={GLOBAL_TAB_BUDGET}"
+    )
+    run_status, run_error = "cancelled", None
+    try:
+        if own_resources:
+            await resources.start()
+        await asyncio.gather(*(sem_crawl(seed) for seed in seeds))
+        if own_resources:
+            resources.log_stats()
+        logger.log_info(f"Page budget: {budget.stats()}")
+        run_status = "done"
+    except Exception as e:
+        run_status, run_error = "failed", str(e)
+        raise
+    finally:
+        if catalogue is not None:
+            if run_id is None:
+                catalogue.finish_run(run_status, run_error)
+            catalogue.close()
+        # Final checkpoint, also on Ctrl-C / SIGTERM
+        if isinstance(frontier, FrontierStore):
+            logger.log_info(f"Visited set: {frontier.visited.stats()}")
+        if isinstance(frontier, RemoteFrontier):
+            await frontier.aclose()  # last report, off the event loop
+        elif frontier is not None:
+            frontier.close()
+        if own_resources:
+            # Merge small index segments unless sibling --workers are still writing
+            await resources.close(compact_index=budget_counter is None)
+    return totals
+
+
+# ==============================
+# Multi-process sharding (--workers)
+# ==============================
+
+
+def shard_seeds(seeds, n):
+    """Split seeds into `n` shards by domain (stable across runs, so --resume
+    and per-worker state files line up; one domain never spans two workers)."""
+    shards = [[] for _ in range(n)]
+    for seed in seeds:
+        h = hashlib.blake2b(seed["allowed_domain"].encode(), digest_size=4).digest()
+        shards[int.from_bytes(h, "big") % n].append(seed)
+    return shards
+
+
+def _worker_path(path, worker_id):
+    # frontier.sqlite -> frontier.w2.sqlite (SQLite files are per process)
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.w{worker_id}{p.suffix}"))
+
+
+def _worker_main(worker_id, seeds, settings, queue, budget_counter=None, run_id=None):
+    """Child process: own event loop, own browser pool, own state files."""
+    signal.signal(signal.SIGTERM, _terminate)
+    globals().update(settings)
+    for name in ("CHECKPOINT_DB", "RECRAWL_DB", "DEDUP_DB", "METRICS_FILE", "LOG_FILE"):
+        if globals()[name]:
+            globals()[name] = _worker_path(globals()[name], worker_id)
+    configure_logger()
+
+    def progress(summary):
+        queue.put(("seed", worker_id, summary))
+
+    try:
+        totals = asyncio.run(
+            run_scraper(
+                seeds, progress=progress, budget_counter=budget_counter, run_id=run_id
+            )
+        )
+        queue.put(("done", worker_id, totals))
+    except KeyboardInterrupt:
+        queue.put(("cancelled", worker_id, None))
+    finally:
+        logger.close()
+
+
+def _merge_worker_metrics(n):
+    """Fold metrics.wN.json of every worker into METRICS_FILE (for /metrics)."""
+    if not METRICS_FILE:
+        return
+    snaps = []
+    for i in range(n):
+        path = Path(_worker_path(METRICS_FILE, i))
+        try:
+            snaps.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue  # not written yet
+    merged = merge_snapshots(snaps)
+    if merged:
+        write_snapshot(METRICS_FILE, merged)
+
+
+def run_workers(n):
+    """Shard ALL_SEEDS over `n` processes and aggregate what they report."""
+    shards = [s for s in shard_seeds(ALL_SEEDS, n) if s]
+    settings = {
+        k: v for k, v in globals().items() if k.isupper() and k != "ALL_SEEDS"
+    }
+    ctx = multiprocessing.get_context("spawn")  # no forked asyncio/Playwright state
+    queue = ctx.Queue()
+    budget_counter = ctx.Value("q", 0)  # GLOBAL_MAX_PAGES spans all workers
+    catalogue = run_id = None
+    if CATALOGUE_DB:
+        # One catalogue run for the whole job; workers add their seeds to it
+        catalogue = Catalogue(CATALOGUE_DB, CATALOGUE_COMMIT_SEC)
+        run_id = catalogue.start_run(
+            " ".join(sys.argv[1:]), {**run_settings(), "workers": len(shards)}
+        )
+    procs = [
+        ctx.Process(
+            target=_worker_main,
+            args=(i, shard, settings, queue, budget_counter, run_id),
+            daemon=True,
+        )
+        for i, shard in enumerate(shards)
+    ]
+    print(f"Starting {len(procs)} workers for {len(ALL_SEEDS)} seeds")
+    for p in procs:
+        p.start()
+
+    totals = {"seeds": 0, "written": 0, "fetched": 0, "skipped_unchanged": 0}
+    finished = done = 0
+    run_status = "cancelled"
+    last_merge = time.monotonic()
+    try:
+        while finished < len(procs):
+            if time.monotonic() - last_merge >= METRICS_INTERVAL_SEC:
+                _merge_worker_metrics(len(shards))
+                last_merge = time.monotonic()
+            try:
+                kind, worker_id, data = queue.get(timeout=1.0)
+            except queue_mod.Empty:
+                if not any(p.is_alive() for p in procs):
+                    break
+                continue
+            if kind == "seed":
+                for k in ("written", "fetched", "skipped_unchanged"):
+                    totals[k] += data[k]
+                totals["seeds"] += 1
+                print(
+                    f"[worker {worker_id}] {data['seed']}: wrote {data['written']} "
+                    f"pages ({totals['seeds']}/{len(ALL_SEEDS)} seeds, "
+                    f"{totals['written']} pages total)"
+                )
+            else:
+                finished += 1
+                done += kind == "done"
+                print(f"[worker {worker_id}] {kind}")
+        if done == len(procs):
+            run_status = "done"
+    except KeyboardInterrupt:
+        # Ctrl-C already reached the children; GUI SIGTERM only hit us
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        raise
+    finally:
+        for p in procs:
+            p.join(timeout=30)
+            if p.is_alive():
+                p.kill()
+        _merge_worker_metrics(len(shards))
+        if catalogue is not None:
+            catalogue.finish_run(run_status)
+            catalogue.close()
+        logger.log_info(f"Workers: {totals}")
+    return totals
+
 
+# ==============================
+# Distributed mode (--coordinator / --join)
+# ==============================
+
+def _split_addr(target):
+    host, sep, port = target.rpartition(":")
+    return (host or "127.0.0.1", int(port)) if sep and port.isdigit() else None
+
+
+def run_coordinator(target):
+    """
+    Own the job: frontier, visited set and page caps live in COORDINATOR_DB
+    (or the SQLite file `target`); workers lease URL batches from it.
+    """
+    settings = {k: globals()[k] for k in SHARED_SETTINGS}
+    settings["STRATEGY"] = STRATEGY.name
+    addr = _split_addr(target)
+    coordinator = Coordinator(
+        COORDINATOR_DB if addr else target,
+        seeds=[{"url": s["url"], "priority": s.get("priority", 1.0)} for s in ALL_SEEDS],
+        settings=settings,
+        lease_ttl=LEASE_TTL_SEC,
+        resume=RESUME,
+    )
+    server = serve(coordinator, *addr, token=COORDINATOR_TOKEN) if addr else None
     print(
-        f"Starting crawl of {len(ALL_SEEDS)} seeds with concurrency={BASE_CONCURRENCY}"
+        f"Coordinating {len(ALL_SEEDS)} seeds; start workers with: "
+        f"crawl_seeded.py --join {target}"
     )
-    await asyncio.gather(*(sem_crawl(seed) for seed in ALL_SEEDS))
+    try:
+        while True:
+            time.sleep(5)
+            status = coordinator.status()
+            print(
+                f"[coordinator] workers={status['workers']} pending={status['pending']} "
+                f"in_flight={status['in_flight']} done={status['done']} "
+                f"written={status['written']}"
+            )
+            if status["finished"] and status["done"]:
+                break
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        logger.log_info(f"Coordinator: {coordinator.status()}")
+        coordinator.close()
+
+
+def run_worker(target):
+    """Stateless worker: lease URLs from the coordinator at `target` until done."""
+    global STRATEGY
+    transport = connect(target, token=COORDINATOR_TOKEN)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    info = transport.register(worker_id)
+
+    settings = dict(info["settings"])
+    STRATEGY = Mode[settings.pop("STRATEGY", STRATEGY.name)]
+    settings["GLOBAL_MAX_PAGES"] = 0  # enforced by the coordinator's leases
+    globals().update(settings)
+
+    # Output stays on this node, appended to across leases
+    seeds = []
+    for s in info["seeds"]:
+        seed = initialize_single_url(s["url"], resume=True, suffix="")
+        if seed:
+            seed["priority"] = s["priority"]
+            seeds.append(seed)
+    frontier = RemoteFrontier(transport, worker_id)
+
+    async def main():
+        await frontier.load([s["url"] for s in seeds])
+        heartbeat = asyncio.create_task(frontier.heartbeat(info["lease_ttl"]))
+        try:
+            return await run_scraper(seeds, frontier=frontier)
+        finally:
+            heartbeat.cancel()
+
+    print(f"Worker {worker_id} joined {target} ({len(seeds)} seeds)")
+    try:
+        totals = asyncio.run(main())
+        logger.log_info(f"Worker {worker_id}: {totals}")
+    finally:
+        transport.close()
+
+
+def _terminate(signum, frame):
+    # GUI /stop sends SIGTERM; unwind like Ctrl-C so the frontier is saved
+    raise KeyboardInterrupt
 
 
 if __name__ == "__main__":
@@ -439,6 +1345,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "-m", "--maxpages", help="Max pages per seed for limiting crawling", type=int
     )
+    parser.add_argument(
+        "-g",
+        "--globalmax",
+        help="Max pages for the whole job across all seeds/workers (0 = unlimited)",
+        type=int,
+    )
     parser.add_argument(
         "-b",
         "--blocked",
@@ -454,19 +1366,149 @@ if __name__ == "__main__":
         "--blockedpattern",
         help="Space Separated keywords to avoid in the URL",
     )
+    parser.add_argument(
+        "--resume",
+        help="Continue the previous (interrupted) run from its last checkpoint",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Persist frontier/visited/counters to disk (default on)",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Skip pages unchanged since the last run (ETag/Last-Modified/content hash)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--dedup",
+        help="Content-addressed md storage; exact/near duplicates share one file",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--index",
+        help="Add saved pages to the search index (scraped/_index; default on)",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--chunks",
+        help="Chunk saved pages for RAG into <out_dir>/chunks.jsonl as they arrive",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--tiered",
+        help="Fetch with plain HTTP first; use the browser only for JS-dependent pages",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Output layout: 'files' (one .md per page) or 'segments' (packed, compressed)",
+        choices=["files", "segments"],
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Shard seeds by domain over N processes (bare flag: MAX_WORKERS)",
+        type=int,
+        nargs="?",
+        const=MAX_WORKERS,
+    )
+    parser.add_argument(
+        "--coordinator",
+        help="Coordinate a distributed crawl: serve on HOST:PORT or share a SQLite file",
+        nargs="?",
+        const=COORDINATOR_ADDR,
+    )
+    parser.add_argument(
+        "--join",
+        help="Run as a worker of the coordinator at HOST:PORT (or its SQLite file)",
+    )
+    parser.add_argument(
+        "--token",
+        help="Shared secret for --coordinator/--join over TCP (default: $COORDINATOR_TOKEN); "
+        "required to serve on a non-loopback address",
+        default=os.environ.get("COORDINATOR_TOKEN"),
+    )
+    parser.add_argument(
+        "--stream",
+        help="Write pages as they arrive (flat memory); --no-stream buffers per seed",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--tabs",
+        help="Global tab budget shared by all hosts (per-host rate stays polite)",
+        type=int,
+    )
+    parser.add_argument(
+        "--browsers",
+        help="No. of warm browsers shared by all seeds (browser pool size)",
+        type=int,
+    )
+    parser.add_argument(
+        "--block",
+        help="Resources aborted while rendering: off, layout-safe (images, media, fonts) "
+        "or text-only (+ CSS); ads/analytics URLs unless off",
+        choices=["off", "layout-safe", "text-only"],
+    )
+    parser.add_argument(
+        "--smart-wait",
+        help="Capture pages once DOM/network are quiet and scroll only lazy pages; "
+        "--no-smart-wait keeps the fixed 1s delay + full-page scroll",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--learned-scoring",
+        help="BestFirst: rank links by URL/anchor weights learned from saved pages; "
+        "--no-learned-scoring keeps keyword relevance only",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--log-level",
+        help="Minimum level printed/written (DEBUG also enables crawl4ai verbose)",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        type=str.upper,
+    )
+    parser.add_argument(
+        "--log-file",
+        help="Also write JSON-lines logs to this file (bare flag: LOG_FILE)",
+        nargs="?",
+        const=LOG_FILE,
+    )
     args = parser.parse_args()
 
     if args.seedfile and not args.url:
         SEEDS_FILE = args.seedfile
 
-    if args.url:
+    RESUME = args.resume
+    if args.checkpoint is not None:
+        CHECKPOINT_ENABLED = args.checkpoint
+
+    if args.token:
+        COORDINATOR_TOKEN = args.token
+
+    if args.join:
+        ALL_SEEDS = []  # seeds and crawl rules come from the coordinator
+    elif args.url:
         if len(args.url.split(" ")) == 1:
-            ALL_SEEDS = [initialize_single_url(args.url)]
+            ALL_SEEDS = [initialize_single_url(args.url, resume=RESUME)]
             pprint(ALL_SEEDS)
         else:
-            ALL_SEEDS = args.url.split(" ")
+            ALL_SEEDS = [
+                initialize_single_url(u, resume=RESUME) for u in args.url.split(" ")
+            ]
+        ALL_SEEDS = [s for s in ALL_SEEDS if s]
     else:
-        ALL_SEEDS = initialize_seeds_vars(SEEDS_FILE)
+        ALL_SEEDS = initialize_seeds_vars(SEEDS_FILE, resume=RESUME)
 
     # The following flag is for matching content based on the given KEYWORDS
     #   Uses a simple scoring algorithm, however, hasn't been implemented properly
@@ -484,6 +1526,9 @@ if __name__ == "__main__":
     if args.maxpages is not None:
         MAX_PAGES = args.maxpages
 
+    if args.globalmax is not None:
+        GLOBAL_MAX_PAGES = args.globalmax
+
     if args.blocked is not None:
         BLOCKED_DOMAINS = args.blocked.split(" ")
 
@@ -507,10 +1552,69 @@ if __name__ == "__main__":
     if not (args.urlpattern or args.blockedpattern):
         STRATEGY = Mode.BFS_STRATEGY
 
-    if not args.seedfile:
-        BASE_CONCURRENCY = 1
+    if args.incremental:
+        INCREMENTAL = True
+
+    if args.dedup is not None:
+        DEDUP_ENABLED = args.dedup
+
+    if args.index is not None:
+        SEARCH_INDEX = args.index
+
+    if args.chunks is not None:
+        CHUNKS_ENABLED = args.chunks
+
+    if args.tiered is not None:
+        TIERED_FETCH = args.tiered
+
+    if args.output:
+        OUTPUT_BACKEND = args.output
+
+    if args.stream is not None:
+        STREAM_RESULTS = args.stream
+
+    if args.tabs is not None:
+        GLOBAL_TAB_BUDGET = args.tabs
+
+    if args.browsers is not None:
+        POOL_BROWSERS = args.browsers
+
+    if args.block:
+        BLOCK_PROFILE = args.block
+
+    if args.smart_wait is not None:
+        SMART_WAIT = args.smart_wait
+
+    if args.learned_scoring is not None:
+        LEARNED_SCORING = args.learned_scoring
+
+    if args.log_level:
+        LOG_LEVEL = args.log_level
+
+    if args.log_file:
+        LOG_FILE = args.log_file
+        LOG_TO_FILE = True
+    configure_logger()
+
+    signal.signal(signal.SIGTERM, _terminate)
+
+    workers = min(args.workers or 1, MAX_WORKERS, max(1, len(ALL_SEEDS)))
+
+    if args.join:
+        try:
+            run_worker(args.join)
+        except KeyboardInterrupt:
+            print("\nWorker stopped; its leases return to the queue.")
+        raise SystemExit(0)
 
     try:
-        asyncio.run(run_scraper())
+        if args.coordinator:
+            run_coordinator(args.coordinator)
+        elif workers > 1:
+            run_workers(workers)
+        else:
+            asyncio.run(run_scraper())
     except KeyboardInterrupt:
         print("\nCancelled by user.")
+        if CHECKPOINT_ENABLED:
+            print("Progress saved; rerun with --resume to continue.")
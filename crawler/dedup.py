@@ -0,0 +1,168 @@
+# dedup.py
+# Content-addressed markdown storage with optional SimHash near-duplicate
+# detection
+
+import asyncio
+import hashlib
+import re
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_MASK64 = (1 << 64) - 1
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles (template-only edits flip few bits)."""
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle:
+        words = words + [""] * (shingle - len(words))
+    weights = [0] * 64
+    for i in range(len(words) - shingle + 1):
+        feature = " ".join(words[i : i + shingle]).encode("utf-8")
+        h = int.from_bytes(hashlib.blake2b(feature, digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    out = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            out |= 1 << bit
+    return out
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _to_signed(v: int) -> int:
+    # sqlite INTEGER is signed 64-bit
+    return v - (1 << 64) if v >= (1 << 63) else v
+
+
+class ContentStore:
+    """
+    Markdown is written once per distinct content as `<md_dir>/<sha256>.md`;
+    every URL with exactly the same markdown points at that blob.
+
+    With `max_distance > 0` near duplicates are also detected with SimHash,
+    but only reported: the page still gets its own blob and `put` returns
+    the blob it resembles (`near_of`), since pages sharing a long template
+    can sit within a few bits of each other while differing in substance.
+    The hash is split into `max_distance + 1` bands, so any candidate within
+    range collides with at least one band (pigeonhole) and lookups stay
+    O(bucket) instead of O(all pages).
+    """
+
+    def __init__(self, path, max_distance: int = 0):
+        self.max_distance = max(0, max_distance)
+        self.near_enabled = self.max_distance > 0
+        self.bands = self.max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                scope TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                simhash INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (scope, sha)
+            )
+            """
+        )
+        self.conn.commit()
+        self._bands = {}  # scope -> [ {band_value: [(simhash, path)]} ]
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.blobs_written = 0
+
+    def _band_keys(self, h: int):
+        width = self.band_bits
+        for i in range(self.bands):
+            yield i, (h >> (i * width)) & ((1 << width) - 1)
+
+    def _scope_index(self, scope: str):
+        index = self._bands.get(scope)
+        if index is None:
+            index = [defaultdict(list) for _ in range(self.bands)]
+            for sh, path in self.conn.execute(
+                "SELECT simhash, path FROM blobs WHERE scope = ?", (scope,)
+            ):
+                self._index(index, sh & _MASK64, path)
+            self._bands[scope] = index
+        return index
+
+    def _index(self, index, h: int, path: str):
+        for i, key in self._band_keys(h):
+            index[i][key].append((h, path))
+
+    def _near(self, index, h: int):
+        best = None
+        for i, key in self._band_keys(h):
+            for other, path in index[i].get(key, ()):
+                d = hamming(h, other)
+                if d <= self.max_distance and (best is None or d < best[0]):
+                    best = (d, path)
+        return best[1] if best else None
+
+    async def fingerprint(self, md: str) -> int | None:
+        """SimHash of `md` computed off the event loop; None if near matching is off."""
+        if not self.near_enabled:
+            return None
+        return await asyncio.to_thread(simhash, md)
+
+    def put(
+        self, md_dir: Path, md: str, fingerprint: int | None = None
+    ) -> tuple[Path, str, str | None, str | None]:
+        """
+        Store `md` under `md_dir`; returns (blob path, sha256, duplicate kind,
+        near_of) where kind is None (new blob), "exact" (shared blob) or
+        "near" (own blob, `near_of` is the similar one). `fingerprint` is a
+        precomputed SimHash (see `fingerprint()`).
+        """
+        scope = str(md_dir)
+        sha = hashlib.sha256(md.encode("utf-8")).hexdigest()
+        row = self.conn.execute(
+            "SELECT path FROM blobs WHERE scope = ? AND sha = ?", (scope, sha)
+        ).fetchone()
+        if row and Path(row[0]).exists():
+            self.exact_hits += 1
+            return Path(row[0]), sha, "exact", None
+
+        h, near_of, index = 0, None, None
+        if self.near_enabled:
+            index = self._scope_index(scope)
+            h = fingerprint if fingerprint is not None else simhash(md)
+            near = self._near(index, h)
+            if near and Path(near).exists():
+                self.near_hits += 1
+                near_of = near
+
+        path = Path(md_dir) / f"{sha}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            path.write_text(md, encoding="utf-8")
+            self.blobs_written += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO blobs (scope, sha, simhash, path) VALUES (?, ?, ?, ?)",
+            (scope, sha, _to_signed(h), str(path.as_posix())),
+        )
+        if index is not None:
+            self._index(index, h, str(path.as_posix()))
+        return path, sha, ("near" if near_of else None), near_of
+
+    def stats(self) -> dict:
+        return {
+            "blobs_written": self.blobs_written,
+            "exact_duplicates": self.exact_hits,
+            "near_duplicates": self.near_hits,
+        }
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,569 @@
+# distributed.py
+# Coordinator/worker crawl mode: one coordinator owns the frontier, the visited
+# set and the page budget; stateless workers on any node lease URL batches.
+#
+# Transports (anything with the Coordinator.RPC methods works):
+#   Coordinator(path)          -> workers on the same machine share the SQLite file
+#   SocketTransport(host:port) -> JSON-lines RPC to `serve(coordinator, ...)`,
+#                                 authenticated by a shared token off loopback
+
+import asyncio
+import hmac
+import ipaddress
+import json
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from frontier import PENDING, IN_FLIGHT, DONE, SKIPPED
+
+COUNTERS = ("written", "pages_crawled", "fetched")
+
+
+class Coordinator:
+    """
+    Job state for a distributed crawl, kept in one SQLite file.
+
+    - `lease` hands a worker up to `n` pending URLs of a seed, marked
+      IN_FLIGHT until `lease_ttl` seconds from now; `renew` extends them
+    - expired leases (dead or stuck workers) are re-queued on the next lease
+    - the visited set is the frontier's primary key: workers just `report`
+      discovered links and duplicates are dropped here
+    - the per-seed MAX_PAGES and job-wide GLOBAL_MAX_PAGES caps count leased
+      and finished URLs, so workers never fetch past them
+
+    Every method is one short transaction, so several processes may open the
+    same file (the local SQLite transport) and threads may share one instance.
+    """
+
+    RPC = ("register", "lease", "renew", "report", "count", "seed_state", "status")
+
+    def __init__(
+        self,
+        path,
+        seeds=None,
+        settings=None,
+        lease_ttl: float = 60.0,
+        resume: bool = False,
+    ):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS seeds (
+                seed TEXT PRIMARY KEY,
+                priority REAL NOT NULL DEFAULT 1,
+                written INTEGER NOT NULL DEFAULT 0,
+                pages_crawled INTEGER NOT NULL DEFAULT 0,
+                fetched INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                seed TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                score REAL NOT NULL DEFAULT 0,
+                parent TEXT,
+                state INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until REAL,
+                PRIMARY KEY (seed, url)
+            );
+            CREATE INDEX IF NOT EXISTS frontier_queue
+                ON frontier (seed, state, depth, score);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker TEXT PRIMARY KEY,
+                joined REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            """
+        )
+        if seeds is not None:
+            # Coordinator process: (re)initialise the job
+            with self._tx():
+                if not resume:
+                    for table in ("meta", "seeds", "frontier", "workers"):
+                        self.conn.execute(f"DELETE FROM {table}")
+                self._set_meta("settings", settings or {})
+                self._set_meta("lease_ttl", lease_ttl)
+                for seed in seeds:
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO seeds (seed, priority) VALUES (?, ?)",
+                        (seed["url"], seed.get("priority", 1.0)),
+                    )
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO frontier (seed, url, depth) VALUES (?, ?, 0)",
+                        (seed["url"], seed["url"]),
+                    )
+        self.settings = self._get_meta("settings", {})
+        self.lease_ttl = float(self._get_meta("lease_ttl", lease_ttl))
+
+    # --- plumbing ---
+    @contextmanager
+    def _tx(self):
+        # IMMEDIATE: take the write lock up front so concurrent processes
+        # sharing the file queue up instead of failing mid-transaction
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, json.dumps(value)),
+        )
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _scalar(self, sql, *params):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def _reap(self, now: float) -> int:
+        """Re-queue URLs whose lease ran out (the worker died or hung)."""
+        return self.conn.execute(
+            "UPDATE frontier SET state = ?, worker = NULL, lease_until = NULL "
+            "WHERE state = ? AND lease_until < ?",
+            (PENDING, IN_FLIGHT, now),
+        ).rowcount
+
+    def _room(self, seed: str) -> int:
+        """Pages `seed` may still lease under MAX_PAGES / GLOBAL_MAX_PAGES."""
+        room = 1 << 30  # no cap configured
+        claimed = "state IN (?, ?, ?)"
+        max_pages = self.settings.get("MAX_PAGES")
+        if max_pages:
+            room = max_pages - self._scalar(
+                f"SELECT COUNT(*) FROM frontier WHERE seed = ? AND {claimed}",
+                seed, IN_FLIGHT, DONE, SKIPPED,
+            )
+        total = self.settings.get("GLOBAL_MAX_PAGES")
+        if total:
+            room = min(
+                room,
+                total - self._scalar(
+                    f"SELECT COUNT(*) FROM frontier WHERE {claimed}",
+                    IN_FLIGHT, DONE, SKIPPED,
+                ),
+            )
+        return max(0, room)
+
+    # --- RPC ---
+    def register(self, worker: str) -> dict:
+        now = time.time()
+        with self._lock, self._tx():
+            self.conn.execute(
+                "INSERT INTO workers (worker, joined, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET last_seen = excluded.last_seen",
+                (worker, now, now),
+            )
+            seeds = self.conn.execute(
+                "SELECT seed, priority FROM seeds ORDER BY rowid"
+            ).fetchall()
+        return {
+            "settings": self.settings,
+            "seeds": [{"url": s, "priority": p} for s, p in seeds],
+            "lease_ttl": self.lease_ttl,
+        }
+
+    def lease(self, worker: str, seed: str, n: int, best_first: bool = True) -> dict:
+        """
+        Up to `n` (url, depth, score, parent) rows of `seed`. `active` tells an
+        empty-handed worker whether to poll again: other workers still hold
+        leases whose links (or, if they die, URLs) may come back.
+        """
+        now = time.time()
+        order = "score DESC, depth ASC" if best_first else "depth ASC, score DESC"
+        with self._lock, self._tx():
+            self._reap(now)
+            n = min(n, self._room(seed))
+            rows = []
+            if n > 0:
+                rows = self.conn.execute(
+                    "SELECT url, depth, score, parent FROM frontier "
+                    f"WHERE seed = ? AND state = ? ORDER BY {order} LIMIT ?",
+                    (seed, PENDING, n),
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE frontier SET state = ?, worker = ?, lease_until = ? "
+                    "WHERE seed = ? AND url = ?",
+                    ((IN_FLIGHT, worker, now + self.lease_ttl, seed, r[0]) for r in rows),
+                )
+            in_flight = self._scalar(
+                "SELECT COUNT(*) FROM frontier WHERE seed = ? AND state = ?",
+                seed, IN_FLIGHT,
+            )
+            self.conn.execute(
+                "UPDATE workers SET last_seen = ? WHERE worker = ?", (now, worker)
+            )
+        return {"rows": rows, "active": bool(rows) or in_flight > 0}
+
+    def renew(self, worker: str) -> int:
+        now = time.time()
+        with self._lock, self._tx():
+            self.conn.execute(
+                "UPDATE workers SET last_seen = ? WHERE worker = ?", (now, worker)
+            )
+            return self.conn.execute(
+                "UPDATE frontier SET lease_until = ? WHERE worker = ? AND state = ?",
+                (now + self.lease_ttl, worker, IN_FLIGHT),
+            ).rowcount
+
+    def report(self, worker: str, updates: dict) -> None:
+        """
+        Apply a worker's buffered progress, per seed:
+        {"add": [[url, depth, score, parent], ...], "done": [url, ...],
+         "skipped": [url, ...], "counters": {"written": +n, ...}}
+        """
+        with self._lock, self._tx():
+            for seed, u in updates.items():
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO frontier (seed, url, depth, score, parent) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    ((seed, *row) for row in u.get("add", ())),
+                )
+                self.conn.executemany(
+                    "UPDATE frontier SET state = ?, worker = NULL, lease_until = NULL "
+                    "WHERE seed = ? AND url = ?",
+                    [
+                        *((DONE, seed, url) for url in u.get("done", ())),
+                        *((SKIPPED, seed, url) for url in u.get("skipped", ())),
+                    ],
+                )
+                counters = {k: v for k, v in u.get("counters", {}).items() if k in COUNTERS}
+                if counters:
+                    cols = ", ".join(f"{k} = {k} + ?" for k in counters)
+                    self.conn.execute(
+                        f"UPDATE seeds SET {cols} WHERE seed = ?",
+                        (*counters.values(), seed),
+                    )
+
+    def count(self, seed: str, state: int) -> int:
+        with self._lock:
+            return self._scalar(
+                "SELECT COUNT(*) FROM frontier WHERE seed = ? AND state = ?", seed, state
+            )
+
+    def seed_state(self, seed: str) -> dict | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT written, pages_crawled, fetched FROM seeds WHERE seed = ?",
+                (seed,),
+            ).fetchone()
+            if not row:
+                return None
+            counts = dict(
+                self.conn.execute(
+                    "SELECT state, COUNT(*) FROM frontier WHERE seed = ? GROUP BY state",
+                    (seed,),
+                ).fetchall()
+            )
+            finished = not counts.get(IN_FLIGHT) and (
+                not counts.get(PENDING) or not self._room(seed)
+            )
+        state = dict(zip(COUNTERS, row))
+        ended = counts.get(DONE, 0) + counts.get(SKIPPED, 0)
+        state["status"] = "done" if finished and ended else "running"
+        return state
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            counts = dict(
+                self.conn.execute(
+                    "SELECT state, COUNT(*) FROM frontier GROUP BY state"
+                ).fetchall()
+            )
+            seeds = [s for (s,) in self.conn.execute("SELECT seed FROM seeds")]
+            open_seeds = sum(
+                1
+                for s in seeds
+                if self._scalar(
+                    "SELECT COUNT(*) FROM frontier WHERE seed = ? AND state = ?",
+                    s, PENDING,
+                )
+                and self._room(s)
+            )
+            totals = self.conn.execute(
+                "SELECT COALESCE(SUM(written), 0), COALESCE(SUM(fetched), 0) FROM seeds"
+            ).fetchone()
+            live = self._scalar(
+                "SELECT COUNT(*) FROM workers WHERE last_seen >= ?",
+                now - self.lease_ttl,
+            )
+        return {
+            "pending": counts.get(PENDING, 0),
+            "in_flight": counts.get(IN_FLIGHT, 0),
+            "done": counts.get(DONE, 0) + counts.get(SKIPPED, 0),
+            "written": totals[0],
+            "fetched": totals[1],
+            "workers": live,
+            "finished": not counts.get(IN_FLIGHT) and not open_seeds,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+# ==============================
+# Socket transport
+# ==============================
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # a hostname: may resolve to any interface
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        token = self.server.token
+        for line in self.rfile:
+            try:
+                req = json.loads(line)
+                if token and not hmac.compare_digest(str(req.get("token", "")), token):
+                    raise PermissionError("bad or missing token")
+                if req["op"] not in Coordinator.RPC:
+                    raise ValueError(f"unknown op {req['op']!r}")
+                result = getattr(coordinator, req["op"])(*req.get("args", ()))
+                resp = {"ok": result}
+            except Exception as e:
+                resp = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(resp) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(coordinator: Coordinator, host: str, port: int, token: str = ""):
+    """
+    Start the JSON-lines RPC server on a background thread; returns it.
+    Every request must carry `token` when one is set; binding anything but
+    a loopback address without one is refused, since any client reaching
+    the port could otherwise lease, report and read the whole job.
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(
+            f"refusing to serve the coordinator on {host}:{port} without a token "
+            "(set COORDINATOR_TOKEN or pass --token)"
+        )
+    server = _Server((host, port), _Handler)
+    server.coordinator = coordinator
+    server.token = token
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class SocketTransport:
+    """Client side of `serve`: same methods as Coordinator, over TCP."""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0, token: str = ""):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.token = token
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def _call(self, op: str, *args):
+        req = {"op": op, "args": args}
+        if self.token:
+            req["token"] = self.token
+        payload = (json.dumps(req) + "\n").encode("utf-8")
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._file.write(payload)
+                    self._file.flush()
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("coordinator closed the connection")
+                    break
+                except OSError:
+                    self.close()
+                    if attempt == 2:
+                        raise
+        resp = json.loads(line)
+        if "error" in resp:
+            raise RuntimeError(f"coordinator: {resp['error']}")
+        return resp["ok"]
+
+    def __getattr__(self, op):
+        if op not in Coordinator.RPC:
+            raise AttributeError(op)
+        return lambda *args: self._call(op, *args)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+
+def connect(target: str, token: str = ""):
+    """`host:port` -> SocketTransport; anything else is a coordinator SQLite file."""
+    host, sep, port = target.rpartition(":")
+    if sep and port.isdigit():
+        return SocketTransport(host or "127.0.0.1", int(port), token=token)
+    return Coordinator(target)
+
+
+# ==============================
+# Worker side
+# ==============================
+
+
+class RemoteFrontier:
+    """
+    FrontierStore stand-in for a worker: FrontierCrawlStrategy and Crawler
+    run unchanged, but pops become leases on the coordinator and discovered
+    links, finished URLs and counter deltas are buffered and reported in one
+    call every `flush_interval` seconds (and before every lease).
+
+    Every transport call runs on one background thread, in submission
+    order, so RPCs never block the event loop and a report always lands
+    before the lease that follows it. Seed states are read once up front
+    (`load`); `count` is a coroutine, like `pop`.
+    """
+
+    def __init__(self, transport, worker: str, flush_interval: float = 2.0, poll_sec: float = 1.0):
+        self.transport = transport
+        self.worker = worker
+        self.flush_interval = flush_interval
+        self.poll_sec = poll_sec
+        self._updates = defaultdict(
+            lambda: {"add": [], "done": [], "skipped": [], "counters": {}}
+        )
+        self._baseline = {}  # seed -> counters as last reported
+        self._states = {}  # seed -> coordinator's seed_state, from load()
+        self._reports = []  # report() futures not yet awaited
+        self._rpc = ThreadPoolExecutor(max_workers=1, thread_name_prefix="coordinator-rpc")
+        self._last_flush = time.monotonic()
+
+    def _call(self, op: str, *args):
+        """Run one transport call on the RPC thread; returns an awaitable."""
+        return asyncio.wrap_future(self._rpc.submit(getattr(self.transport, op), *args))
+
+    async def load(self, seeds):
+        """Fetch the coordinator's state of every seed this worker may crawl."""
+        for seed in seeds:
+            self._states[seed] = await self._call("seed_state", seed)
+
+    # --- buffered writes ---
+    def flush(self):
+        if self._updates:
+            updates, self._updates = dict(self._updates), defaultdict(
+                lambda: {"add": [], "done": [], "skipped": [], "counters": {}}
+            )
+            self._reports.append(self._rpc.submit(self.transport.report, self.worker, updates))
+        self._last_flush = time.monotonic()
+
+    checkpoint = flush
+
+    def maybe_checkpoint(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    async def _reported(self):
+        """Wait for queued reports; raises if one of them failed."""
+        reports, self._reports = self._reports, []
+        for future in reports:
+            await asyncio.wrap_future(future)
+
+    async def aclose(self):
+        self.flush()
+        try:
+            await self._reported()
+        finally:
+            self._rpc.shutdown(wait=False)
+
+    def close(self):
+        """Blocking variant of `aclose` for callers without a loop."""
+        self.flush()
+        self._rpc.shutdown(wait=True)
+        for future in self._reports:
+            future.result()
+        self._reports = []
+
+    # --- FrontierStore interface ---
+    def seed_state(self, seed: str) -> dict | None:
+        state = self._states.get(seed)
+        if state:
+            self._baseline[seed] = {k: state[k] for k in COUNTERS}
+        return state
+
+    def update_seed(self, seed: str, status=None, **counters):
+        # Several workers may crawl one seed: report increments, not totals
+        base = self._baseline.setdefault(seed, dict.fromkeys(COUNTERS, 0))
+        pending = self._updates[seed]["counters"]
+        for k, v in counters.items():
+            if k in COUNTERS and v != base.get(k, 0):
+                pending[k] = pending.get(k, 0) + v - base.get(k, 0)
+                base[k] = v
+
+    def known(self, seed: str, url: str) -> bool:
+        return False  # the coordinator drops already-known URLs on report
+
+    def add(self, seed: str, rows) -> int:
+        rows = [list(r) for r in rows]
+        self._updates[seed]["add"].extend(rows)
+        return len(rows)
+
+    def done(self, seed: str, url: str, ok: bool = True):
+        self._updates[seed]["done" if ok else "skipped"].append(url)
+
+    async def count(self, seed: str, state: int) -> int:
+        return await self._call("count", seed, state)
+
+    async def pop(self, seed: str, n: int, best_first: bool) -> list[tuple]:
+        """Lease a batch; waits while other workers may still produce work."""
+        while True:
+            self.flush()  # new links must be visible before leasing
+            await self._reported()
+            res = await self._call("lease", self.worker, seed, n, best_first)
+            if res["rows"] or not res["active"]:
+                return [tuple(r) for r in res["rows"]]
+            await asyncio.sleep(self.poll_sec)
+
+    async def heartbeat(self, lease_ttl: float):
+        """Keep this worker's leases alive while long batches are rendering."""
+        while True:
+            await asyncio.sleep(max(1.0, lease_ttl / 3))
+            try:
+                await self._call("renew", self.worker)
+            except Exception:
+                pass  # transient; the next beat (or the lease itself) retries
@@ -0,0 +1,166 @@
+# fetcher.py
+# Tiered fetching: plain HTTP first, headless browser only when the page needs JS
+
+import asyncio
+import statistics
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from crawl4ai import AsyncWebCrawler, CrawlResult, HTTPCrawlerConfig
+from crawl4ai.async_crawler_strategy import AsyncHTTPCrawlerStrategy
+
+from helper import status_of
+
+# Tell-tale signs of a client-rendered shell (checked on lowercased HTML)
+SPA_MARKERS = (
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    'id="__next"',
+    "window.__nuxt__",
+    "data-reactroot",
+    "ng-app",
+    "ng-version",
+    "enable javascript",
+    "you need to enable javascript",
+)
+
+
+def needs_browser(r, min_chars: int = 500) -> bool:
+    """Heuristic: does this HTTP-tier result have to be re-rendered in Chromium?"""
+    if not r or not getattr(r, "success", False):
+        return True
+    status = status_of(r)
+    if status and status >= 400:
+        return True  # may be a bot wall that the stealth browser gets past
+    html = (getattr(r, "html", None) or "").lower()
+    if any(m in html for m in SPA_MARKERS):
+        return True
+    md = str(getattr(r, "markdown", None) or "")
+    return len(md.strip()) < min_chars
+
+
+class _TierStats:
+    def __init__(self):
+        self.pages = 0
+        self.latencies = []  # seconds
+
+    def add(self, sec: float):
+        self.pages += 1
+        self.latencies.append(sec)
+        if len(self.latencies) > 10_000:  # keep memory flat on huge runs
+            self.latencies = self.latencies[-5_000:]
+
+    def summary(self) -> dict:
+        lat = self.latencies
+        return {
+            "pages": self.pages,
+            "mean_ms": round(statistics.fmean(lat) * 1000, 1) if lat else None,
+            "p50_ms": round(statistics.median(lat) * 1000, 1) if lat else None,
+        }
+
+
+class TieredFetcher:
+    """
+    Fetches a batch of URLs through a pooled keep-alive HTTP client first
+    (crawl4ai's AsyncHTTPCrawlerStrategy, same scraping/markdown pipeline) and
+    escalates to the headless browser only when `needs_browser` says so.
+    """
+
+    def __init__(
+        self,
+        user_agent: str,
+        http_concurrency: int = 16,
+        min_chars: int = 500,
+        scheduler=None,
+    ):
+        self.http_cfg = HTTPCrawlerConfig(
+            method="GET",
+            headers={"User-Agent": user_agent},
+            follow_redirects=True,
+        )
+        self.min_chars = min_chars
+        self.scheduler = scheduler  # HTTP requests bypass the before_goto hook
+        self._http_sem = asyncio.Semaphore(http_concurrency)
+        self.http = None
+        self.tiers = {"http": _TierStats(), "browser": _TierStats()}
+        self.escalated = 0
+        self.failed = 0  # browser-tier exceptions turned into failed results
+
+    async def start(self):
+        self.http = AsyncWebCrawler(
+            crawler_strategy=AsyncHTTPCrawlerStrategy(browser_config=self.http_cfg)
+        )
+        await self.http.start()
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.close()
+            self.http = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _timed(self, tier: str, crawler, url: str, config):
+        paced = (
+            self.scheduler.request(urlsplit(url).netloc)
+            if tier == "http" and self.scheduler
+            else nullcontext()
+        )
+        async with self._http_sem if tier == "http" else nullcontext(), paced:
+            t0 = time.monotonic()
+            try:
+                result = await crawler.arun(url=url, config=config)
+            except Exception as e:
+                if tier == "http":
+                    return url, None  # escalate
+                # One bad URL must not take the seed's whole batch down
+                self.failed += 1
+                return url, CrawlResult(
+                    url=url, html="", success=False, error_message=f"browser: {e!r}"
+                )
+            self.tiers[tier].add(time.monotonic() - t0)
+        return url, result
+
+    async def fetch_many(self, urls, browser_crawler, config, browser_concurrency: int = 2):
+        """Async iterator over results for `urls`, tagged with metadata["tier"]."""
+        config = config.clone(deep_crawl_strategy=None, stream=False)
+
+        escalate = []
+        for fut in asyncio.as_completed(
+            [self._timed("http", self.http, u, config) for u in urls]
+        ):
+            url, r = await fut
+            if needs_browser(r, self.min_chars):
+                escalate.append(url)
+                continue
+            r.metadata = r.metadata or {}
+            r.metadata["tier"] = "http"
+            yield r
+
+        if not escalate:
+            return
+        self.escalated += len(escalate)
+        sem = asyncio.Semaphore(max(1, browser_concurrency))
+
+        async def _browser(url):
+            async with sem:
+                return await self._timed("browser", browser_crawler, url, config)
+
+        for fut in asyncio.as_completed([_browser(u) for u in escalate]):
+            _, r = await fut
+            r.metadata = r.metadata or {}
+            r.metadata["tier"] = "browser"
+            yield r
+
+    def stats(self) -> dict:
+        return {
+            "http": self.tiers["http"].summary(),
+            "browser": self.tiers["browser"].summary(),
+            "escalated": self.escalated,
+            "failed": self.failed,
+        }
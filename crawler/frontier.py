@@ -0,0 +1,428 @@
+# frontier.py
+# SQLite-backed crawl frontier with periodic checkpoints (enables --resume)
+
+import asyncio
+import math
+import sqlite3
+import time
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+from crawl4ai.deep_crawling import DeepCrawlStrategy, FilterChain
+
+from helper import _normalize_url
+from visited import VisitedSet
+
+PENDING, IN_FLIGHT, DONE = 0, 1, 2
+SKIPPED = 3  # finished without a successful fetch (error, unchanged, unanswered)
+
+
+class FrontierStore:
+    """
+    On-disk frontier, visited set and per-seed counters for a whole run.
+
+    Writes go into an open transaction that is committed every
+    `checkpoint_interval` seconds (and on close), so a crash loses at most one
+    interval of progress. Rows left IN_FLIGHT by a crash are re-queued on open.
+
+    `known` goes through a VisitedSet: URLs the Bloom filter has never seen
+    (the vast majority of discovered links) are answered without touching
+    SQLite; hits are confirmed against the frontier table.
+    """
+
+    def __init__(
+        self,
+        path,
+        checkpoint_interval: float = 5.0,
+        resume: bool = False,
+        visited_capacity: int = 1_000_000,
+        visited_error_rate: float = 0.01,
+    ):
+        self.path = str(path)
+        self.checkpoint_interval = checkpoint_interval
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seeds (
+                seed TEXT PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                written INTEGER NOT NULL DEFAULT 0,
+                pages_crawled INTEGER NOT NULL DEFAULT 0,
+                fetched INTEGER NOT NULL DEFAULT 0,
+                updated REAL
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                seed TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                score REAL NOT NULL DEFAULT 0,
+                parent TEXT,
+                state INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (seed, url)
+            );
+            CREATE INDEX IF NOT EXISTS frontier_queue
+                ON frontier (seed, state, depth, score);
+            """
+        )
+        if resume:
+            self.conn.execute(
+                "UPDATE frontier SET state = ? WHERE state = ?", (PENDING, IN_FLIGHT)
+            )
+        else:
+            self.conn.execute("DELETE FROM frontier")
+            self.conn.execute("DELETE FROM seeds")
+        self.conn.commit()
+        self._last_checkpoint = time.monotonic()
+
+        self.visited = VisitedSet(
+            self._known_exact, capacity=visited_capacity, error_rate=visited_error_rate
+        )
+        for seed, url in self.conn.execute("SELECT seed, url FROM frontier"):
+            self.visited.add(f"{seed} {url}")
+
+    # --- checkpoints ---
+    def checkpoint(self):
+        self.conn.commit()
+        self._last_checkpoint = time.monotonic()
+
+    def maybe_checkpoint(self):
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def close(self):
+        self.checkpoint()
+        self.conn.close()
+
+    # --- seeds ---
+    def seed_state(self, seed: str) -> dict | None:
+        row = self.conn.execute(
+            "SELECT status, written, pages_crawled, fetched FROM seeds WHERE seed = ?",
+            (seed,),
+        ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("status", "written", "pages_crawled", "fetched"), row))
+
+    def update_seed(self, seed: str, **fields):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO seeds (seed) VALUES (?)", (seed,)
+        )
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self.conn.execute(
+            f"UPDATE seeds SET {cols} WHERE seed = ?", (*fields.values(), seed)
+        )
+
+    # --- frontier ---
+    def add(self, seed: str, rows) -> int:
+        """Queue (url, depth, score, parent) rows; already known URLs are ignored."""
+        rows = list(rows)
+        cur = self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (seed, url, depth, score, parent) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((seed, *row) for row in rows),
+        )
+        for row in rows:
+            self.visited.add(f"{seed} {row[0]}")
+        return cur.rowcount
+
+    def _known_exact(self, key: str) -> bool:
+        seed, url = key.split(" ", 1)
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM frontier WHERE seed = ? AND url = ?", (seed, url)
+            ).fetchone()
+            is not None
+        )
+
+    def known(self, seed: str, url: str) -> bool:
+        return f"{seed} {url}" in self.visited
+
+    def pop(self, seed: str, n: int, best_first: bool) -> list[tuple]:
+        """Lease up to `n` pending URLs (marked IN_FLIGHT until `done`)."""
+        order = "score DESC, depth ASC" if best_first else "depth ASC, score DESC"
+        rows = self.conn.execute(
+            "SELECT url, depth, score, parent FROM frontier "
+            f"WHERE seed = ? AND state = ? ORDER BY {order} LIMIT ?",
+            (seed, PENDING, n),
+        ).fetchall()
+        self.conn.executemany(
+            "UPDATE frontier SET state = ? WHERE seed = ? AND url = ?",
+            ((IN_FLIGHT, seed, r[0]) for r in rows),
+        )
+        return rows
+
+    def rescore(self, seed: str, score_many, limit: int = 5000) -> int:
+        """Re-rank up to `limit` pending URLs of `seed` (shallowest first)."""
+        urls = [
+            url
+            for (url,) in self.conn.execute(
+                "SELECT url FROM frontier WHERE seed = ? AND state = ? "
+                "ORDER BY depth LIMIT ?",
+                (seed, PENDING, limit),
+            )
+        ]
+        if urls:
+            self.conn.executemany(
+                "UPDATE frontier SET score = ? WHERE seed = ? AND url = ?",
+                ((score, seed, url) for url, score in zip(urls, score_many(urls))),
+            )
+        return len(urls)
+
+    def done(self, seed: str, url: str, ok: bool = True):
+        """Finish a leased URL; `ok` is False when it yielded no successful page."""
+        self.conn.execute(
+            "UPDATE frontier SET state = ? WHERE seed = ? AND url = ?",
+            (DONE if ok else SKIPPED, seed, url),
+        )
+
+    def total_fetched(self) -> int:
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(fetched), 0) FROM seeds"
+        ).fetchone()[0]
+
+    def count(self, seed: str, state: int) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE seed = ? AND state = ?",
+            (seed, state),
+        ).fetchone()[0]
+
+
+class FrontierCrawlStrategy(DeepCrawlStrategy):
+    """
+    Deep-crawl strategy whose frontier and visited set live in a FrontierStore
+    instead of local variables, so an interrupted seed picks up where it left
+    off. Orders the queue breadth-first (depth, then score) or best-first
+    (score, then depth), mirroring BFSDeepCrawlStrategy/BestFirstCrawlingStrategy.
+    """
+
+    def __init__(
+        self,
+        store: FrontierStore,
+        seed: str,
+        max_depth: int,
+        max_pages: int = math.inf,
+        filter_chain: FilterChain = FilterChain(),
+        url_scorer=None,
+        best_first: bool = True,
+        score_threshold: float = -math.inf,
+        include_external: bool = False,
+        batch_size: int = 10,
+        precheck=None,
+        fetcher=None,
+        budget=None,
+        rescore_every: int = 0,
+        logger=None,
+    ):
+        self.store = store
+        self.seed = seed
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.filter_chain = filter_chain
+        self.url_scorer = url_scorer
+        self.best_first = best_first
+        self.score_threshold = score_threshold
+        self.include_external = include_external
+        self.batch_size = max(1, batch_size)
+        self.precheck = precheck  # e.g. recrawl.ConditionalPrecheck
+        self.fetcher = fetcher  # e.g. fetcher.TieredFetcher; None -> browser only
+        self.budget = budget  # e.g. budget.PageBudget, reserved before each batch
+        # Learning scorers (linkscore.LinkScorer): re-rank the pending queue
+        # after this many updates; 0 keeps scores from enqueue time
+        self.rescore_every = rescore_every
+        self._rescored_at = 0
+        self.domain = urlsplit(seed).netloc
+        self.logger = logger
+        self._pages_crawled = 0
+        self.skipped_unchanged = 0
+        self.out_of_budget = False  # stopped because reserve() granted nothing
+        self.pending = 0  # URLs queued for this seed (approximate; for metrics)
+        self._cancel_event = asyncio.Event()
+
+    def __repr__(self):
+        order = "best-first" if self.best_first else "bfs"
+        return (
+            f"FrontierCrawlStrategy({order}, max_depth={self.max_depth}, "
+            f"max_pages={self.max_pages})"
+        )
+
+    async def can_process_url(self, url: str, depth: int) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            return False
+        if depth != 0 and not await self.filter_chain.apply(url):
+            return False
+        return True
+
+    async def link_discovery(
+        self, result, source_url, current_depth, visited=None, next_level=None, depths=None
+    ):
+        links = list(result.links.get("internal", []))
+        if self.include_external:
+            links += result.links.get("external", [])
+        await self._queue_links(links, source_url, current_depth)
+
+    async def _queue_links(self, links, source_url, current_depth):
+        next_depth = current_depth + 1
+        if next_depth > self.max_depth:
+            return
+
+        urls, anchors, seen = [], [], set()
+        for link in links:
+            href = link.get("href") if isinstance(link, dict) else link
+            if not href:
+                continue
+            url = _normalize_url(urljoin(source_url, href))
+            if not url or url in seen or self.store.known(self.seed, url):
+                continue
+            seen.add(url)
+            if not await self.can_process_url(url, next_depth):
+                continue
+            urls.append(url)
+            anchors.append(link.get("text") if isinstance(link, dict) else None)
+        if not urls:
+            return
+
+        # Batch scorers see the whole page's links (and their anchor text) at once
+        if self.url_scorer is None:
+            scores = [0.0] * len(urls)
+        elif hasattr(self.url_scorer, "score_many"):
+            scores = self.url_scorer.score_many(urls, anchors)
+        else:
+            scores = [self.url_scorer.score(url) for url in urls]
+        rows = [
+            (url, next_depth, score, source_url)
+            for url, score in zip(urls, scores)
+            if score >= self.score_threshold
+        ]
+        if rows:
+            self.pending += self.store.add(self.seed, rows)
+
+    async def _arun_stream(self, start_url, crawler, config):
+        store = self.store
+        if not store.known(self.seed, start_url):
+            store.add(self.seed, [(start_url, 0, 0.0, None)])
+        # DONE rows are exactly the successful fetches counted below
+        counts = [store.count(self.seed, DONE), store.count(self.seed, PENDING)]
+        if asyncio.iscoroutine(counts[0]):
+            counts = [await c for c in counts]  # asked of a coordinator
+        self._pages_crawled, self.pending = counts
+
+        while not self._cancel_event.is_set():
+            room = self.max_pages - self._pages_crawled
+            if room <= 0:
+                break
+            want = min(self.batch_size, room)
+            self._maybe_rescore()
+            if self.budget is not None:
+                want = self.budget.reserve(self.domain, want)
+                if not want:
+                    self.out_of_budget = True
+                    break  # job-wide budget or domain quota spent
+            batch = store.pop(self.seed, want, self.best_first)
+            if asyncio.iscoroutine(batch):
+                batch = await batch  # leased from a coordinator (distributed.RemoteFrontier)
+            if self.budget is not None:
+                self.budget.refund(self.domain, want - len(batch))
+            if not batch:
+                break
+            self.pending = max(0, self.pending - len(batch))
+            meta = {url: (depth, score, parent) for url, depth, score, parent in batch}
+
+            if self.precheck:
+                # Unchanged since last run: skip the fetch, reuse stored links
+                unchanged = await self.precheck.unchanged(meta)
+                for url, links in unchanged.items():
+                    depth, _, _ = meta.pop(url)
+                    store.done(self.seed, url, ok=False)
+                    self.skipped_unchanged += 1
+                    await self._queue_links(links, url, depth)
+                if self.budget is not None:
+                    self.budget.refund(self.domain, len(unchanged))
+                if not meta:
+                    continue
+
+            batch_config = config.clone(deep_crawl_strategy=None, stream=True)
+
+            unanswered = set(meta)
+            finished = False
+            if self.fetcher:
+                results = self.fetcher.fetch_many(
+                    list(meta),
+                    crawler,
+                    batch_config,
+                    browser_concurrency=config.semaphore_count,
+                )
+            else:
+                results = await crawler.arun_many(urls=list(meta), config=batch_config)
+            try:
+                async for result in results:
+                    url = self._requested(result, meta)
+                    if url is None:
+                        # Can't tell which lease this answers, so not its depth
+                        # either: keep the page, but follow none of its links
+                        result.metadata = result.metadata or {}
+                        yield result
+                        if self._cancel_event.is_set():
+                            break
+                        continue
+                    unanswered.discard(url)
+                    depth, score, parent = meta[url]
+                    result.metadata = result.metadata or {}
+                    result.metadata.update(
+                        {"depth": depth, "parent_url": parent, "score": score}
+                    )
+                    store.done(self.seed, url, ok=result.success)
+                    if result.success:
+                        self._pages_crawled += 1
+                        await self.link_discovery(result, result.url, depth)
+                    store.maybe_checkpoint()
+                    yield result
+                    if self._cancel_event.is_set():
+                        break
+                else:
+                    finished = True
+            finally:
+                if not finished and self.budget is not None:
+                    # Stopped mid-batch (shutdown, consumer gone): give back
+                    # the reserved pages never fetched; their rows stay
+                    # IN_FLIGHT and are re-queued when the store is reopened
+                    self.budget.refund(self.domain, len(unanswered))
+            if not self._cancel_event.is_set():
+                # e.g. results reported under a redirected URL
+                for url in unanswered:
+                    store.done(self.seed, url, ok=False)
+        store.checkpoint()
+
+    @staticmethod
+    def _requested(result, meta) -> str | None:
+        """The leased URL `result` answers (it may come back redirected or
+        in another spelling); None if it matches none of them."""
+        for url in (result.url, getattr(result, "redirected_url", None)):
+            if not url:
+                continue
+            if url in meta:
+                return url
+            if _normalize_url(url) in meta:
+                return _normalize_url(url)
+        return None
+
+    def _maybe_rescore(self):
+        updates = getattr(self.url_scorer, "updates", 0)
+        if (
+            self.rescore_every
+            and self.best_first
+            and updates - self._rescored_at >= self.rescore_every
+            and hasattr(self.store, "rescore")  # not on a coordinator's queue
+        ):
+            self._rescored_at = updates
+            self.store.rescore(self.seed, self.url_scorer.score_many)
+
+    async def _arun_batch(self, start_url, crawler, config):
+        return [r async for r in self._arun_stream(start_url, crawler, config)]
+
+    async def shutdown(self):
+        self._cancel_event.set()
+        self.end_time = datetime.now()
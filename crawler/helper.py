@@ -1,56 +1,93 @@
-from colorama import Fore, Style
-from urllib.parse import urlsplit, urlunsplit
+import fnmatch
+import json
+import re
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit, unquote_plus
 from pathlib import Path
 
+from config import TRACKING_PARAMS
+from logs import logger
+
 DATAPATH_BASE = Path(__file__).parent / "scraped"
 
 
-class BasicLogger:
-    def __init__(self, log_file="logs.txt"):
-        self.file_enabled = False
-        self.log_file = log_file
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_PCT_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
 
-    def toggle_file_logging(self):
-        self.log_file = not self.log_file
-        return self.log_file
 
-    def log_info(self, msg: str):
-        info = f"[INFO] {msg}"
-        print(Fore.CYAN + info + Style.RESET_ALL)
+def _remove_dot_segments(path: str) -> str:
+    """RFC 3986 5.2.4: /a/./b/../c -> /a/c"""
+    segments = path.split("/")
+    out = []
+    for seg in segments:
+        if seg == ".":
+            continue
+        if seg == "..":
+            if len(out) > 1:
+                out.pop()
+            continue
+        out.append(seg)
+    if segments[-1] in (".", ".."):
+        out.append("")  # /a/b/.. -> /a/
+    return "/".join(out)
 
-        if self.file_enabled:
-            with open(self.log_file, "a") as lf:
-                lf.write(f"{info}\n")
 
-    def log_debug(self, msg: str):
-        debug = f"[DEBUG] {msg}"
-        print(Fore.YELLOW + debug + Style.RESET_ALL)
-        if self.file_enabled:
-            with open(self.log_file, "a") as lf:
-                lf.write(f"{debug}\n")
+def _is_tracking_param(name: str, patterns) -> bool:
+    name = name.lower()
+    return any(fnmatch.fnmatchcase(name, p) for p in patterns)
 
-    def log_error(self, msg: str):
-        error = f"[ERROR] {msg}"
-        print(Fore.RED + error + Style.RESET_ALL)
-        if self.file_enabled:
-            with open(self.log_file, "a") as lf:
-                lf.write(f"{error}\n")
 
+def _normalize_url(u: str, strip_params=TRACKING_PARAMS) -> str:
+    """
+    Canonical form used for dedup and the frontier:
+    HTTP://Example.com:80/a/../b?utm_source=x&b=2&a=1#top -> http://example.com/b?a=1&b=2
 
-def _normalize_url(u: str) -> str:
-    """Strip empty fragments and normalize trivial parts."""
+    - lowercase scheme and host, drop the default port
+    - resolve dot-segments, uppercase percent-escapes, "" path -> "/"
+    - drop `strip_params` (tracking) and sort the remaining params by name;
+      pairs are kept as written (`?flag` stays valueless, `%20` is not
+      turned into `+`), only their escapes are uppercased
+    - drop the fragment
+    """
     u = u.strip()
     if not u:
         return ""
     parts = urlsplit(u)
-    # Drop empty trailing fragment "#"
-    if parts.fragment == "":
-        parts = parts._replace(fragment="")
-    return urlunsplit(parts)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return urlunsplit(parts._replace(fragment=""))
+
+    host = parts.hostname.rstrip(".")  # already lowercased
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port and port != _DEFAULT_PORTS[scheme]:
+        netloc += f":{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+
+    path = _remove_dot_segments(parts.path) or "/"
+    path = _PCT_ESCAPE.sub(lambda m: m.group().upper(), path)
+
+    params = []
+    for pair in parts.query.split("&"):
+        if not pair:
+            continue
+        pair = _PCT_ESCAPE.sub(lambda m: m.group().upper(), pair)
+        key = pair.split("=", 1)[0]
+        if not _is_tracking_param(unquote_plus(key), strip_params):
+            params.append((key, pair))
+    params.sort(key=lambda kp: kp[0])  # stable: repeated keys keep their order
+    query = "&".join(pair for _, pair in params)
+    return urlunsplit((scheme, netloc, path, query, ""))
 
 
-def initialize_seeds_vars(file):
-    logger = BasicLogger()
+def initialize_seeds_vars(file, resume=False):
     seeds = []
     seed_vars = []
     try:
@@ -60,7 +97,17 @@ def initialize_seeds_vars(file):
         logger.log_error(f"File {file} not found")
 
     if seeds:
-        for seed in seeds:
+        for line in seeds:
+            # "<url> [priority]": the weight decides a seed's share of GLOBAL_MAX_PAGES
+            parts = line.split()
+            if not parts:
+                continue
+            seed = parts[0]
+            try:
+                priority = float(parts[1]) if len(parts) > 1 else 1.0
+            except ValueError:
+                logger.log_error(f"Invalid priority in seeds line: {line.strip()}")
+                priority = 1.0
             url_split = urlsplit(seed.strip())
             if url_split.netloc and url_split.scheme in ["https", "http"]:
                 OUT_DIR = DATAPATH_BASE / f"{url_split.netloc}"
@@ -74,14 +121,16 @@ def initialize_seeds_vars(file):
                         "md_dir": OUT_DIR / "md",
                         "jsonl_path": JSONL_PATH,
                         "allowed_domain": f"{url_split.netloc}",
+                        "priority": priority,
                     }
                 )
 
                 # directory shenanigans
                 OUT_DIR.mkdir(parents=True, exist_ok=True)
                 MD_DIR.mkdir(parents=True, exist_ok=True)
-                # ensure file exists
-                JSONL_PATH.write_text("", encoding="utf-8")
+                # ensure file exists (kept as-is when resuming)
+                if not resume or not JSONL_PATH.exists():
+                    JSONL_PATH.write_text("", encoding="utf-8")
 
                 # logger.log_debug("")
             else:
@@ -92,11 +141,10 @@ def initialize_seeds_vars(file):
     return seed_vars
 
 
-def initialize_single_url(url):
-    logger = BasicLogger()
+def initialize_single_url(url, resume=False, suffix="_single"):
     url_split = urlsplit(url.strip())
     if url_split.netloc and url_split.scheme in ["https", "http"]:
-        OUT_DIR = DATAPATH_BASE / f"{url_split.netloc}_single"
+        OUT_DIR = DATAPATH_BASE / f"{url_split.netloc}{suffix}"
         MD_DIR = OUT_DIR / "md"
         JSONL_PATH = OUT_DIR / "index.jsonl"
 
@@ -106,40 +154,181 @@ def initialize_single_url(url):
             "md_dir": OUT_DIR / "md",
             "jsonl_path": JSONL_PATH,
             "allowed_domain": f"{url_split.netloc}",
+            "priority": 1.0,
         }
 
         # directory shenanigans
         OUT_DIR.mkdir(parents=True, exist_ok=True)
         MD_DIR.mkdir(parents=True, exist_ok=True)
-        # ensure file exists
-        JSONL_PATH.write_text("", encoding="utf-8")
+        # ensure file exists (kept as-is when resuming)
+        if not resume or not JSONL_PATH.exists():
+            JSONL_PATH.write_text("", encoding="utf-8")
         return seed
     else:
         logger.log_error(f"{url} is not a valid URL")
 
 
-def chunk_markdown(md: str, target_chars: int = 1200):
-    """Simple char-based chunker on paragraph boundaries."""
-    paragraphs = [p.strip() for p in md.split("\n\n") if p.strip()]
-    chunks, buf, count = [], [], 0
-    for p in paragraphs:
-        buf.append(p)
-        count += len(p)
-        if count >= target_chars:
-            chunks.append("\n\n".join(buf))
-            buf, count = [], 0
-    if buf:
-        chunks.append("\n\n".join(buf))
+def indexed_urls(jsonl_path) -> set[str]:
+    """URLs already recorded in an index.jsonl (skipped when resuming)."""
+    urls = set()
+    try:
+        with open(jsonl_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    urls.add(json.loads(line)["url"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # torn last line of a crashed run
+    except FileNotFoundError:
+        pass
+    return urls
+
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(f):
+    """
+    Exclusive advisory lock on an open file. Holders exclude each other
+    across threads and processes as long as each opened the file itself.
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_PARA_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+def count_tokens(text: str) -> int:
+    """Tokenizer-free estimate: words and punctuation marks."""
+    return len(_TOKEN.findall(text))
+
+
+def _paragraph_spans(md: str):
+    start = 0
+    for m in [*_PARA_BREAK.finditer(md), None]:
+        end = m.start() if m else len(md)
+        para = md[start:end]
+        if para.strip():
+            s = start + len(para) - len(para.lstrip())
+            yield s, start + len(para.rstrip())
+        if m:
+            start = m.end()
+
+
+def _split_span(md: str, start: int, end: int, target: int, by_tokens: bool):
+    """Windows of at most `target` units over one oversized paragraph."""
+    if not by_tokens:
+        for a in range(start, end, target):
+            b = min(a + target, end)
+            yield a, b, b - a
+        return
+    tokens = list(_TOKEN.finditer(md, start, end))
+    for a in range(0, len(tokens), target):
+        group = tokens[a : a + target]
+        yield group[0].start(), group[-1].end(), len(group)
+
+
+def chunk_markdown(
+    md: str,
+    target_chars: int = 1200,
+    target_tokens: int | None = None,
+    overlap_tokens: int = 0,
+    with_offsets: bool = False,
+):
+    """
+    Chunker on paragraph boundaries. Paragraphs are added while the chunk
+    stays within `target_chars` (or `target_tokens`, see `count_tokens`);
+    a paragraph larger than the target is split into windows on its own.
+
+    With `target_tokens`, every chunk after the first starts with the last
+    `overlap_tokens` tokens of the previous one (mid-paragraph if need be,
+    so windows of one long paragraph overlap too) and still stays within
+    the target. `with_offsets` returns (char offset in `md`, text, size)
+    tuples instead of strings.
+    """
+    by_tokens = bool(target_tokens)
+    target = max(1, target_tokens if by_tokens else target_chars)
+    overlap = min(overlap_tokens, target // 2) if by_tokens else 0
+    size = count_tokens if by_tokens else len
+
+    units = []  # (start, end, size)
+    for s, e in _paragraph_spans(md):
+        n = size(md[s:e])
+        if n > target - overlap:
+            # leave room for the overlap carried into every window
+            units.extend(_split_span(md, s, e, target - overlap, by_tokens))
+        else:
+            units.append((s, e, n))
+
+    chunks = []
+    i = 0
+    start, carry = None, 0  # overlap taken from the previous chunk: offset, tokens
+    while i < len(units):
+        if start is None:
+            start = units[i][0]
+        j, total = i, carry
+        while j < len(units) and (j == i or total + units[j][2] <= target):
+            total += units[j][2]
+            j += 1
+        end = units[j - 1][1]
+        chunks.append((start, md[start:end], total) if with_offsets else md[start:end])
+        if overlap and j < len(units):
+            tail = list(_TOKEN.finditer(md, start, end))[-overlap:]
+            start, carry = tail[0].start(), len(tail)
+        else:
+            start, carry = None, 0
+        i = j
     return chunks
 
 
-def count_block_signals(results) -> float:
+def status_of(r):
+    """HTTP status of a crawl result (crawl4ai exposes it as `status_code`)."""
+    status = getattr(r, "status_code", None)
+    if status is None:
+        status = getattr(r, "http_status", None)
+    return status
+
+
+def block_signal(r) -> float:
     """
-    Estimate fraction of "blocked" pages using typical signals:
+    Block weight of a single page (0.0 = clean, 0.5 = soft, 1.0 = blocked):
     - HTTP 429 (Too Many Requests)
     - HTTP 403 (Forbidden)
     - Empty/None markdown on a page that otherwise returned 2xx
     """
+    status = status_of(r)
+    md = getattr(r, "markdown", None)
+
+    if status and status // 100 == 4:
+        return 1.0
+    if status and 200 <= status < 300 and (not md or not md.strip()):
+        return 0.5  # soft signal
+    return 0.0
+
+
+def count_block_signals(results) -> float:
+    """
+    Estimate fraction of "blocked" pages using typical signals
+    (see `block_signal`).
+    """
     if not results:
         return 0.0
     total = 0
@@ -148,13 +337,7 @@ def count_block_signals(results) -> float:
         if not r:
             continue
         total += 1
-        status = getattr(r, "http_status", None)
-        md = getattr(r, "markdown", None)
-
-        if status and status // 100 == 4:
-            blocked += 1.0
-        elif status and 200 <= status < 300 and (not md or not md.strip()):
-            blocked += 0.5  # soft signal
+        blocked += block_signal(r)
     if total == 0:
         return 0.0
     return blocked / float(total)
@@ -0,0 +1,147 @@
+# linkscore.py
+# Learned link prioritisation for best-first crawling: an online logistic
+# model over URL-path and anchor-text tokens, trained on which fetched pages
+# were actually saved.
+
+import math
+import re
+import zlib
+from array import array
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from crawl4ai.deep_crawling.scorers import URLScorer
+
+from helper import _normalize_url
+
+try:
+    import numpy as np
+except ImportError:  # optional (installed with crawl4ai); pure Python fallback
+    np = None
+
+_WORD = re.compile(r"[a-z]{2,}")
+_DIGITS = re.compile(r"\d+")
+_SPLIT = re.compile(r"[^a-z0-9#]+")
+
+
+def link_features(url: str, anchor: str | None = None, keywords=()) -> list[str]:
+    """
+    Named features of a link: directory segments and the first two as a
+    prefix (digits folded, so /product/123/ and /product/456/ agree), path
+    tokens, depth, query, extension, anchor words and keyword hits.
+    """
+    parts = urlsplit(url.lower())
+    segments = [_DIGITS.sub("#", s) for s in parts.path.split("/") if s]
+    feats = ["bias", f"d:{min(len(segments), 8)}"]
+    if segments:
+        feats += [f"s:{s}" for s in segments[:-1]]
+        feats.append("p:" + "/".join(segments[:2]))
+        last = segments[-1]
+        if "." in last:
+            feats.append("x:" + last.rsplit(".", 1)[1][:8])
+        feats += [f"t:{t}" for t in _SPLIT.split("/".join(segments)) if t]
+    if parts.query:
+        feats.append("q")
+    text = (anchor or "").lower()
+    words = _WORD.findall(text)[:16]
+    feats += [f"a:{w}" for w in words] if words else ["a:"]
+    haystack = f"{parts.path} {parts.query} {text}"
+    feats += [f"k:{k}" for k in keywords if k in haystack]
+    return feats
+
+
+class LinkScorer(URLScorer):
+    """
+    Scores candidate links with a logistic model whose weights live in one
+    hashed vector (`dim` buckets, crc32 of the feature name).
+
+    - `score_many(urls, anchors)` scores a whole batch of links at once:
+      with numpy one gather + `add.reduceat` over the concatenated feature
+      indices, otherwise a plain loop
+    - `update(url, saved)` takes one SGD step on the features the URL was
+      scored with (anchor text included), so link patterns that keep
+      producing saved pages rise and ones that produce empty, failed or
+      duplicate pages sink
+    - keyword hits start at weight `prior`, so before any feedback the
+      order matches the keyword relevance scorer
+
+    Also usable by crawl4ai's BestFirstCrawlingStrategy via `score(url)`.
+    """
+
+    def __init__(
+        self,
+        keywords=(),
+        lr: float = 0.2,
+        prior: float = 1.0,
+        dim: int = 1 << 16,
+        cache_size: int = 100_000,
+        weight: float = 1.0,
+    ):
+        super().__init__(weight=weight)
+        self.keywords = [k.lower() for k in keywords]
+        self.lr = lr
+        self.mask = (1 << max(1, dim - 1).bit_length()) - 1  # power of two
+        size = self.mask + 1
+        self.w = np.zeros(size) if np is not None else array("d", bytes(8 * size))
+        for k in self.keywords:
+            self.w[self._hash(f"k:{k}")] += prior
+        self.cache_size = cache_size
+        self._feats = OrderedDict()  # url -> feature indices it was scored with
+        self.updates = 0
+        self.positives = 0
+
+    def _hash(self, feature: str) -> int:
+        return zlib.crc32(feature.encode()) & self.mask
+
+    def _indices(self, url: str, anchor: str | None = None):
+        idx = self._feats.get(url)
+        if idx is not None and anchor is None:
+            return idx
+        idx = sorted({self._hash(f) for f in link_features(url, anchor, self.keywords)})
+        if np is not None:
+            idx = np.array(idx, dtype=np.int64)
+        self._feats[url] = idx
+        self._feats.move_to_end(url)
+        if len(self._feats) > self.cache_size:
+            self._feats.popitem(last=False)
+        return idx
+
+    def score_many(self, urls, anchors=None) -> list[float]:
+        """Probability that each link leads to a page worth saving."""
+        if not urls:
+            return []
+        anchors = anchors or [None] * len(urls)
+        feats = [self._indices(u, a) for u, a in zip(urls, anchors)]
+        if np is not None:
+            lengths = np.fromiter((len(f) for f in feats), dtype=np.int64, count=len(feats))
+            offsets = np.zeros(len(feats), dtype=np.int64)
+            np.cumsum(lengths[:-1], out=offsets[1:])
+            logits = np.add.reduceat(self.w[np.concatenate(feats)], offsets)
+            return (1.0 / (1.0 + np.exp(-np.clip(logits, -30, 30)))).tolist()
+        w = self.w
+        return [1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, sum(w[i] for i in f))))) for f in feats]
+
+    def _calculate_score(self, url: str) -> float:
+        return self.score_many([url])[0]
+
+    def update(self, url: str, saved: bool):
+        """Learn from a fetched page: was it saved?"""
+        if url not in self._feats:
+            url = _normalize_url(url) or url  # scored in frontier form
+        idx = self._indices(url)
+        p = self.score_many([url])[0]
+        step = self.lr * ((1.0 if saved else 0.0) - p)
+        if np is not None:
+            self.w[idx] += step
+        else:
+            for i in idx:
+                self.w[i] += step
+        self.updates += 1
+        self.positives += bool(saved)
+
+    def stats(self) -> dict:
+        return {
+            "updates": self.updates,
+            "saved_share": round(self.positives / self.updates, 3) if self.updates else None,
+            "vectorised": np is not None,
+        }
@@ -0,0 +1,259 @@
+# logs.py
+# Non-blocking logger: callers only enqueue a record; one background thread
+# filters repeats, then writes console lines and JSON-lines file records in
+# batches.
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from colorama import Fore, Style
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+_COLOURS = {
+    "DEBUG": Fore.YELLOW,
+    "INFO": Fore.CYAN,
+    "WARNING": Fore.MAGENTA,
+    "ERROR": Fore.RED,
+}
+_STOP = object()
+
+
+class AsyncLogger:
+    """
+    Drop-in for the old BasicLogger (`log_info`/`log_debug`/`log_error`).
+
+    Records below `level` are discarded by the caller without touching the
+    queue. The rest go to a bounded queue and never block: when the writer
+    falls behind, new records are counted in `dropped` instead. The writer
+    thread flushes every `flush_sec` seconds or `batch_size` records. The
+    same level+message seen again within `repeat_window` seconds is
+    suppressed and reported once as "(repeated N times)" when the window
+    closes. With `file_enabled`, every record is also appended to `log_file`
+    as one JSON object per line (`ts`, `level`, `msg`, `pid` and any extra
+    fields passed to `log`). Sinks added with `add_sink` get every written
+    batch as (ts, level, msg, fields) tuples, e.g. to feed the GUI's log view
+    when the crawl runs in-process.
+    """
+
+    def __init__(
+        self,
+        log_file="logs.jsonl",
+        level: str = "INFO",
+        file_enabled: bool = False,
+        repeat_window: float = 10.0,
+        flush_sec: float = 0.2,
+        batch_size: int = 512,
+        max_queue: int = 10_000,
+    ):
+        self.log_file = log_file
+        self.file_enabled = file_enabled
+        self.level = LEVELS[level.upper()]
+        self.repeat_window = repeat_window
+        self.flush_sec = flush_sec
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._file_path = None
+        self._repeats = {}  # (level, msg) -> [window start, suppressed]
+        self._sinks = []
+        self.written = 0
+        self.suppressed = 0
+        self.dropped = 0
+
+    def configure(
+        self, level=None, log_file=None, file_enabled=None, repeat_window=None
+    ):
+        """Apply settings parsed after the logger was created (CLI flags)."""
+        if level is not None:
+            self.level = LEVELS[level.upper()]
+        if log_file is not None:
+            self.log_file = log_file
+        if file_enabled is not None:
+            self.file_enabled = file_enabled
+        if repeat_window is not None:
+            self.repeat_window = repeat_window
+
+    def add_sink(self, sink):
+        """Call `sink(records)` from the writer thread for every batch."""
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        if sink in self._sinks:
+            self._sinks.remove(sink)
+
+    def toggle_file_logging(self):
+        self.file_enabled = not self.file_enabled
+        return self.file_enabled
+
+    # --- producer side (any thread, never blocks) ---
+    def log(self, level: str, msg: str, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.time(), level, str(msg), fields))
+        except queue.Full:
+            self.dropped += 1
+
+    def log_debug(self, msg: str):
+        self.log("DEBUG", msg)
+
+    def log_info(self, msg: str):
+        self.log("INFO", msg)
+
+    def log_warning(self, msg: str):
+        self.log("WARNING", msg)
+
+    def log_error(self, msg: str):
+        self.log("ERROR", msg)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything logged so far has been written."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "suppressed": self.suppressed,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="logger", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    # --- writer thread ---
+    def _run(self):
+        while True:
+            try:
+                items = [self._queue.get(timeout=self.flush_sec)]
+            except queue.Empty:
+                items = []
+            while items and len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records, stop = [], False
+            for item in items:
+                if isinstance(item, threading.Event):
+                    self._write(records)
+                    records = []
+                    item.set()
+                elif item is _STOP:
+                    stop = True
+                elif not self._repeated(item):
+                    records.append(item)
+            records.extend(self._expired_repeats(flush_all=stop))
+            self._write(records)
+            if stop:
+                return
+
+    def _repeated(self, record) -> bool:
+        if self.repeat_window <= 0:
+            return False
+        ts, level, msg, _ = record
+        key = (level, msg)
+        seen = self._repeats.get(key)
+        if seen and ts - seen[0] < self.repeat_window:
+            seen[1] += 1
+            self.suppressed += 1
+            return True
+        self._repeats[key] = [ts, 0]
+        return False
+
+    def _expired_repeats(self, flush_all=False):
+        """Summary records for repeat windows that have closed."""
+        now = time.time()
+        out = []
+        for key, (start, n) in list(self._repeats.items()):
+            if flush_all or now - start >= self.repeat_window:
+                del self._repeats[key]
+                if n:
+                    level, msg = key
+                    out.append((now, level, f"{msg} (repeated {n} times)", {"repeats": n}))
+        return out
+
+    def _write(self, records):
+        if not records:
+            return
+        console = []
+        for ts, level, msg, _ in records:
+            console.append(f"{_COLOURS[level]}[{level}] {msg}{Style.RESET_ALL}\n")
+        try:
+            sys.stdout.write("".join(console))
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            pass  # stdout closed (GUI went away); keep the file log going
+        for sink in list(self._sinks):
+            try:
+                sink(records)
+            except Exception:
+                pass  # a broken sink must not stop the writer thread
+
+        if self.file_enabled and self.log_file:
+            if self._file is None or self._file_path != self.log_file:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.log_file, "a", encoding="utf-8")
+                self._file_path = self.log_file
+            pid = os.getpid()
+            self._file.write(
+                "".join(
+                    json.dumps(
+                        {
+                            "ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                            "level": level,
+                            "msg": msg,
+                            "pid": pid,
+                            **fields,
+                        },
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                    + "\n"
+                    for ts, level, msg, fields in records
+                )
+            )
+            self._file.flush()
+        self.written += len(records)
+
+
+# The process-wide logger: every module logs through this instance, and the
+# entry point (crawl_seeded) applies LOG_* settings and CLI flags to it
+logger = AsyncLogger()
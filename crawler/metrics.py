@@ -0,0 +1,359 @@
+# metrics.py
+# Per-stage latency histograms, throughput and per-host error counters.
+# Snapshots are JSON (metrics.json, refreshed while crawling and at the end of
+# the run); `render_prometheus` turns one into Prometheus text format.
+
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from helper import status_of
+
+# Bucket upper bounds in seconds: 1ms .. ~2min, x1.5 per step
+BOUNDS = tuple(round(0.001 * 1.5**i, 6) for i in range(30))
+
+STAGES = {
+    "pacing": "waiting for the host's turn (scheduler token bucket)",
+    "navigation": "page.goto until the response",
+    "render_wait": "after navigation until HTML capture (waits, scroll, delay_before_return_html)",
+    "html": "retrieving the rendered HTML",
+    "process": "HTML captured until the result reaches the crawler (scraping, markdown)",
+    "write": "saving one page (markdown, index.jsonl, stores)",
+    "seed": "one seed end to end",
+}
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BOUNDS) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, sec: float):
+        self.buckets[bisect_left(BOUNDS, sec)] += 1
+        self.count += 1
+        self.sum += sec
+
+
+def quantile(buckets, q: float) -> float | None:
+    """Estimate from bucket counts (linear inside the bucket), like histogram_quantile."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(buckets):
+        if seen + n >= rank and n:
+            lo = BOUNDS[i - 1] if i else 0.0
+            hi = BOUNDS[i] if i < len(BOUNDS) else BOUNDS[-1]
+            return lo + (hi - lo) * (rank - seen) / n
+        seen += n
+    return BOUNDS[-1]
+
+
+class Metrics:
+    """
+    Cheap hot-path counters for one crawler process.
+
+    Browser stages come from crawl4ai's Playwright hooks (`browser_hooks`),
+    `write` and `seed` from `timer`, and `process` from the gap between the
+    HTML capture and `page(r)` seeing the result. `maybe_dump` rewrites
+    `path` at most every `interval` seconds so other processes (the GUI's
+    /metrics endpoint) can read live numbers.
+    """
+
+    def __init__(self, path=None, interval: float = 5.0):
+        self.path = Path(path) if path else None
+        self.interval = interval
+        self.started = time.time()
+        self.stages = {name: Histogram() for name in STAGES}
+        self.pages = 0
+        self.bytes_fetched = 0
+        self.bytes_written = 0
+        self.hosts = {}  # host -> [requests, errors]
+        self.queues = {}  # seed -> URLs waiting in its frontier
+        self.blocked = {}  # resource type -> [requests aborted, est. bytes]
+        self._pages_in_flight = {}  # id(page) -> (url, t_goto, t_navigated, t_retrieve)
+        self._captured = {}  # url -> time the HTML was captured
+        self._last_dump = 0.0
+
+    def observe(self, stage: str, sec: float):
+        self.stages[stage].observe(sec)
+
+    @contextmanager
+    def timer(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage].observe(time.perf_counter() - t0)
+
+    # --- crawl4ai hooks ---
+    def browser_hooks(self, before_goto=None) -> dict:
+        """
+        Hooks for AsyncPlaywrightCrawlerStrategy.set_hook. `before_goto`
+        (e.g. the scheduler's pacing hook) still runs and is timed as "pacing".
+        """
+
+        async def _before_goto(page, *args, url=None, **kwargs):
+            t0 = time.perf_counter()
+            if before_goto is not None:
+                await before_goto(page, *args, url=url, **kwargs)
+            now = time.perf_counter()
+            self.stages["pacing"].observe(now - t0)
+            self._pages_in_flight[id(page)] = [url, now, None, None]
+            return page
+
+        async def _after_goto(page, *args, **kwargs):
+            rec = self._pages_in_flight.get(id(page))
+            if rec:
+                rec[2] = time.perf_counter()
+                self.stages["navigation"].observe(rec[2] - rec[1])
+            return page
+
+        async def _before_retrieve_html(page, *args, **kwargs):
+            rec = self._pages_in_flight.get(id(page))
+            if rec and rec[2] is not None:
+                rec[3] = time.perf_counter()
+                self.stages["render_wait"].observe(rec[3] - rec[2])
+            return page
+
+        async def _before_return_html(page=None, *args, **kwargs):
+            rec = self._pages_in_flight.pop(id(page), None)
+            if rec:
+                now = time.perf_counter()
+                if rec[3] is not None:
+                    self.stages["html"].observe(now - rec[3])
+                if rec[0]:
+                    self._captured[rec[0]] = now
+                    if len(self._captured) > 10_000:  # results that never arrive
+                        for url in list(self._captured)[:5_000]:
+                            del self._captured[url]
+            return page
+
+        return {
+            "before_goto": _before_goto,
+            "after_goto": _after_goto,
+            "before_retrieve_html": _before_retrieve_html,
+            "before_return_html": _before_return_html,
+        }
+
+    # --- per page ---
+    def page(self, r):
+        """Count one fetched result (bytes, host errors, `process` stage)."""
+        self.pages += 1
+        self.bytes_fetched += len((getattr(r, "html", None) or "").encode("utf-8"))
+        captured = self._captured.pop(r.url, None)
+        if captured is None and getattr(r, "redirected_url", None):
+            captured = self._captured.pop(r.redirected_url, None)
+        if captured is not None:
+            self.stages["process"].observe(time.perf_counter() - captured)
+
+        host = urlsplit(r.url).netloc
+        counts = self.hosts.setdefault(host, [0, 0])
+        counts[0] += 1
+        status = status_of(r)
+        if not getattr(r, "success", False) or (status and status >= 400):
+            counts[1] += 1
+        self.maybe_dump()
+
+    def written(self, n_bytes: int):
+        self.bytes_written += n_bytes
+
+    def blocked_request(self, resource_type: str, est_bytes: int):
+        """A request aborted by the ResourceBlocker (bytes are an estimate)."""
+        counts = self.blocked.setdefault(resource_type, [0, 0])
+        counts[0] += 1
+        counts[1] += est_bytes
+
+    def queue_depth(self, seed: str, pending: int | None):
+        """Track a seed's frontier size; None once the seed is finished."""
+        if pending is None:
+            self.queues.pop(seed, None)
+        else:
+            self.queues[seed] = pending
+
+    # --- output ---
+    def snapshot(self) -> dict:
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            "started": self.started,
+            "elapsed_sec": round(elapsed, 3),
+            "pages": self.pages,
+            "pages_per_sec": round(self.pages / elapsed, 3),
+            "bytes_fetched": self.bytes_fetched,
+            "bytes_written": self.bytes_written,
+            "queue_depth": sum(self.queues.values()),
+            "bounds": list(BOUNDS),
+            "stages": {
+                name: {
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": quantile(h.buckets, 0.50),
+                    "p95": quantile(h.buckets, 0.95),
+                    "p99": quantile(h.buckets, 0.99),
+                    "buckets": h.buckets,
+                }
+                for name, h in self.stages.items()
+            },
+            "hosts": {
+                host: {
+                    "requests": req,
+                    "errors": err,
+                    "error_rate": round(err / req, 4) if req else 0.0,
+                }
+                for host, (req, err) in self.hosts.items()
+            },
+            "blocked": {
+                rtype: {"requests": n, "est_bytes": b}
+                for rtype, (n, b) in self.blocked.items()
+            },
+        }
+
+    def dump(self, path=None) -> dict:
+        snap = self.snapshot()
+        path = Path(path) if path else self.path
+        if path is not None:
+            write_snapshot(path, snap)
+        self._last_dump = time.monotonic()
+        return snap
+
+    def maybe_dump(self):
+        if self.path and time.monotonic() - self._last_dump >= self.interval:
+            self.dump()
+
+    def summary(self) -> dict:
+        """Snapshot without the raw buckets (for logs)."""
+        snap = self.snapshot()
+        for stage in snap["stages"].values():
+            stage.pop("buckets")
+        snap.pop("bounds")
+        return snap
+
+
+def write_snapshot(path, snap: dict):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(snap, indent=2), encoding="utf-8")
+    os.replace(tmp, path)  # readers never see a half-written file
+
+
+def merge_snapshots(snaps: list[dict]) -> dict:
+    """Combine snapshots of several processes (e.g. --workers) into one."""
+    snaps = [s for s in snaps if s]
+    if not snaps:
+        return {}
+    started = min(s["started"] for s in snaps)
+    elapsed = max(time.time() - started, 1e-9)
+    out = {
+        "started": started,
+        "elapsed_sec": round(elapsed, 3),
+        "pages": sum(s["pages"] for s in snaps),
+        "bytes_fetched": sum(s["bytes_fetched"] for s in snaps),
+        "bytes_written": sum(s["bytes_written"] for s in snaps),
+        "queue_depth": sum(s.get("queue_depth", 0) for s in snaps),
+        "bounds": snaps[0]["bounds"],
+        "stages": {},
+        "hosts": {},
+        "blocked": {},
+    }
+    out["pages_per_sec"] = round(out["pages"] / elapsed, 3)
+    for name in snaps[0]["stages"]:
+        buckets = [sum(col) for col in zip(*(s["stages"][name]["buckets"] for s in snaps))]
+        out["stages"][name] = {
+            "count": sum(s["stages"][name]["count"] for s in snaps),
+            "sum": round(sum(s["stages"][name]["sum"] for s in snaps), 6),
+            "p50": quantile(buckets, 0.50),
+            "p95": quantile(buckets, 0.95),
+            "p99": quantile(buckets, 0.99),
+            "buckets": buckets,
+        }
+    for s in snaps:
+        for host, h in s["hosts"].items():
+            agg = out["hosts"].setdefault(host, {"requests": 0, "errors": 0})
+            agg["requests"] += h["requests"]
+            agg["errors"] += h["errors"]
+    for h in out["hosts"].values():
+        h["error_rate"] = round(h["errors"] / h["requests"], 4) if h["requests"] else 0.0
+    for s in snaps:
+        for rtype, b in s.get("blocked", {}).items():
+            agg = out["blocked"].setdefault(rtype, {"requests": 0, "est_bytes": 0})
+            agg["requests"] += b["requests"]
+            agg["est_bytes"] += b["est_bytes"]
+    return out
+
+
+def _label(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(snap: dict, prefix: str = "crawler") -> str:
+    """Prometheus text exposition (format 0.0.4) of a snapshot."""
+    if not snap:
+        return ""
+    lines = [
+        f"# HELP {prefix}_stage_seconds Latency of each crawl stage",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    bounds = snap["bounds"]
+    for name, st in snap["stages"].items():
+        cumulative = 0
+        for le, n in zip([*bounds, "+Inf"], st["buckets"]):
+            cumulative += n
+            lines.append(
+                f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}'
+            )
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {st["sum"]}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {st["count"]}')
+
+    for metric, kind, help_text, value in (
+        ("pages_total", "counter", "Pages fetched", snap["pages"]),
+        ("bytes_fetched_total", "counter", "HTML bytes fetched", snap["bytes_fetched"]),
+        ("bytes_written_total", "counter", "Bytes written to disk", snap["bytes_written"]),
+        ("pages_per_second", "gauge", "Pages fetched per second since start", snap["pages_per_sec"]),
+        ("queue_depth", "gauge", "URLs waiting in the frontier", snap.get("queue_depth", 0)),
+    ):
+        lines += [
+            f"# HELP {prefix}_{metric} {help_text}",
+            f"# TYPE {prefix}_{metric} {kind}",
+            f"{prefix}_{metric} {value}",
+        ]
+
+    lines += [
+        f"# HELP {prefix}_host_requests_total Pages fetched per host",
+        f"# TYPE {prefix}_host_requests_total counter",
+    ]
+    lines += [
+        f'{prefix}_host_requests_total{{host="{_label(h)}"}} {v["requests"]}'
+        for h, v in snap["hosts"].items()
+    ]
+    lines += [
+        f"# HELP {prefix}_host_errors_total Failed or 4xx/5xx pages per host",
+        f"# TYPE {prefix}_host_errors_total counter",
+    ]
+    lines += [
+        f'{prefix}_host_errors_total{{host="{_label(h)}"}} {v["errors"]}'
+        for h, v in snap["hosts"].items()
+    ]
+    blocked = snap.get("blocked", {})
+    lines += [
+        f"# HELP {prefix}_blocked_requests_total Requests aborted by resource blocking",
+        f"# TYPE {prefix}_blocked_requests_total counter",
+    ]
+    lines += [
+        f'{prefix}_blocked_requests_total{{type="{_label(t)}"}} {v["requests"]}'
+        for t, v in blocked.items()
+    ]
+    lines += [
+        f"# HELP {prefix}_blocked_bytes_estimated_total Estimated bytes not downloaded",
+        f"# TYPE {prefix}_blocked_bytes_estimated_total counter",
+    ]
+    lines += [
+        f'{prefix}_blocked_bytes_estimated_total{{type="{_label(t)}"}} {v["est_bytes"]}'
+        for t, v in blocked.items()
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,223 @@
+# pool.py
+# Process-wide browser pool shared by every Crawler in a run
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from crawl4ai import AsyncWebCrawler
+
+
+def chain_hooks(*hook_sets: dict | None) -> dict:
+    """
+    Merges crawl4ai hook dicts; hooks sharing a name run in the order given
+    (each gets the page and whatever crawl4ai passed, the page is returned).
+    """
+    merged = {}
+    for hooks in hook_sets:
+        for name, hook in (hooks or {}).items():
+            merged.setdefault(name, []).append(hook)
+
+    def _chain(fns):
+        if len(fns) == 1:
+            return fns[0]
+
+        async def _run(page=None, *args, **kwargs):
+            for fn in fns:
+                await fn(page, *args, **kwargs)
+            return page
+
+        return _run
+
+    return {name: _chain(fns) for name, fns in merged.items()}
+
+
+class PoolExhausted(RuntimeError):
+    """Every browser of the pool failed to (re)launch."""
+
+
+class _PooledBrowser:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.crawler = None
+        self.active = 0  # leases currently held
+        self.pages = 0  # pages served since last (re)start
+        self.restarts = 0
+        self.retiring = False
+        self.dead = False  # (re)launch failed; never leased again
+        self.error = None
+
+
+class BrowserPool:
+    """
+    Keeps `size` long-lived AsyncWebCrawler instances warm and leases them to
+    Crawler objects, so a seed costs a few tabs instead of a browser launch.
+
+    - each browser serves at most `tabs_per_browser` concurrent leases
+    - a browser is restarted once it has served `max_pages_per_browser` pages
+      (keeps Chromium memory from creeping up on long runs)
+    - a browser that fails to (re)launch is marked dead; once none are left
+      `lease()` raises PoolExhausted so callers can fall back to a private
+      browser instead of waiting forever
+    """
+
+    def __init__(
+        self,
+        browser_cfg,
+        size: int = 1,
+        tabs_per_browser: int = 4,
+        max_pages_per_browser: int = 500,
+        hooks: dict | None = None,
+    ):
+        self.browser_cfg = browser_cfg
+        self.size = max(1, size)
+        self.tabs_per_browser = max(1, tabs_per_browser)
+        self.max_pages_per_browser = max_pages_per_browser
+        self.hooks = hooks or {}
+        self._slots = [_PooledBrowser(i) for i in range(self.size)]
+        self._by_crawler = {}
+        self._cond = asyncio.Condition()
+        self._leases_total = 0
+        self._lease_wait_sec = 0.0
+        self._started_at = None
+        self._busy_area = 0.0  # integral of active leases over time
+        self._last_tick = None
+
+    async def _launch(self, slot: _PooledBrowser):
+        crawler = AsyncWebCrawler(config=self.browser_cfg)
+        await crawler.start()
+        for name, hook in self.hooks.items():
+            crawler.crawler_strategy.set_hook(name, hook)
+        slot.crawler = crawler
+        slot.pages = 0
+        slot.retiring = False
+        self._by_crawler[id(crawler)] = slot
+
+    async def _shutdown(self, slot: _PooledBrowser):
+        if slot.crawler is None:
+            return
+        self._by_crawler.pop(id(slot.crawler), None)
+        try:
+            await slot.crawler.close()
+        finally:
+            slot.crawler = None
+
+    async def _relaunch(self, slot: _PooledBrowser, restart: bool):
+        try:
+            if restart:
+                await self._shutdown(slot)
+            await self._launch(slot)
+        except Exception as e:
+            slot.dead = True
+            slot.error = repr(e)
+            try:
+                await self._shutdown(slot)
+            except Exception:
+                slot.crawler = None
+
+    @property
+    def alive(self) -> bool:
+        return any(not s.dead for s in self._slots)
+
+    async def start(self):
+        self._started_at = self._last_tick = time.monotonic()
+        await asyncio.gather(*(self._relaunch(s, restart=False) for s in self._slots))
+        if not self.alive:
+            raise PoolExhausted(f"no browser could be launched: {self._slots[0].error}")
+
+    async def close(self):
+        await asyncio.gather(
+            *(self._shutdown(s) for s in self._slots), return_exceptions=True
+        )
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _tick(self):
+        now = time.monotonic()
+        if self._last_tick is not None:
+            active = sum(s.active for s in self._slots)
+            self._busy_area += active * (now - self._last_tick)
+        self._last_tick = now
+
+    def _pick(self):
+        free = [
+            s
+            for s in self._slots
+            if s.crawler is not None
+            and not s.dead
+            and not s.retiring
+            and s.active < self.tabs_per_browser
+        ]
+        if not free:
+            return None
+        return min(free, key=lambda s: (s.active, s.pages))
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease a warm crawler; blocks while every browser is at its tab limit."""
+        waited = time.monotonic()
+        async with self._cond:
+            slot = self._pick()
+            while slot is None:
+                if not self.alive:
+                    raise PoolExhausted("every pooled browser failed to relaunch")
+                await self._cond.wait()
+                slot = self._pick()
+            self._tick()
+            slot.active += 1
+            self._leases_total += 1
+            self._lease_wait_sec += time.monotonic() - waited
+        try:
+            yield slot.crawler
+        finally:
+            await self._release(slot)
+
+    async def _release(self, slot: _PooledBrowser):
+        async with self._cond:
+            self._tick()
+            slot.active -= 1
+            restart = slot.retiring and slot.active == 0
+        try:
+            if restart:
+                await self._relaunch(slot, restart=True)
+                slot.restarts += 1
+        finally:
+            # Also wakes waiters when the slot died, so they can give up
+            async with self._cond:
+                self._cond.notify_all()
+
+    def record_pages(self, crawler, n: int = 1):
+        """Account pages served by a leased crawler (drives recycling)."""
+        slot = self._by_crawler.get(id(crawler))
+        if slot is None:
+            return
+        slot.pages += n
+        if self.max_pages_per_browser and slot.pages >= self.max_pages_per_browser:
+            slot.retiring = True
+
+    def stats(self) -> dict:
+        self._tick()
+        capacity = self.size * self.tabs_per_browser
+        active = sum(s.active for s in self._slots)
+        elapsed = (
+            time.monotonic() - self._started_at if self._started_at else 0.0
+        )
+        return {
+            "browsers": self.size,
+            "tabs_per_browser": self.tabs_per_browser,
+            "active_leases": active,
+            "utilisation": active / capacity if capacity else 0.0,
+            "avg_utilisation": (
+                self._busy_area / (elapsed * capacity) if elapsed and capacity else 0.0
+            ),
+            "leases_total": self._leases_total,
+            "lease_wait_sec": round(self._lease_wait_sec, 3),
+            "pages_served": [s.pages for s in self._slots],
+            "restarts": sum(s.restarts for s in self._slots),
+            "dead": [s.error for s in self._slots if s.dead],
+        }
@@ -0,0 +1,133 @@
+# ratecontrol.py
+# In-flight AIMD rate controller fed by per-page block signals
+
+import time
+from collections import deque
+
+from helper import block_signal, status_of
+
+
+class _HostWindow:
+    def __init__(self, size: int):
+        self.signals = deque(maxlen=size)
+        self.clean_streak = 0
+        self.backoffs = 0
+        self.raises = 0
+        self.last_change = None
+
+
+class AdaptiveRateController:
+    """
+    Keeps a sliding window of block signals (4xx, empty 2xx markdown) per host
+    and retunes that host's HostScheduler bucket while the crawl runs:
+
+    - multiplicative decrease: a 429, or a window block rate at/above
+      `threshold`, multiplies the delay by `multiplier` (capped at
+      `max_delay`) and halves the concurrency (the scheduler's live cap on
+      the host's requests in flight, not just its token rate)
+    - additive increase: after `recover_after` clean pages in a row the delay
+      drops by `delay_step` (never below `min_delay`) and concurrency grows
+      by one, up to `max_concurrency` and the tabs the host's seeds reserved
+      from the global budget (more in flight would only wait for a tab)
+    """
+
+    def __init__(
+        self,
+        scheduler,
+        threshold: float,
+        multiplier: float,
+        max_delay: float,
+        min_delay: float,
+        window: int = 20,
+        min_samples: int = 5,
+        recover_after: int = 10,
+        delay_step: float = 0.1,
+        max_concurrency: int = 4,
+        logger=None,
+    ):
+        self.scheduler = scheduler
+        self.threshold = threshold
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.recover_after = recover_after
+        self.delay_step = delay_step
+        self.max_concurrency = max_concurrency
+        self.logger = logger
+        self._hosts: dict[str, _HostWindow] = {}
+
+    def _window(self, host: str) -> _HostWindow:
+        w = self._hosts.get(host)
+        if w is None:
+            w = self._hosts[host] = _HostWindow(self.window)
+        return w
+
+    def block_rate(self, host: str) -> float:
+        w = self._hosts.get(host)
+        if not w or not w.signals:
+            return 0.0
+        return sum(w.signals) / len(w.signals)
+
+    def record(self, host: str, r):
+        """Feed one crawled page; may retune the host immediately."""
+        w = self._window(host)
+        signal = block_signal(r)
+        w.signals.append(signal)
+
+        if status_of(r) == 429 or (
+            len(w.signals) >= self.min_samples and self.block_rate(host) >= self.threshold
+        ):
+            self._decrease(host, w)
+        elif signal:
+            w.clean_streak = 0
+        else:
+            w.clean_streak += 1
+            if w.clean_streak >= self.recover_after:
+                self._increase(host, w)
+
+    def _decrease(self, host: str, w: _HostWindow):
+        state = self.scheduler.host(host)
+        delay = min(state.delay * self.multiplier, self.max_delay)
+        concurrency = max(1, state.concurrency // 2)
+        rate = self.block_rate(host)
+        self.scheduler.set_rate(host, delay, concurrency)
+        w.signals.clear()  # judge the new rate on fresh evidence
+        w.clean_streak = 0
+        w.backoffs += 1
+        w.last_change = time.time()
+        if self.logger:
+            self.logger.log_info(
+                f"[rate] {host} blocked={rate:.0%} -> backing off "
+                f"(delay={delay:.2f}s, conc={concurrency})"
+            )
+
+    def _increase(self, host: str, w: _HostWindow):
+        state = self.scheduler.host(host)
+        delay = max(state.delay - self.delay_step, self.min_delay)
+        tabs = self.scheduler.seed_tabs(host) or self.scheduler.per_host_concurrency
+        cap = min(self.max_concurrency, tabs)
+        concurrency = state.concurrency + 1 if state.concurrency < cap else state.concurrency
+        w.clean_streak = 0
+        if delay == state.delay and concurrency == state.concurrency:
+            return
+        self.scheduler.set_rate(host, delay, concurrency)
+        w.raises += 1
+        w.last_change = time.time()
+
+    def state(self) -> dict:
+        """Current per-host view: delay, concurrency, window block rate, changes."""
+        out = {}
+        for host, w in self._hosts.items():
+            s = self.scheduler.host(host)
+            out[host] = {
+                "delay": round(s.delay, 3),
+                "concurrency": s.concurrency,
+                "block_rate": round(self.block_rate(host), 3),
+                "window": len(w.signals),
+                "backoffs": w.backoffs,
+                "raises": w.raises,
+                "last_change": w.last_change,
+            }
+        return out
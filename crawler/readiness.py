@@ -0,0 +1,284 @@
+# readiness.py
+# Page readiness: capture the HTML as soon as the page has settled instead of
+# waiting a fixed delay and scrolling every page to the bottom.
+
+import time
+import weakref
+from collections import deque
+from statistics import median
+from urllib.parse import urlsplit
+
+# Selectors that suggest content appears only when scrolled into view
+LAZY_MARKERS = ", ".join(
+    (
+        'img[loading="lazy"]',
+        "img[data-src]",
+        "[data-lazy]",
+        "[data-lazy-src]",
+        ".lazyload",
+        ".lazy",
+        "[data-infinite-scroll]",
+        ".infinite-scroll",
+        "[data-next-page]",
+        "[x-intersect]",
+    )
+)
+
+# Counts IntersectionObservers (the usual lazy-loading primitive); added
+# before the page's own scripts run
+_INIT_JS = """
+(() => {
+  const IO = window.IntersectionObserver;
+  if (!IO || IO.__crawlerCounted) return;
+  window.__crawlerIO = 0;
+  const Counted = function (cb, opts) { window.__crawlerIO++; return new IO(cb, opts); };
+  Counted.prototype = IO.prototype;
+  Counted.__crawlerCounted = true;
+  window.IntersectionObserver = Counted;
+})();
+"""
+
+# Resolves once neither the DOM nor the network changed for `quietMs`, or
+# after `maxMs`; also reports whether the page looks lazy-loading
+_SETTLE_JS = """
+async ({quietMs, maxMs, markers}) => {
+  const t0 = performance.now();
+  let last = t0;
+  const bump = () => { last = performance.now(); };
+  const mo = new MutationObserver(bump);
+  mo.observe(document.documentElement, {subtree: true, childList: true, characterData: true});
+  let po = null;
+  try { po = new PerformanceObserver(bump); po.observe({type: "resource"}); } catch (e) {}
+  let timedOut = false;
+  await new Promise((resolve) => {
+    const tick = () => {
+      const now = performance.now();
+      if (now - last >= quietMs) return resolve();
+      if (now - t0 >= maxMs) { timedOut = true; return resolve(); }
+      setTimeout(tick, 25);
+    };
+    tick();
+  });
+  mo.disconnect();
+  if (po) po.disconnect();
+  const el = document.scrollingElement || document.documentElement;
+  return {
+    waited: performance.now() - t0,
+    timedOut,
+    lazy: (window.__crawlerIO || 0) > 0 || document.querySelector(markers) !== null,
+    scrollable: el.scrollHeight > window.innerHeight * 1.2,
+  };
+}
+"""
+
+# Scrolls a viewport at a time, letting each step settle, until the bottom
+# stops moving; then back to the top (like crawl4ai's full-page scan)
+_SCROLL_JS = """
+async ({quietMs, maxMs, maxSteps}) => {
+  const t0 = performance.now();
+  const el = document.scrollingElement || document.documentElement;
+  const textBefore = document.body ? document.body.textContent.length : 0;
+  let last = t0;
+  const mo = new MutationObserver(() => { last = performance.now(); });
+  mo.observe(document.documentElement, {subtree: true, childList: true});
+  const settle = () => new Promise((resolve) => {
+    const tick = () => {
+      const now = performance.now();
+      if (now - last >= quietMs || now - t0 >= maxMs) return resolve();
+      setTimeout(tick, 25);
+    };
+    tick();
+  });
+  let steps = 0;
+  while (steps < maxSteps && performance.now() - t0 < maxMs) {
+    window.scrollTo(0, el.scrollTop + window.innerHeight);
+    steps++;
+    last = performance.now();
+    await settle();
+    if (el.scrollTop + window.innerHeight >= el.scrollHeight - 2) break;
+  }
+  window.scrollTo(0, 0);
+  mo.disconnect();
+  const textAfter = document.body ? document.body.textContent.length : 0;
+  return {steps, gained: textAfter - textBefore, waited: performance.now() - t0};
+}
+"""
+
+
+class HostProfile:
+    """What earlier pages of one host taught us about waiting and scrolling."""
+
+    def __init__(self, window: int):
+        self.settle_ms = deque(maxlen=window)  # time to quiet, timeouts excluded
+        self.pages = 0
+        self.timeouts = 0
+        self.timeout_streak = 0  # consecutive pages that never went quiet
+        self.scrolls = 0
+        self.scroll_gains = 0  # scrolls that added content
+        self.scroll_skipped = 0
+
+    def busy(self, busy_after: int) -> bool:
+        """Pages here keep timing out: the host never goes quiet (polling, ads)."""
+        return self.timeout_streak >= busy_after
+
+    def max_wait(
+        self,
+        quiet_ms: float,
+        ceiling_ms: float,
+        learn_after: int,
+        busy_after: int = 3,
+        busy_ms: float = 1000,
+        probe_every: int = 20,
+    ) -> float:
+        """
+        p90 of this host's settle times with headroom, once learned. On a
+        busy host waiting longer only buys more timeouts, so pages get
+        `busy_ms`, with the full ceiling every `probe_every` pages in case
+        the host has calmed down.
+        """
+        if self.busy(busy_after) and self.pages % probe_every:
+            return min(ceiling_ms, busy_ms)
+        if len(self.settle_ms) < learn_after:
+            return ceiling_ms
+        ordered = sorted(self.settle_ms)
+        p90 = ordered[int(0.9 * (len(ordered) - 1))]
+        return min(ceiling_ms, max(2 * quiet_ms, p90 * 1.5 + quiet_ms))
+
+    def should_scroll(self, probe_every: int = 20) -> bool:
+        """Scroll until 5 tries show it rarely adds content, then only re-probe."""
+        if self.scrolls < 5 or self.scroll_gains / self.scrolls >= 0.2:
+            return True
+        self.scroll_skipped += 1
+        return self.scroll_skipped % probe_every == 0
+
+
+class ReadinessEngine:
+    """
+    Replaces `delay_before_return_html` + `scan_full_page` (crawl4ai's
+    `before_retrieve_html` hook, see `hooks()`):
+
+    - wait until the DOM and network have been quiet for `quiet_ms`
+      (MutationObserver + resource timing), at most `max_ms`
+    - scroll only if the page shows lazy-load markers or created an
+      IntersectionObserver, and only on hosts where scrolling has paid off
+      (gained at least `min_gain` characters)
+    - after `learn_after` pages a host's ceiling drops to 1.5x the p90 of
+      its settle times, so one slow page type does not set every wait
+    - after `busy_after` timeouts in a row (pages that never go quiet) a
+      host waits only `busy_ms`, re-probing the full ceiling now and then
+
+    Failures (page closed, CSP blocking evaluate) fall through to the
+    capture without waiting.
+    """
+
+    def __init__(
+        self,
+        quiet_ms: float = 300,
+        max_ms: float = 4000,
+        scroll_steps: int = 20,
+        min_gain: int = 200,
+        learn_after: int = 5,
+        busy_after: int = 3,
+        busy_ms: float = 1000,
+        window: int = 50,
+    ):
+        self.quiet_ms = quiet_ms
+        self.max_ms = max_ms
+        self.scroll_steps = scroll_steps
+        self.min_gain = min_gain
+        self.learn_after = learn_after
+        self.busy_after = busy_after
+        self.busy_ms = busy_ms
+        self.window = window
+        self.hosts: dict[str, HostProfile] = {}
+        self.waits = deque(maxlen=1000)  # ms per page, settle + scroll
+        self.pages = 0
+        self.scrolled = 0
+        self.errors = 0
+        self._pages = weakref.WeakSet()  # pages with the init script
+
+    def _max_wait(self, profile: HostProfile) -> float:
+        return profile.max_wait(
+            self.quiet_ms, self.max_ms, self.learn_after, self.busy_after, self.busy_ms
+        )
+
+    def profile(self, host: str) -> HostProfile:
+        profile = self.hosts.get(host)
+        if profile is None:
+            profile = self.hosts[host] = HostProfile(self.window)
+        return profile
+
+    async def wait(self, page):
+        t0 = time.perf_counter()
+        profile = self.profile(urlsplit(page.url).netloc)
+        try:
+            settled = await page.evaluate(
+                _SETTLE_JS,
+                {
+                    "quietMs": self.quiet_ms,
+                    "maxMs": self._max_wait(profile),
+                    "markers": LAZY_MARKERS,
+                },
+            )
+            profile.pages += 1
+            self.pages += 1
+            if settled["timedOut"]:
+                profile.timeouts += 1
+                profile.timeout_streak += 1
+            else:
+                profile.settle_ms.append(settled["waited"])
+                profile.timeout_streak = 0
+            if settled["lazy"] and settled["scrollable"] and profile.should_scroll():
+                scrolled = await page.evaluate(
+                    _SCROLL_JS,
+                    {
+                        "quietMs": self.quiet_ms,
+                        "maxMs": self.max_ms,
+                        "maxSteps": self.scroll_steps,
+                    },
+                )
+                profile.scrolls += 1
+                profile.scroll_gains += scrolled["gained"] >= self.min_gain
+                self.scrolled += 1
+        except Exception:
+            self.errors += 1
+        self.waits.append((time.perf_counter() - t0) * 1000)
+
+    def hooks(self) -> dict:
+        """Hooks for AsyncPlaywrightCrawlerStrategy.set_hook."""
+
+        async def _on_page_context_created(page, *args, **kwargs):
+            if page not in self._pages:
+                self._pages.add(page)
+                await page.add_init_script(_INIT_JS)
+            return page
+
+        async def _before_retrieve_html(page, *args, **kwargs):
+            await self.wait(page)
+            return page
+
+        return {
+            "on_page_context_created": _on_page_context_created,
+            "before_retrieve_html": _before_retrieve_html,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "pages": self.pages,
+            "wait_ms_p50": round(median(self.waits), 1) if self.waits else None,
+            "scrolled": self.scrolled,
+            "scroll_skipped": sum(p.scroll_skipped for p in self.hosts.values()),
+            "timeouts": sum(p.timeouts for p in self.hosts.values()),
+            "errors": self.errors,
+            "hosts": {
+                host: {
+                    "pages": p.pages,
+                    "settle_ms_p50": round(median(p.settle_ms), 1) if p.settle_ms else None,
+                    "max_wait_ms": round(self._max_wait(p), 1),
+                    "busy": p.busy(self.busy_after),
+                    "scrolls": p.scrolls,
+                    "scroll_gains": p.scroll_gains,
+                }
+                for host, p in self.hosts.items()
+            },
+        }
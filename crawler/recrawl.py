@@ -0,0 +1,152 @@
+# recrawl.py
+# Incremental recrawl: remember validators + content hashes between runs
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+def content_hash(md: str) -> str:
+    return hashlib.sha256(md.encode("utf-8")).hexdigest()
+
+
+def _header(headers, name):
+    if not headers:
+        return None
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return None
+
+
+class RecrawlStore:
+    """
+    Per-URL memory that survives across runs: ETag, Last-Modified, markdown
+    hash, where the markdown was saved and the page's outgoing links (so a
+    page skipped as unchanged can still feed the frontier).
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                md_hash TEXT,
+                path_md TEXT,
+                links TEXT,
+                updated REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> dict | None:
+        row = self.conn.execute(
+            "SELECT etag, last_modified, md_hash, path_md, links FROM pages WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if not row:
+            return None
+        rec = dict(zip(("etag", "last_modified", "md_hash", "path_md", "links"), row))
+        rec["links"] = json.loads(rec["links"]) if rec["links"] else []
+        return rec
+
+    def put(self, url: str, r, md_hash: str | None, path_md: str | None = None):
+        """Record what this run saw for `url` (crawl4ai result `r`)."""
+        headers = getattr(r, "response_headers", None)
+        links = [
+            link.get("href")
+            for link in (getattr(r, "links", None) or {}).get("internal", [])
+            if isinstance(link, dict) and link.get("href")
+        ]
+        prev = self.get(url)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages "
+            "(url, etag, last_modified, md_hash, path_md, links, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                url,
+                _header(headers, "etag"),
+                _header(headers, "last-modified"),
+                md_hash,
+                path_md or (prev["path_md"] if prev else None),
+                json.dumps(links),
+                time.time(),
+            ),
+        )
+
+    def unchanged(self, url: str, md_hash: str) -> bool:
+        prev = self.get(url)
+        return bool(prev and prev["md_hash"] == md_hash)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class ConditionalPrecheck:
+    """
+    Cheap pre-fetch check: a conditional GET (If-None-Match/If-Modified-Since)
+    for every URL we have validators for. A 304 means the page is skipped
+    without ever reaching the browser.
+    """
+
+    def __init__(self, store: RecrawlStore, user_agent: str, timeout: float = 10, scheduler=None):
+        self.store = store
+        self.user_agent = user_agent
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.scheduler = scheduler  # shares the per-host politeness budget
+        self.skipped = 0
+        self._session = None
+
+    async def _session_get(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout, headers={"User-Agent": self.user_agent}
+            )
+        return self._session
+
+    async def _check(self, url: str) -> list | None:
+        prev = self.store.get(url)
+        if not prev or not (prev["etag"] or prev["last_modified"]):
+            return None
+        headers = {}
+        if prev["etag"]:
+            headers["If-None-Match"] = prev["etag"]
+        if prev["last_modified"]:
+            headers["If-Modified-Since"] = prev["last_modified"]
+        paced = self.scheduler.request(urlsplit(url).netloc) if self.scheduler else nullcontext()
+        try:
+            async with paced:
+                session = await self._session_get()
+                async with session.get(url, headers=headers, allow_redirects=False) as resp:
+                    if resp.status == 304:
+                        return prev["links"]
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        return None
+
+    async def unchanged(self, urls) -> dict:
+        """{url: stored links} for every URL the server says is unchanged."""
+        urls = list(urls)
+        found = await asyncio.gather(*(self._check(u) for u in urls))
+        out = {u: links for u, links in zip(urls, found) if links is not None}
+        self.skipped += len(out)
+        return out
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
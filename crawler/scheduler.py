@@ -0,0 +1,240 @@
+# scheduler.py
+# Per-host politeness + global tab budget (replaces the single run-wide semaphore)
+
+import asyncio
+import itertools
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Classic token bucket: refills at `rate` tokens/sec, holds at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def configure(self, rate: float, capacity: float):
+        self._refill()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    async def take(self) -> float:
+        """Wait for one token; returns seconds spent waiting."""
+        waited = 0.0
+        async with self._lock:  # FIFO-ish: one waiter drains at a time
+            while True:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                pause = (1.0 - self.tokens) / self.rate
+                waited += pause
+                await asyncio.sleep(pause)
+
+
+class TabBudget:
+    """Counting semaphore that can hand out several tabs at once."""
+
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self.in_use = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, n: int = 1) -> int:
+        n = max(1, min(n, self.total))
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_use + n <= self.total)
+            self.in_use += n
+        return n
+
+    async def release(self, n: int = 1):
+        async with self._cond:
+            self.in_use -= n
+            self._cond.notify_all()
+
+
+class _HostState:
+    def __init__(self, delay: float, concurrency: int):
+        self.delay = delay
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate=concurrency / delay, capacity=concurrency)
+        self.requests = 0
+        self.wait_sec = 0.0
+        self.inflight = {}  # request key -> expiry (monotonic)
+        self.freed = asyncio.Event()
+
+    async def enter(self, key, hold: float):
+        """Wait until fewer than `concurrency` requests are in flight."""
+        while True:
+            now = time.monotonic()
+            for k, expiry in list(self.inflight.items()):
+                if expiry <= now:  # never released (page crashed mid-load)
+                    del self.inflight[k]
+            if len(self.inflight) < self.concurrency:
+                self.inflight[key] = now + hold
+                return
+            self.freed.clear()
+            try:
+                await asyncio.wait_for(
+                    self.freed.wait(), min(self.inflight.values()) - now
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def leave(self, key):
+        if self.inflight.pop(key, None) is not None:
+            self.freed.set()
+
+
+class HostScheduler:
+    """
+    Politeness is a per-host constraint, so every host gets its own token
+    bucket: `concurrency` requests per `delay` seconds, where the delay is
+    `base_delay` plus a per-host jitter drawn once from [jitter_min, jitter_max].
+
+    `concurrency` is also a live cap on the host's requests in flight:
+    `before_goto_hook` holds a slot until the page is captured or closed
+    (or `hold_sec` passes), so lowering it with `set_rate` takes effect on
+    the next navigation, not the next seed.
+
+    Tabs are a machine constraint, so they come from one global TabBudget.
+    Many hosts can be crawled in parallel while any single host still sees
+    the polite rate.
+    """
+
+    def __init__(
+        self,
+        base_delay: float,
+        jitter_min: float,
+        jitter_max: float,
+        per_host_concurrency: int,
+        tab_budget: int,
+        max_delay: float | None = None,
+        hold_sec: float = 120.0,
+    ):
+        self.base_delay = base_delay
+        self.jitter_min = jitter_min
+        self.jitter_max = jitter_max
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.max_delay = max_delay
+        self.hold_sec = hold_sec
+        self.tabs = TabBudget(tab_budget)
+        self._hosts: dict[str, _HostState] = {}
+        self._seed_tabs: dict[str, int] = {}  # host -> tabs reserved by seed_slot
+        self._pages = weakref.WeakKeyDictionary()  # page -> (host, key) in flight
+        self._keys = itertools.count()
+
+    def host(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            delay = self.base_delay + random.uniform(self.jitter_min, self.jitter_max)
+            if self.max_delay:
+                delay = min(delay, self.max_delay)
+            state = _HostState(delay, self.per_host_concurrency)
+            self._hosts[host] = state
+        return state
+
+    def set_rate(self, host: str, delay: float, concurrency: int):
+        """Retune one host's bucket (used by the adaptive rate controller)."""
+        state = self.host(host)
+        state.delay = delay
+        state.concurrency = max(1, concurrency)
+        state.bucket.configure(rate=state.concurrency / delay, capacity=state.concurrency)
+        state.freed.set()  # a raised limit admits waiters right away
+
+    async def wait_turn(self, host: str):
+        """Block until `host` may receive another request."""
+        state = self.host(host)
+        state.wait_sec += await state.bucket.take()
+        state.requests += 1
+
+    @asynccontextmanager
+    async def request(self, host: str):
+        """One non-browser request to `host`: in-flight slot + paced start."""
+        state = self.host(host)
+        key = next(self._keys)
+        await state.enter(key, self.hold_sec)
+        try:
+            await self.wait_turn(host)
+            yield
+        finally:
+            state.leave(key)
+
+    @asynccontextmanager
+    async def seed_slot(self, host: str, tabs: int | None = None):
+        """Reserve tabs from the global budget for the duration of one seed."""
+        granted = await self.tabs.acquire(tabs or self.per_host_concurrency)
+        self._seed_tabs[host] = self._seed_tabs.get(host, 0) + granted
+        try:
+            yield granted
+        finally:
+            self._seed_tabs[host] -= granted
+            if not self._seed_tabs[host]:
+                del self._seed_tabs[host]
+            await self.tabs.release(granted)
+
+    def seed_tabs(self, host: str) -> int:
+        """Tabs the host's running seeds hold from the global budget."""
+        return self._seed_tabs.get(host, 0)
+
+    def _page_done(self, page):
+        held = self._pages.pop(page, None)
+        if held is not None:
+            host, key = held
+            self.host(host).leave(key)
+
+    async def before_goto_hook(self, page, context=None, url=None, **kwargs):
+        """crawl4ai `before_goto` hook: caps and paces every navigation per host."""
+        self._page_done(page)  # page reused for another URL
+        if url:
+            host = urlsplit(url).netloc
+            key = next(self._keys)
+            await self.host(host).enter(key, self.hold_sec)
+            self._pages[page] = (host, key)
+            try:
+                page.once("close", lambda *_: self._page_done(page))
+            except Exception:
+                pass  # falls back to before_return_html / hold_sec
+            await self.wait_turn(host)
+        return page
+
+    def release_hooks(self) -> dict:
+        """
+        Hooks that hand a page's in-flight slot back once its HTML is
+        captured; `before_goto_hook` is installed separately (metrics time it).
+        """
+
+        async def _before_return_html(page=None, *args, **kwargs):
+            self._page_done(page)
+            return page
+
+        return {"before_return_html": _before_return_html}
+
+    def stats(self) -> dict:
+        return {
+            "tabs_in_use": self.tabs.in_use,
+            "tab_budget": self.tabs.total,
+            "hosts": {
+                h: {
+                    "delay": round(s.delay, 3),
+                    "concurrency": s.concurrency,
+                    "in_flight": len(s.inflight),
+                    "requests": s.requests,
+                    "wait_sec": round(s.wait_sec, 3),
+                }
+                for h, s in self._hosts.items()
+            },
+        }
@@ -0,0 +1,330 @@
+# search.py
+# Incremental on-disk inverted index over saved pages (BM25, mmap'd postings)
+#
+#   <root>/seg-<time>-<pid>/docs.jsonl    local doc id -> url, title, location, length
+#                          /terms.json    term -> [first entry, df]
+#                          /postings.bin  entry := u32 doc | u32 tf, grouped by term
+#                          /DONE          written last: the segment is complete
+#
+# Usage:
+#   python search.py "adidas shoe"                 # top 10 by BM25
+#   python search.py "adidas shoe" --all -k 50     # pages containing every term
+#   python search.py --compact                     # merge segments, drop stale docs
+
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import time
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from helper import file_lock
+
+INDEX_ROOT = Path(__file__).parent / "scraped" / "_index"
+_WORD = re.compile(r"\w+", re.UNICODE)
+_ENTRY = struct.Struct("<II")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or that the this "
+    "to was were will with".split()
+)
+
+
+def _stem(t: str) -> str:
+    # shoes -> shoe, but keep glass/class
+    return t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        _stem(t) for t in _WORD.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def _segment_dirs(root: Path):
+    return sorted(p for p in root.glob("seg-*") if (p / "DONE").exists())
+
+
+def _write_segment(
+    root: Path, docs: list[dict], postings: dict, name: str | None = None
+) -> Path:
+    seg = root / (name or f"seg-{time.time_ns():020d}-{os.getpid()}")
+    tmp = seg.with_name(seg.name + ".tmp")
+    tmp.mkdir(parents=True)
+    terms = {}
+    with open(tmp / "postings.bin", "wb") as pf:
+        pos = 0
+        for term in sorted(postings):
+            entries = postings[term]
+            terms[term] = [pos, len(entries)]
+            buf = array("I")
+            for doc, tf in entries:
+                buf.append(doc)
+                buf.append(tf)
+            pf.write(buf.tobytes())
+            pos += len(entries)
+    (tmp / "terms.json").write_text(json.dumps(terms), encoding="utf-8")
+    with open(tmp / "docs.jsonl", "w", encoding="utf-8") as df:
+        for d in docs:
+            df.write(json.dumps(d, ensure_ascii=False) + "\n")
+    tmp.rename(seg)
+    (seg / "DONE").write_text("", encoding="utf-8")
+    return seg
+
+
+def _merged_name(newest: str) -> str:
+    """seg-<t>-<pid> -> seg-<t>-<pid>-c000001 (-c000002 when merged again)."""
+    base, sep, gen = newest.rpartition("-c")
+    if sep and gen.isdigit():
+        return f"{base}-c{int(gen) + 1:06d}"
+    return f"{newest}-c000001"
+
+
+class IndexWriter:
+    """
+    Buffers pages in memory and flushes them as an immutable segment every
+    `flush_docs` pages or `flush_sec` seconds, so the index is searchable
+    while the crawl runs. A re-crawled URL is simply added again; readers
+    keep the newest copy. Segments from several processes can coexist.
+    """
+
+    def __init__(self, root, flush_docs: int = 500, flush_sec: float = 30.0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.flush_docs = flush_docs
+        self.flush_sec = flush_sec
+        self._reset()
+        self.added = 0
+        self.segments_written = 0
+
+    def _reset(self):
+        self.docs = []
+        self.postings = defaultdict(list)
+        self._last_flush = time.monotonic()
+
+    def add(self, url: str, text: str, **meta):
+        counts = Counter(tokenize(text))
+        doc = len(self.docs)
+        self.docs.append({"url": url, "len": sum(counts.values()), **meta})
+        for term, tf in counts.items():
+            self.postings[term].append((doc, tf))
+        self.added += 1
+        if (
+            len(self.docs) >= self.flush_docs
+            or time.monotonic() - self._last_flush >= self.flush_sec
+        ):
+            self.flush()
+
+    def flush(self):
+        if self.docs:
+            _write_segment(self.root, self.docs, self.postings)
+            self.segments_written += 1
+        self._reset()
+
+    def close(self, compact: bool = False, max_segments: int = 16):
+        self.flush()
+        if compact and len(_segment_dirs(self.root)) > max_segments:
+            SearchIndex(self.root).compact()
+
+    def stats(self) -> dict:
+        return {"pages": self.added, "segments_written": self.segments_written}
+
+
+class _Segment:
+    def __init__(self, path: Path):
+        self.path = path
+        self.terms = json.loads((path / "terms.json").read_text(encoding="utf-8"))
+        with open(path / "docs.jsonl", encoding="utf-8") as f:
+            self.docs = [json.loads(line) for line in f if line.strip()]
+        self._file = open(path / "postings.bin", "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+        self.live = [True] * len(self.docs)
+
+    def postings(self, term: str):
+        """(doc, tf) pairs for `term`, read straight from the mmap."""
+        hit = self.terms.get(term)
+        if not hit:
+            return ()
+        start, n = hit
+        buf = array("I")
+        buf.frombytes(self._map[start * _ENTRY.size : (start + n) * _ENTRY.size])
+        return zip(buf[0::2], buf[1::2])
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class SearchIndex:
+    """
+    Read side: opens every finished segment under `root` and answers BM25
+    queries. Only the newest copy of each URL counts. `refresh()` picks up
+    segments written since the index was opened.
+    """
+
+    def __init__(self, root, k1: float = 1.2, b: float = 0.75):
+        self.root = Path(root)
+        self.k1 = k1
+        self.b = b
+        self.segments: list[_Segment] = []
+        self.n_docs = 0
+        self.avgdl = 0.0
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Reload if segments were added or merged; True if anything changed."""
+        paths = _segment_dirs(self.root) if self.root.exists() else []
+        if paths == [s.path for s in self.segments]:
+            return False
+        keep = {s.path: s for s in self.segments}
+        for s in self.segments:
+            if s.path not in paths:
+                s.close()
+        self.segments = [keep.get(p) or _Segment(p) for p in paths]
+
+        # newest copy of a URL wins (segments sort oldest -> newest)
+        latest = {}
+        for si, seg in enumerate(self.segments):
+            for di, doc in enumerate(seg.docs):
+                latest[doc["url"]] = (si, di)
+        self.n_docs = len(latest)
+        total_len = 0
+        for si, seg in enumerate(self.segments):
+            seg.live = [latest[d["url"]] == (si, di) for di, d in enumerate(seg.docs)]
+            total_len += sum(d["len"] for d, live in zip(seg.docs, seg.live) if live)
+        self.avgdl = total_len / self.n_docs if self.n_docs else 0.0
+        return True
+
+    def _matches(self, terms):
+        """{(segment, doc): {term: tf}} for live docs containing any term."""
+        hits = defaultdict(dict)
+        for si, seg in enumerate(self.segments):
+            live = seg.live
+            for term in terms:
+                for doc, tf in seg.postings(term):
+                    if live[doc]:
+                        hits[(si, doc)][term] = tf
+        return hits
+
+    def search(self, query: str, k: int = 10, require_all: bool = False) -> list[dict]:
+        """Top `k` pages for `query` by BM25 (optionally only pages with every term)."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.n_docs:
+            return []
+        hits = self._matches(terms)
+        df = Counter(t for tfs in hits.values() for t in tfs)
+        idf = {
+            t: math.log(1 + (self.n_docs - df[t] + 0.5) / (df[t] + 0.5)) for t in terms
+        }
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        scored = []
+        for (si, doc), tfs in hits.items():
+            if require_all and len(tfs) < len(terms):
+                continue
+            dl = self.segments[si].docs[doc]["len"]
+            norm = k1 * (1 - b + b * dl / avgdl)
+            score = sum(idf[t] * tf * (k1 + 1) / (tf + norm) for t, tf in tfs.items())
+            scored.append((score, si, doc))
+        scored.sort(reverse=True)
+        return [
+            {**self.segments[si].docs[doc], "score": round(score, 4)}
+            for score, si, doc in scored[:k]
+        ]
+
+    def urls_containing(self, terms) -> set[str]:
+        """URLs of pages whose content has every one of `terms`."""
+        terms = list(dict.fromkeys(t for term in terms for t in tokenize(term)))
+        if not terms:
+            return set()
+        return {
+            self.segments[si].docs[doc]["url"]
+            for (si, doc), tfs in self._matches(terms).items()
+            if len(tfs) == len(terms)
+        }
+
+    def compact(self) -> Path | None:
+        """
+        Merge every segment into one, dropping superseded copies of URLs.
+
+        The merged segment takes the place of the newest one it replaces in
+        the sort order, so segments flushed meanwhile still win over it.
+        Compactions (from any process) are serialised by `root/.compact.lock`.
+        """
+        if not self.root.exists():
+            return None
+        with open(self.root / ".compact.lock", "a+b") as lock, file_lock(lock):
+            self.refresh()  # another compaction may have run while we waited
+            if len(self.segments) < 2:
+                return None
+            return self._merge()
+
+    def _merge(self) -> Path:
+        docs, postings = [], defaultdict(list)
+        for seg in self.segments:
+            remap = {}
+            for di, doc in enumerate(seg.docs):
+                if seg.live[di]:
+                    remap[di] = len(docs)
+                    docs.append(doc)
+            for term in seg.terms:
+                for doc, tf in seg.postings(term):
+                    if doc in remap:
+                        postings[term].append((remap[doc], tf))
+        merged = _write_segment(
+            self.root, docs, postings, name=_merged_name(self.segments[-1].path.name)
+        )
+        old = [s.path for s in self.segments]
+        self.close()
+        for path in old:
+            (path / "DONE").unlink(missing_ok=True)
+            shutil.rmtree(path, ignore_errors=True)
+        self.refresh()
+        return merged
+
+    def stats(self) -> dict:
+        return {
+            "segments": len(self.segments),
+            "docs": self.n_docs,
+            "avg_len": round(self.avgdl, 1),
+        }
+
+    def close(self):
+        for s in self.segments:
+            s.close()
+        self.segments = []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search crawled pages")
+    parser.add_argument("query", nargs="?", help="Search terms")
+    parser.add_argument(
+        "--root",
+        help="Index directory",
+        default=str(INDEX_ROOT),
+    )
+    parser.add_argument("-k", help="No. of results", type=int, default=10)
+    parser.add_argument("--all", help="Only pages containing every term", action="store_true")
+    parser.add_argument("--compact", help="Merge segments into one", action="store_true")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.root)
+    if args.compact:
+        index.compact()
+        print(index.stats())
+    if args.query:
+        t0 = time.perf_counter()
+        results = index.search(args.query, k=args.k, require_all=args.all)
+        ms = (time.perf_counter() - t0) * 1000
+        for r in results:
+            print(f"{r['score']:8.3f}  {r['url']}  {r.get('title') or ''}")
+        print(f"# {len(results)} results in {ms:.1f} ms ({index.stats()['docs']} pages)")
+    index.close()
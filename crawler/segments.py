@@ -0,0 +1,253 @@
+# segments.py
+# Packed segment output: compressed page records in large files + offset index
+#
+#   <root>/seg-00000.dat  record*   record := u8 codec | u32 len | payload
+#   <root>/index.idx      header + entry*   entry := u64 url_hash | u32 seg | u64 off | u32 len
+#
+# Usage (reader):
+#   python segments.py scraped/<domain>/segments            # scan all records
+#   python segments.py scraped/<domain>/segments -u <URL>   # random lookup
+
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+import zlib
+from pathlib import Path
+
+from helper import file_lock
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib keeps the backend usable without it
+    zstandard = None
+
+CODEC_RAW, CODEC_ZLIB, CODEC_ZSTD = 0, 1, 2
+
+_REC = struct.Struct("<BI")
+_ENTRY = struct.Struct("<QIQI")
+_IDX_MAGIC = b"SIDX"
+_IDX_HEADER = struct.Struct("<4sBB")  # magic, version, sorted flag
+_IDX_VERSION = 1
+
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _segment_name(seg: int) -> str:
+    return f"seg-{seg:05d}.dat"
+
+
+class SegmentWriter:
+    """
+    Appends page records to `seg-NNNNN.dat` files under `root`, rolling over
+    at `max_segment_bytes`. `index.idx` is appended to as records land and
+    sorted by URL hash on close, so readers can binary-search it in place.
+    Any number of writers, in one process or several, may share `root`:
+    appends and the sort are serialised by a lock on `root/.lock`.
+    """
+
+    def __init__(self, root, max_segment_bytes: int = 256 * 1024 * 1024, level: int = 3):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        if zstandard is not None:
+            self.codec = CODEC_ZSTD
+            self._compress = zstandard.ZstdCompressor(level=level).compress
+        else:
+            self.codec = CODEC_ZLIB
+            self._compress = lambda b: zlib.compress(b, 6)
+
+        # Several writers may share `root` (seeds of one domain, --workers):
+        # every append happens under the lock, at the current end of the files
+        self._lock_file = open(self.root / ".lock", "a+b")
+        with file_lock(self._lock_file):
+            existing = sorted(self.root.glob("seg-*.dat"))
+            self.seg = int(existing[-1].stem.split("-")[1]) if existing else 0
+            self._seg_file = open(self.root / _segment_name(self.seg), "ab")
+
+            idx_path = self.root / "index.idx"
+            new_idx = not idx_path.exists() or idx_path.stat().st_size == 0
+            self._idx = open(idx_path, "r+b" if not new_idx else "w+b")
+            if new_idx:
+                self._idx.write(_IDX_HEADER.pack(_IDX_MAGIC, _IDX_VERSION, 0))
+                self._idx.flush()
+        self.records = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _latest_segment(self):
+        """Follow segments another writer has rolled over to."""
+        seg = self.seg
+        while (self.root / _segment_name(seg + 1)).exists():
+            seg += 1
+        if seg != self.seg:
+            self._seg_file.close()
+            self.seg = seg
+            self._seg_file = open(self.root / _segment_name(seg), "ab")
+
+    def put(self, url: str, markdown: str, **meta) -> dict:
+        """Append one record; returns its location (segment file + offset)."""
+        payload = json.dumps(
+            {"url": url, "markdown": markdown, **meta}, ensure_ascii=False
+        ).encode("utf-8")
+        packed = self._compress(payload)
+        length = _REC.size + len(packed)
+
+        with file_lock(self._lock_file):
+            self._latest_segment()
+            offset = self._seg_file.seek(0, 2)
+            if offset and offset + length > self.max_segment_bytes:
+                self._seg_file.close()
+                self.seg += 1
+                self._seg_file = open(self.root / _segment_name(self.seg), "ab")
+                offset = self._seg_file.seek(0, 2)
+
+            self._seg_file.write(_REC.pack(self.codec, len(packed)))
+            self._seg_file.write(packed)
+            self._seg_file.flush()
+            self._idx.seek(5)
+            self._idx.write(b"\x00")  # appending -> no longer sorted
+            self._idx.seek(0, 2)
+            self._idx.write(_ENTRY.pack(url_hash(url), self.seg, offset, length))
+            self._idx.flush()
+
+        self.records += 1
+        self.bytes_in += len(payload)
+        self.bytes_out += length
+        return {"segment": _segment_name(self.seg), "offset": offset, "length": length}
+
+    def close(self):
+        self._seg_file.close()
+        # sort entries by url hash so lookups can binary-search the mmap;
+        # covers other writers' entries too (they clear the flag on next put)
+        with file_lock(self._lock_file):
+            self._idx.seek(_IDX_HEADER.size)
+            raw = self._idx.read()
+            raw = raw[: len(raw) - len(raw) % _ENTRY.size]
+            entries = sorted(
+                _ENTRY.unpack_from(raw, i) for i in range(0, len(raw), _ENTRY.size)
+            )
+            self._idx.seek(0)
+            self._idx.truncate()
+            self._idx.write(_IDX_HEADER.pack(_IDX_MAGIC, _IDX_VERSION, 1))
+            self._idx.write(b"".join(_ENTRY.pack(*e) for e in entries))
+            self._idx.close()
+        self._lock_file.close()
+
+
+def _decode(codec: int, data) -> dict:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("segment was written with zstd; pip install zstandard")
+        data = zstandard.ZstdDecompressor().decompress(bytes(data))
+    elif codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    return json.loads(bytes(data))
+
+
+class SegmentReader:
+    """Memory-mapped reader: `get(url)` for random lookup, `scan()` for a full pass."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._maps = {}
+        idx_path = self.root / "index.idx"
+        self._idx_file = open(idx_path, "rb")
+        size = idx_path.stat().st_size
+        self._idx = (
+            mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if size
+            else b""
+        )
+        magic, _, is_sorted = _IDX_HEADER.unpack_from(self._idx, 0)
+        if magic != _IDX_MAGIC:
+            raise ValueError(f"{idx_path} is not a segment index")
+        self.count = (len(self._idx) - _IDX_HEADER.size) // _ENTRY.size
+        self._by_hash = None
+        if not is_sorted:
+            # writer still open / crashed: fall back to an in-memory map
+            self._by_hash = {}
+            for i in range(self.count):
+                e = self._entry(i)
+                self._by_hash.setdefault(e[0], []).append(e)
+
+    def _entry(self, i: int):
+        return _ENTRY.unpack_from(self._idx, _IDX_HEADER.size + i * _ENTRY.size)
+
+    def _segment(self, seg: int):
+        m = self._maps.get(seg)
+        if m is None:
+            f = open(self.root / _segment_name(seg), "rb")
+            m = self._maps[seg] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            f.close()
+        return m
+
+    def _read(self, seg: int, offset: int) -> dict:
+        m = self._segment(seg)
+        codec, n = _REC.unpack_from(m, offset)
+        start = offset + _REC.size
+        return _decode(codec, m[start : start + n])
+
+    def _candidates(self, h: int):
+        if self._by_hash is not None:
+            return self._by_hash.get(h, [])
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        out = []
+        while lo < self.count and self._entry(lo)[0] == h:
+            out.append(self._entry(lo))
+            lo += 1
+        return out
+
+    def get(self, url: str) -> dict | None:
+        """Latest record stored for `url` (None if absent)."""
+        # entries are ordered by (hash, segment, offset): last match is newest
+        for _, seg, off, _ in reversed(self._candidates(url_hash(url))):
+            rec = self._read(seg, off)
+            if rec.get("url") == url:
+                return rec
+        return None
+
+    def scan(self):
+        """Yield every record in write order, segment by segment."""
+        for path in sorted(self.root.glob("seg-*.dat")):
+            if path.stat().st_size == 0:
+                continue
+            m = self._segment(int(path.stem.split("-")[1]))
+            pos = 0
+            while pos + _REC.size <= len(m):
+                codec, n = _REC.unpack_from(m, pos)
+                start = pos + _REC.size
+                yield _decode(codec, m[start : start + n])
+                pos = start + n
+
+    def close(self):
+        for m in self._maps.values():
+            m.close()
+        if isinstance(self._idx, mmap.mmap):
+            self._idx.close()
+        self._idx_file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read packed crawl segments")
+    parser.add_argument("root", help="segments directory (scraped/<domain>/segments)")
+    parser.add_argument("-u", "--url", help="Look up a single URL")
+    args = parser.parse_args()
+
+    reader = SegmentReader(args.root)
+    if args.url:
+        rec = reader.get(args.url)
+        print(rec["markdown"] if rec else f"{args.url} not found")
+    else:
+        for rec in reader.scan():
+            print(json.dumps({k: v for k, v in rec.items() if k != "markdown"}))
+    reader.close()
@@ -0,0 +1,584 @@
+# service.py
+# Long-lived crawl service: crawl4ai stays imported and the browser pool stays
+# warm, so a job starts crawling as soon as it is submitted. Jobs run side by
+# side on one event loop and share one HostScheduler (per-host politeness and
+# the global tab budget), split fairly between them.
+#
+# Usage:
+#   python service.py                        # JSON API on SERVICE_ADDR
+#   python service.py --addr 127.0.0.1:8766 --tabs 16 --browsers 2
+#
+# Off loopback every request must carry `Authorization: Bearer <token>`
+# (--token / SERVICE_TOKEN); the service refuses to listen there without one.
+#
+#   POST /jobs              {"url": "https://a.com https://b.com", "depth": 2, ...}
+#   GET  /jobs              all jobs with progress
+#   GET  /jobs/<id>         one job (per-seed progress)
+#   POST /jobs/<id>/cancel
+#   GET  /status            pool, tab budget and fair-share state
+#
+# Job fields follow the crawl_seeded.py flags (and the GUI form): url |
+# seedfile, prioritize, depth, maxpages, globalmax, blocked, urlpattern,
+# blockedpattern.
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import crawl_seeded
+from catalogue import Catalogue
+from config import Mode
+from crawl_seeded import CrawlResources, crawl_rules, logger, run_scraper, run_settings
+from distributed import is_loopback
+from helper import initialize_seeds_vars, initialize_single_url
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class FairShare:
+    """
+    Seed slots of the shared tab budget (tab budget // per-host tabs), split
+    evenly between running jobs.
+
+    A job may start another seed while it holds fewer than
+    `slots // running jobs`; the share is recomputed whenever a job joins or
+    leaves, so a lone job gets the whole budget and a newcomer gets its part
+    as soon as the other jobs' current seeds finish (running seeds are never
+    interrupted).
+    """
+
+    def __init__(self, slots: int):
+        self.slots = max(1, slots)
+        self.held = {}  # job id -> seeds running
+        self._cond = asyncio.Condition()
+
+    def share(self) -> int:
+        return max(1, self.slots // max(1, len(self.held)))
+
+    async def join(self, job_id: str):
+        async with self._cond:
+            self.held.setdefault(job_id, 0)
+            self._cond.notify_all()
+
+    async def leave(self, job_id: str):
+        async with self._cond:
+            self.held.pop(job_id, None)
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, job_id: str):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.held[job_id] < self.share())
+            self.held[job_id] += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                if job_id in self.held:
+                    self.held[job_id] -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {"slots": self.slots, "share": self.share(), "held": dict(self.held)}
+
+
+def job_rules(spec: dict) -> dict:
+    """Crawl rules for one job, mirroring what the CLI flags do to the globals."""
+    rules = crawl_rules()
+    url_filters = list(rules["URL_FILTERS"])
+    blocked_keywords = list(rules["BLOCKED_KEYWORDS"])
+    if spec.get("prioritize"):
+        rules["KEYWORDS"] = [k.strip() for k in str(spec["prioritize"]).split() if k.strip()]
+    if spec.get("depth") is not None:
+        rules["MAX_DEPTH"] = int(spec["depth"])
+    if spec.get("maxpages") is not None:
+        rules["MAX_PAGES"] = int(spec["maxpages"])
+    if spec.get("globalmax") is not None:
+        rules["GLOBAL_MAX_PAGES"] = int(spec["globalmax"])
+    if spec.get("blocked"):
+        rules["BLOCKED_DOMAINS"] = str(spec["blocked"]).split()
+    urlpattern = str(spec.get("urlpattern") or "").lower().split()
+    if urlpattern:
+        rules["KEYWORDS"] = urlpattern
+        url_filters += [f"*{p}*" for p in urlpattern]
+    blockedpattern = str(spec.get("blockedpattern") or "").lower().split()
+    blocked_keywords += [f"*{p}*" for p in blockedpattern]
+    if not (urlpattern or blockedpattern):
+        rules["STRATEGY"] = Mode.BFS_STRATEGY
+    rules["URL_FILTERS"] = url_filters
+    rules["BLOCKED_KEYWORDS"] = blocked_keywords
+    return rules
+
+
+def job_seeds(spec: dict) -> list[dict]:
+    """Seed dicts for `url` (space separated) or `seedfile`; output files untouched."""
+    if spec.get("url"):
+        seeds = [initialize_single_url(u, resume=True) for u in str(spec["url"]).split()]
+    elif spec.get("seedfile"):
+        seeds = initialize_seeds_vars(str(spec["seedfile"]).strip(), resume=True)
+    else:
+        raise ValueError("Provide url or seedfile")
+    seeds = [s for s in seeds if s]
+    if not seeds:
+        raise ValueError("No valid seeds")
+    return seeds
+
+
+class Job:
+    def __init__(self, spec: dict, seeds: list[dict], rules: dict):
+        self.id = uuid.uuid4().hex[:8]
+        self.spec = spec
+        self.seeds = seeds
+        self.rules = rules
+        self.status = "queued"
+        self.error = None
+        self.run_id = None  # catalogue run
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.task = None
+        # written on the loop thread, read by API/GUI threads: guarded by _lock
+        self.active = {}  # seed url -> running Crawler
+        self.done = {}  # seed url -> summary + final counters
+        self._lock = threading.Lock()
+
+    def seed_started(self, crawler):
+        with self._lock:
+            self.active[crawler.seed_dict["url"]] = crawler
+
+    def seed_finished(self, summary):
+        with self._lock:
+            crawler = self.active.pop(summary["seed"], None)
+            counters = crawler.counters() if crawler is not None else {}
+            self.done[summary["seed"]] = {**counters, **summary}
+
+    def seeds_stopped(self):
+        with self._lock:
+            self.active.clear()
+
+    def progress(self, seeds: bool = False) -> dict:
+        with self._lock:
+            done = dict(self.done)
+            active = dict(self.active)
+        running = {url: c.counters() for url, c in active.items()}
+        counters = [*done.values(), *running.values()]
+        end = self.finished or time.time()
+        elapsed = end - self.started if self.started else 0.0
+        written = sum(c.get("written", 0) for c in counters)
+        out = {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "run_id": self.run_id,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed_sec": round(elapsed, 3),
+            "seeds_total": len(self.seeds),
+            "seeds_running": len(active),
+            "seeds_done": len(done),
+            "written": written,
+            "fetched": sum(c.get("fetched", 0) for c in counters),
+            "bytes": sum(c.get("bytes", 0) for c in counters),
+            "errors": sum(c.get("errors", 0) for c in counters),
+            "pages_per_sec": round(written / elapsed, 3) if elapsed else 0.0,
+        }
+        if seeds:
+            out["seeds"] = [
+                {"seed": url, "status": "done", **summary} for url, summary in done.items()
+            ] + [
+                {"seed": url, "status": "running", **c} for url, c in running.items()
+            ]
+        return out
+
+
+class CrawlService:
+    """
+    Runs crawl jobs on one background event loop over one CrawlResources
+    (warm browser pool, scheduler, rate controller, metrics and stores).
+
+    `submit`, `cancel`, `job` and `list_jobs` may be called from any thread (the
+    GUI's Flask handlers, the HTTP API). Listeners added to `listeners` are
+    called as `fn(event, job_progress)` from the loop thread when a job
+    starts, finishes a seed and ends. Each job is recorded as its own
+    catalogue run.
+    """
+
+    def __init__(self, keep_jobs: int | None = None):
+        self.keep_jobs = keep_jobs or crawl_seeded.SERVICE_KEEP_JOBS
+        self.jobs = {}  # id -> Job, oldest first
+        self.listeners = []
+        self.loop = None
+        self.resources = None
+        self.share = None
+        self.started = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    # --- lifecycle ---
+    def start(self, timeout: float = 120.0):
+        """Start the loop thread and launch the browsers (blocks until warm)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="crawl-service", daemon=True
+                )
+                self._thread.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("crawl service did not start")
+        if self._error is not None:
+            raise self._error
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._ready.is_set() and self._error is None and self.loop.is_running()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._open())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _open(self):
+        t0 = time.perf_counter()
+        self.resources = CrawlResources()
+        self.share = FairShare(
+            crawl_seeded.GLOBAL_TAB_BUDGET // max(1, crawl_seeded.BASE_CONCURRENCY)
+        )
+        await self.resources.start()
+        self.started = time.time()
+        logger.log_info(
+            f"Crawl service ready in {time.perf_counter() - t0:.1f}s "
+            f"({self.resources.pool.size} browsers, tab budget "
+            f"{self.resources.scheduler.tabs.total})"
+        )
+
+    def close(self, timeout: float = 60.0):
+        """Cancel running jobs, then close browsers and stores."""
+        if not self.running:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+    async def _shutdown(self):
+        tasks = [j.task for j in self.jobs.values() if j.task and not j.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.resources.log_stats()
+        await self.resources.close()
+
+    # --- jobs (any thread) ---
+    def submit(self, spec: dict) -> dict:
+        """Queue a job; returns its progress right away. ValueError if invalid."""
+        if not self.running:
+            raise RuntimeError("crawl service is not running")
+        seeds = job_seeds(spec)
+        rules = job_rules(spec)
+        with self._lock:
+            busy = {
+                s["allowed_domain"]: job.id
+                for job in self.jobs.values()
+                if job.status not in FINISHED
+                for s in job.seeds
+            }
+            for s in seeds:
+                if s["allowed_domain"] in busy:
+                    raise ValueError(
+                        f"{s['allowed_domain']} is being crawled by job {busy[s['allowed_domain']]}"
+                    )
+            job = Job(spec, seeds, rules)
+            self.jobs[job.id] = job
+            self._prune()
+        for s in seeds:
+            s["jsonl_path"].write_text("", encoding="utf-8")  # fresh run, as on the CLI
+        self.loop.call_soon_threadsafe(self._launch, job)
+        return job.progress()
+
+    def cancel(self, job_id: str) -> dict | None:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED:
+            self.loop.call_soon_threadsafe(self._cancel, job)
+        return job.progress()
+
+    def job(self, job_id: str, seeds: bool = True) -> dict | None:
+        job = self.jobs.get(job_id)
+        return job.progress(seeds=seeds) if job is not None else None
+
+    def list_jobs(self) -> list[dict]:
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [j.progress() for j in reversed(jobs)]  # newest first
+
+    def active_jobs(self) -> int:
+        return sum(j.status not in FINISHED for j in list(self.jobs.values()))
+
+    def status(self) -> dict:
+        if not self.running:
+            return {"running": False}
+        return asyncio.run_coroutine_threadsafe(self._status(), self.loop).result(10)
+
+    async def _status(self) -> dict:
+        scheduler = self.resources.scheduler.stats()
+        return {
+            "running": True,
+            "started": self.started,
+            "uptime_sec": round(time.time() - self.started, 3),
+            "jobs": {
+                s: sum(j.status == s for j in self.jobs.values())
+                for s in ("queued", "running", *FINISHED)
+            },
+            "fair_share": self.share.stats(),
+            "tabs_in_use": scheduler["tabs_in_use"],
+            "tab_budget": scheduler["tab_budget"],
+            "pool": self.resources.pool.stats(),
+        }
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.status in FINISHED]
+        for job in finished[: max(0, len(self.jobs) - self.keep_jobs)]:
+            del self.jobs[job.id]
+
+    # --- loop thread ---
+    def _launch(self, job: Job):
+        if job.status == "queued":
+            job.task = self.loop.create_task(self._run_job(job))
+
+    def _cancel(self, job: Job):
+        if job.task is not None:
+            job.task.cancel()
+        elif job.status == "queued":
+            job.status = "cancelled"
+            job.finished = time.time()
+            self._notify("cancelled", job)
+
+    def _notify(self, event: str, job: Job):
+        progress = job.progress()
+        for listener in list(self.listeners):
+            try:
+                listener(event, progress)
+            except Exception as e:
+                logger.log_error(f"Crawl service listener failed: {e}")
+
+    async def _run_job(self, job: Job):
+        job.status = "running"
+        job.started = time.time()
+        catalogue = None
+
+        def progress(summary):
+            job.seed_finished(summary)
+            self._notify("seed", job)
+
+        try:
+            await self.share.join(job.id)
+            if crawl_seeded.CATALOGUE_DB:
+                catalogue = Catalogue(
+                    crawl_seeded.CATALOGUE_DB, crawl_seeded.CATALOGUE_COMMIT_SEC
+                )
+                job.run_id = catalogue.start_run(
+                    json.dumps(job.spec), {**run_settings(job.rules), "job": job.id}
+                )
+            self._notify("started", job)
+            await run_scraper(
+                job.seeds,
+                progress=progress,
+                run_id=job.run_id,
+                resources=self.resources,
+                rules=job.rules,
+                seed_gate=lambda: self.share.slot(job.id),
+                on_seed=job.seed_started,
+            )
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+            logger.log_error(f"Job {job.id} failed: {e}")
+        finally:
+            job.finished = time.time()
+            job.seeds_stopped()
+            await self.share.leave(job.id)
+            if catalogue is not None:
+                catalogue.finish_run(job.status, job.error)
+                catalogue.close()
+            if self.resources.indexer is not None:
+                self.resources.indexer.flush()  # searchable without waiting for the timer
+            self.resources.metrics.dump()
+            logger.log_info(f"Job {job.id} {job.status}: {job.progress()}")
+            self._notify(job.status, job)
+
+
+# ==============================
+# JSON API (standalone service)
+# ==============================
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _send(self, code: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self):
+        return [p for p in self.path.split("?", 1)[0].split("/") if p]
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if not token:
+            return True
+        scheme, _, given = (self.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(given.strip(), token):
+            return True
+        self._send(401, {"error": "bad or missing token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        service = self.server.service
+        parts = self._parts()
+        if parts == ["status"]:
+            return self._send(200, service.status())
+        if parts == ["jobs"]:
+            return self._send(200, {"jobs": service.list_jobs()})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = service.job(parts[1])
+            return self._send(200, job) if job else self._send(404, {"error": "No such job"})
+        self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        service = self.server.service
+        parts = self._parts()
+        if parts == ["jobs"]:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                spec = json.loads(self.rfile.read(length) or b"{}")
+                return self._send(202, service.submit(spec))
+            except (ValueError, TypeError) as e:
+                return self._send(400, {"error": str(e)})
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            job = service.cancel(parts[1])
+            return self._send(200, job) if job else self._send(404, {"error": "No such job"})
+        self._send(404, {"error": "Not found"})
+
+    def log_message(self, fmt, *args):
+        logger.log_debug(f"service api: {fmt % args}")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(service: CrawlService, host: str, port: int, token: str = ""):
+    """
+    Start the JSON API on a background thread; returns the server.
+
+    Every request must carry `Authorization: Bearer <token>` when one is set;
+    binding anything but a loopback address requires it.
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(
+            f"refusing to serve the crawl service on {host}:{port} without a token "
+            "(set SERVICE_TOKEN or pass --token)"
+        )
+    server = _Server((host, port), _Handler)
+    server.service = service
+    server.token = token
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-lived crawl service with a JSON job API")
+    parser.add_argument("--addr", help="HOST:PORT to listen on", default=crawl_seeded.SERVICE_ADDR)
+    parser.add_argument(
+        "--token",
+        help="Shared secret clients send as `Authorization: Bearer <token>` "
+        "(default: $SERVICE_TOKEN); required to serve on a non-loopback address",
+        default=os.environ.get("SERVICE_TOKEN"),
+    )
+    parser.add_argument("--tabs", help="Global tab budget shared by all jobs", type=int)
+    parser.add_argument("--browsers", help="No. of warm browsers", type=int)
+    parser.add_argument(
+        "--block", help="Resource blocking profile", choices=["off", "layout-safe", "text-only"]
+    )
+    parser.add_argument(
+        "--smart-wait",
+        help="Settle-based page readiness (--no-smart-wait: fixed delay + full scroll)",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--learned-scoring",
+        help="BestFirst link ranking learned from saved pages (--no-learned-scoring: keywords only)",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument(
+        "--log-level",
+        help="Minimum level printed",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        type=str.upper,
+    )
+    args = parser.parse_args()
+
+    if args.tabs is not None:
+        crawl_seeded.GLOBAL_TAB_BUDGET = args.tabs
+    if args.browsers is not None:
+        crawl_seeded.POOL_BROWSERS = args.browsers
+    if args.block:
+        crawl_seeded.BLOCK_PROFILE = args.block
+    if args.smart_wait is not None:
+        crawl_seeded.SMART_WAIT = args.smart_wait
+    if args.learned_scoring is not None:
+        crawl_seeded.LEARNED_SCORING = args.learned_scoring
+    if args.log_level:
+        crawl_seeded.LOG_LEVEL = args.log_level
+    crawl_seeded.configure_logger()
+
+    if args.token:
+        crawl_seeded.SERVICE_TOKEN = args.token
+
+    host, _, port = args.addr.rpartition(":")
+    host = host or "127.0.0.1"
+    if not crawl_seeded.SERVICE_TOKEN and not is_loopback(host):
+        parser.error(f"--addr {args.addr} is not loopback; pass --token or set SERVICE_TOKEN")
+    service = CrawlService().start()
+    server = serve(service, host, int(port), token=crawl_seeded.SERVICE_TOKEN)
+    print(f"Crawl service listening on http://{host}:{port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\nShutting down …")
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+        logger.close()
@@ -1,12 +1,51 @@
+import asyncio
+import hashlib
+import http.server
+import tempfile
+import threading
 import unittest
 import json
+import urllib.error
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from crawl4ai import CrawlerRunConfig
+
+import crawl_seeded
+from catalogue import Catalogue
+from crawl_seeded import Crawler
+from blocking import ResourceBlocker
+from budget import PageBudget
+from dedup import ContentStore
+from distributed import Coordinator, RemoteFrontier, SocketTransport, serve
+from fetcher import TieredFetcher
+from frontier import DONE, PENDING, SKIPPED, FrontierCrawlStrategy, FrontierStore
+from helper import _normalize_url, chunk_markdown, count_tokens
+from linkscore import LinkScorer, link_features
+from metrics import BOUNDS, Metrics, quantile
+from pool import BrowserPool, PoolExhausted
+from ratecontrol import AdaptiveRateController
+from readiness import ReadinessEngine
+from recrawl import ConditionalPrecheck, RecrawlStore, content_hash
+from scheduler import HostScheduler
+import search
+from search import IndexWriter, SearchIndex, INDEX_ROOT
+from segments import SegmentReader, SegmentWriter
+import service
+from urlfilters import AhoCorasick, CompiledURLFilter
+from visited import BloomFilter, VisitedSet
 
 
 class UrlTest(unittest.TestCase):
-    def check_keyword_presence(self, fp: str, keywords: list):
+    def check_keyword_presence(
+        self, fp: str, keywords: list, content: bool = False, index_root=INDEX_ROOT
+    ):
         """
         fp: File Path to the JSONL file (containing urls of the sites scraped),
         keyword: List[str] of keywords to check for presence
+        content: also accept pages whose *content* has a keyword (search index)
         """
 
         urls = []
@@ -22,9 +61,1283 @@ class UrlTest(unittest.TestCase):
         except FileNotFoundError:
             raise Exception(f"{fp} not found.")
 
+        in_content = set()
+        if content:
+            index = SearchIndex(index_root)
+            for k in keywords:
+                in_content |= index.urls_containing([k])
+            index.close()
+
         for u in urls:
-            bools.append(any(k in u for k in keywords))
+            bools.append(any(k in u for k in keywords) or u in in_content)
 
         ideal = [True for _ in urls]
 
         return self.assertEqual(bools, ideal)
+
+
+class BrowserPoolTest(unittest.TestCase):
+    def _pool(self, fail_after: int, size: int = 1):
+        """Pool whose browsers fail to launch after `fail_after` launches."""
+        launches = []
+
+        class FakeCrawler:
+            def __init__(self, config=None):
+                self.crawler_strategy = mock.Mock()
+
+            async def start(self):
+                launches.append(self)
+                if len(launches) > fail_after:
+                    raise RuntimeError("chromium gone")
+
+            async def close(self):
+                pass
+
+        patcher = mock.patch("pool.AsyncWebCrawler", FakeCrawler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return BrowserPool(None, size=size, tabs_per_browser=1, max_pages_per_browser=1)
+
+    def test_failed_recycle_raises_instead_of_hanging(self):
+        pool = self._pool(fail_after=1)
+
+        async def run():
+            await pool.start()
+            async with pool.lease() as crawler:
+                pool.record_pages(crawler, 1)  # retire -> relaunch fails
+            with self.assertRaises(PoolExhausted):
+                async with pool.lease():
+                    pass
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertEqual(len(pool.stats()["dead"]), 1)
+
+    def test_waiter_wakes_when_last_browser_dies(self):
+        pool = self._pool(fail_after=1)
+
+        async def run():
+            await pool.start()
+            waiter = None
+            async with pool.lease() as crawler:
+                pool.record_pages(crawler, 1)
+
+                async def second():
+                    async with pool.lease():
+                        pass
+
+                waiter = asyncio.create_task(second())
+                await asyncio.sleep(0.01)  # blocked on the tab limit
+            with self.assertRaises(PoolExhausted):
+                await waiter
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+
+    def test_surviving_browser_keeps_serving(self):
+        pool = self._pool(fail_after=2, size=2)
+
+        async def run():
+            await pool.start()
+            async with pool.lease() as crawler:
+                pool.record_pages(crawler, 1)
+            for _ in range(3):
+                async with pool.lease():
+                    pass
+
+        asyncio.run(asyncio.wait_for(run(), 5))
+
+
+class HostSchedulerTest(unittest.TestCase):
+    class Page:
+        def __init__(self):
+            self.on_close = []
+
+        def once(self, event, fn):
+            self.on_close.append(fn)
+
+        def close(self):
+            for fn in self.on_close:
+                fn(self)
+
+    def _scheduler(self, concurrency=2):
+        return HostScheduler(
+            base_delay=0.001,
+            jitter_min=0,
+            jitter_max=0,
+            per_host_concurrency=concurrency,
+            tab_budget=8,
+        )
+
+    def test_in_flight_cap_follows_set_rate(self):
+        sched = self._scheduler(concurrency=2)
+        release = sched.release_hooks()["before_return_html"]
+        url = "https://example.com/a"
+
+        async def run():
+            a, b, c = self.Page(), self.Page(), self.Page()
+            await sched.before_goto_hook(a, url=url)
+            await sched.before_goto_hook(b, url=url)
+            third = asyncio.create_task(sched.before_goto_hook(c, url=url))
+            await asyncio.sleep(0.05)
+            self.assertFalse(third.done())  # two in flight
+
+            sched.set_rate("example.com", 0.001, 1)  # backoff while loaded
+            await release(page=a)
+            await asyncio.sleep(0.05)
+            self.assertFalse(third.done())  # still one in flight, new cap is 1
+
+            b.close()  # page closed without capture also frees the slot
+            await asyncio.wait_for(third, 1)
+            self.assertEqual(sched.stats()["hosts"]["example.com"]["in_flight"], 1)
+
+        asyncio.run(run())
+
+    def test_recovery_stays_within_the_seed_tabs(self):
+        sched = self._scheduler(concurrency=2)
+        controller = AdaptiveRateController(
+            sched, threshold=0.5, multiplier=2, max_delay=1, min_delay=0.001,
+            recover_after=1, max_concurrency=4,
+        )
+        clean = SimpleNamespace(status_code=200, markdown="text")
+
+        async def run():
+            async with sched.seed_slot("example.com") as tabs:
+                for _ in range(10):
+                    controller.record("example.com", clean)
+                return tabs
+
+        self.assertEqual(asyncio.run(run()), 2)
+        self.assertEqual(sched.host("example.com").concurrency, 2)
+        self.assertEqual(sched.seed_tabs("example.com"), 0)
+
+        async def wider():
+            async with sched.seed_slot("example.com", tabs=3):
+                for _ in range(10):
+                    controller.record("example.com", clean)
+
+        asyncio.run(wider())
+        self.assertEqual(sched.host("example.com").concurrency, 3)
+
+    def test_request_slot_is_released_on_error(self):
+        sched = self._scheduler(concurrency=1)
+
+        async def run():
+            with self.assertRaises(ValueError):
+                async with sched.request("example.com"):
+                    raise ValueError
+            async with sched.request("example.com"):
+                pass
+
+        asyncio.run(asyncio.wait_for(run(), 1))
+
+
+class ResumeIndexTest(unittest.TestCase):
+    def test_pages_saved_after_the_checkpoint_are_not_indexed_twice(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            seed = {
+                "url": "https://example.com/",
+                "out_dir": out,
+                "md_dir": out / "md",
+                "jsonl_path": out / "index.jsonl",
+                "allowed_domain": "example.com",
+                "priority": 1.0,
+            }
+            (out / "md").mkdir()
+            # Crash: /a reached index.jsonl, the checkpoint still says 0 written
+            seed["jsonl_path"].write_text(
+                json.dumps({"url": "https://example.com/a"}) + "\n", encoding="utf-8"
+            )
+            store = FrontierStore(out / "frontier.sqlite", resume=True)
+            store.update_seed(seed["url"], written=0, pages_crawled=0, fetched=0)
+
+            crawler = Crawler(seed, frontier=store)
+            page = lambda url: SimpleNamespace(
+                url=url, markdown="# text", success=True, status_code=200, title=None
+            )
+            with open(seed["jsonl_path"], "a", encoding="utf-8") as jf:
+                self.assertTrue(crawler.save_result(jf, page("https://example.com/a")))
+                self.assertTrue(crawler.save_result(jf, page("https://example.com/b")))
+
+            urls = [
+                json.loads(line)["url"]
+                for line in seed["jsonl_path"].read_text(encoding="utf-8").splitlines()
+            ]
+            self.assertEqual(urls, ["https://example.com/a", "https://example.com/b"])
+            self.assertEqual(crawler.written, 2)
+            store.close()
+
+
+class FrontierStrategyTest(unittest.TestCase):
+    SEED = "https://example.com/"
+
+    class Browser:
+        """arun_many stand-in: pages link to two children and may answer
+        under another URL (`moved`: requested -> reported)."""
+
+        def __init__(self, moved=None):
+            self.fetched = []
+            self.moved = moved or {}
+
+        async def arun_many(self, urls, config=None):
+            async def results():
+                for url in urls:
+                    self.fetched.append(url)
+                    links = [{"href": f"{url.rstrip('/')}/{i}"} for i in range(2)]
+                    yield SimpleNamespace(
+                        url=self.moved.get(url, url),
+                        success=True,
+                        metadata=None,
+                        links={"internal": links},
+                    )
+
+            return results()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "frontier.sqlite"
+
+    def _crawl(self, store, browser, **kwargs):
+        strategy = FrontierCrawlStrategy(store, self.SEED, batch_size=10, **kwargs)
+        stream = strategy._arun_stream(self.SEED, browser, CrawlerRunConfig())
+
+        async def run():
+            return [r async for r in stream]
+
+        return asyncio.run(run())
+
+    def test_resume_counts_only_successful_pages(self):
+        store = FrontierStore(self.path)
+        rows = [(f"{self.SEED}{i}", 1, 0.0, self.SEED) for i in range(5)]
+        store.add(self.SEED, [(self.SEED, 0, 0.0, None), *rows])
+        store.done(self.SEED, self.SEED)
+        store.done(self.SEED, rows[0][0])
+        for url, *_ in rows[1:3]:
+            store.done(self.SEED, url, ok=False)  # failed or unchanged
+        store.close()
+
+        store = FrontierStore(self.path, resume=True)
+        self.addCleanup(store.close)
+        browser = self.Browser()
+        self._crawl(store, browser, max_depth=1, max_pages=4)
+        self.assertEqual(len(browser.fetched), 2)  # 2 of 4 pages were successes
+
+    def test_results_under_another_url_keep_their_depth(self):
+        store = FrontierStore(self.path)
+        self.addCleanup(store.close)
+        browser = self.Browser(
+            moved={
+                f"{self.SEED}0": "https://EXAMPLE.com:443/0",  # same page, other spelling
+                f"{self.SEED}1": f"{self.SEED}elsewhere",  # unmatched
+            }
+        )
+        results = self._crawl(store, browser, max_depth=1)
+        self.assertEqual(browser.fetched, [self.SEED, f"{self.SEED}0", f"{self.SEED}1"])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[1].metadata["depth"], 1)
+        self.assertEqual(store.count(self.SEED, PENDING), 0)  # nothing below max_depth
+
+
+class CatalogueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.cat = Catalogue(self.root / "catalogue.sqlite", commit_interval=0)
+        self.addCleanup(self.cat.close)
+
+    def _run(self, seeds, status="done"):
+        run_id = self.cat.start_run(args="test")
+        for url, out_dir, written in seeds:
+            self.cat.start_seed(url, "example.com", self.root / out_dir)
+            self.cat.update_seed(url, fetched=written + 1, written=written, bytes=100)
+            self.cat.finish_seed(url, fetched=written + 1, written=written, errors=1)
+        self.cat.finish_run(status)
+        return run_id
+
+    def test_latest_seed_per_output_directory(self):
+        first = self._run([("https://a.com/", "a", 3), ("https://b.com/", "b", 4)])
+        second = self._run([("https://a.com/", "a", 7)])
+
+        latest = self.cat.seeds(latest=True)
+        self.assertEqual(latest["total"], 2)
+        by_url = {s["url"]: s for s in latest["items"]}
+        self.assertEqual(by_url["https://a.com/"]["run_id"], second)
+        self.assertEqual(by_url["https://a.com/"]["written"], 7)
+        self.assertEqual(by_url["https://b.com/"]["run_id"], first)
+        self.assertEqual(self.cat.seeds(latest=False)["total"], 3)
+
+    def test_run_totals_sum_their_seeds(self):
+        run_id = self._run([("https://a.com/", "a", 3), ("https://b.com/", "b", 4)], "failed")
+        self._run([("https://c.com/", "c", 9)])
+
+        runs = self.cat.runs()
+        self.assertEqual(runs["total"], 2)
+        run = runs["items"][1]
+        self.assertEqual(run["id"], run_id)
+        self.assertEqual(run["status"], "failed")
+        self.assertEqual(
+            (run["seeds"], run["written"], run["fetched"], run["bytes"], run["errors"]),
+            (2, 7, 9, 200, 2),
+        )
+        self.assertEqual([r["id"] for r in self.cat.runs(status="failed")["items"]], [run_id])
+        self.assertEqual(len(self.cat.run(run_id)["seeds"]), 2)
+
+    def test_import_dirs_adds_each_directory_once(self):
+        scraped = self.root / "scraped"
+        for name, statuses in (("a.com", [200, 200, 404]), ("b.com_single", [200])):
+            (scraped / name).mkdir(parents=True)
+            (scraped / name / "index.jsonl").write_text(
+                "".join(
+                    json.dumps({"url": f"https://{name}/{i}", "status": code}) + "\n"
+                    for i, code in enumerate(statuses)
+                ),
+                encoding="utf-8",
+            )
+        (scraped / "empty").mkdir()  # no index.jsonl: not a crawl
+
+        self.assertEqual(self.cat.import_dirs(scraped), 2)
+        self.assertEqual(self.cat.import_dirs(scraped), 0)
+        seeds = {s["domain"]: s for s in self.cat.seeds()["items"]}
+        self.assertEqual(set(seeds), {"a.com", "b.com"})
+        self.assertEqual((seeds["a.com"]["written"], seeds["a.com"]["errors"]), (3, 1))
+        self.assertEqual(seeds["a.com"]["url"], "https://a.com/0")
+        self.assertEqual(self.cat.runs()["items"][0]["args"], "import")
+
+    def test_shared_between_threads(self):
+        self._run([("https://a.com/", "a", 3)])
+        errors = []
+
+        def read():
+            try:
+                for _ in range(50):
+                    self.cat.seeds()
+                    self.cat.runs()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for t in threads:
+            t.start()
+        self._run([(f"https://{i}.com/", str(i), i) for i in range(20)])
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+class ContentStoreTest(unittest.TestCase):
+    TEMPLATE = " ".join(f"nav{i} footer{i} menu{i}" for i in range(600))
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.md_dir = Path(self.tmp.name) / "md"
+
+    def _store(self, max_distance):
+        store = ContentStore(Path(self.tmp.name) / "dedup.sqlite", max_distance=max_distance)
+        self.addCleanup(store.close)
+        return store
+
+    def test_exact_duplicates_share_a_blob(self):
+        store = self._store(0)
+        a = store.put(self.md_dir, "same text")
+        b = store.put(self.md_dir, "same text")
+        self.assertEqual(a[0], b[0])
+        self.assertEqual((a[2], b[2]), (None, "exact"))
+
+    def test_templated_pages_are_not_collapsed_by_default(self):
+        store = self._store(0)
+        a_path, _, _, _ = store.put(self.md_dir, self.TEMPLATE + " the apple page")
+        b_path, b_sha, kind, near_of = store.put(self.md_dir, self.TEMPLATE + " the pear page")
+        self.assertNotEqual(a_path, b_path)
+        self.assertEqual((kind, near_of), (None, None))
+        self.assertTrue(b_path.read_text(encoding="utf-8").endswith("pear page"))
+
+    def test_near_duplicates_keep_their_own_blob(self):
+        store = self._store(3)
+        md_a = self.TEMPLATE + " the apple page"
+        md_b = self.TEMPLATE + " the pear page"
+        a_path, _, _, _ = store.put(self.md_dir, md_a)
+        fp = asyncio.run(store.fingerprint(md_b))
+        b_path, b_sha, kind, near_of = store.put(self.md_dir, md_b, fp)
+        self.assertEqual((kind, near_of), ("near", str(a_path.as_posix())))
+        self.assertNotEqual(a_path, b_path)
+        self.assertEqual(b_path.read_text(encoding="utf-8"), md_b)
+        self.assertEqual(b_sha, hashlib.sha256(md_b.encode("utf-8")).hexdigest())
+
+
+class ResourceBlockerTest(unittest.TestCase):
+    class Route:
+        def __init__(self, url, resource_type, navigation=False):
+            self.request = SimpleNamespace(
+                url=url,
+                resource_type=resource_type,
+                is_navigation_request=lambda: navigation,
+            )
+            self.outcome = None
+
+        async def abort(self, reason):
+            self.outcome = "aborted"
+
+        async def continue_(self):
+            self.outcome = "continued"
+
+    def test_profiles(self):
+        self.assertIsNone(ResourceBlocker.from_profile("off"))
+        self.assertIsNone(ResourceBlocker.from_profile("off", patterns=["*ads*"]))
+        extra = ResourceBlocker.from_profile("off", extra_types=["image"])
+        self.assertEqual(extra.types, {"image"})
+        self.assertEqual(extra.patterns, [])
+
+        layout = ResourceBlocker.from_profile("layout-safe", patterns=["*Tracker*"])
+        self.assertEqual(layout.types, {"image", "media", "font"})
+        self.assertEqual(layout.patterns, ["*tracker*"])
+        text = ResourceBlocker.from_profile("text-only")
+        self.assertIn("stylesheet", text.types)
+        self.assertNotIn("script", text.types)
+        with self.assertRaises(KeyError):
+            ResourceBlocker.from_profile("everything")
+
+    def test_blocks_by_type_substring_and_glob(self):
+        blocker = ResourceBlocker(
+            types=["image"], patterns=["*doubleclick.net*", "*/pixel?.gif"]
+        )
+        self.assertTrue(blocker.blocks("image", "https://example.com/logo.png"))
+        self.assertTrue(blocker.blocks("script", "https://AD.DoubleClick.net/x.js"))
+        self.assertTrue(blocker.blocks("other", "https://t.example.com/a/pixel1.gif"))
+        self.assertFalse(blocker.blocks("other", "https://t.example.com/a/pixel10.gif"))
+        self.assertFalse(blocker.blocks("script", "https://example.com/app.js"))
+        self.assertFalse(blocker.blocks("stylesheet", "https://example.com/site.css"))
+
+    def test_route_aborts_blocked_requests_but_never_navigations(self):
+        metrics = mock.Mock()
+        blocker = ResourceBlocker(types=["image", "font"], metrics=metrics)
+        routes = [
+            self.Route("https://example.com/a.png", "image"),
+            self.Route("https://example.com/f.woff2", "font"),
+            self.Route("https://example.com/app.js", "script"),
+            self.Route("https://example.com/b.png", "image", navigation=True),
+        ]
+
+        async def run():
+            for route in routes:
+                await blocker._route(route)
+
+        asyncio.run(run())
+        self.assertEqual(
+            [r.outcome for r in routes], ["aborted", "aborted", "continued", "continued"]
+        )
+        stats = blocker.stats()
+        self.assertEqual((stats["blocked"], stats["allowed"]), (2, 2))
+        self.assertEqual(stats["by_type"], {"image": 1, "font": 1})
+        self.assertEqual(stats["est_bytes_avoided"], 60_000)
+        metrics.blocked_request.assert_any_call("image", 30_000)
+
+
+class CompiledURLFilterTest(unittest.TestCase):
+    def test_required_keywords_only_gate_saving(self):
+        f = CompiledURLFilter(required=["pricing", "plans"])
+        self.assertTrue(f.check("https://example.com/"))  # listing page is fetched
+        self.assertFalse(f.savable("https://example.com/"))
+        self.assertFalse(f.savable("https://example.com/pricing"))
+        self.assertTrue(f.savable("https://example.com/Pricing/plans"))
+
+    def test_blocked_include_and_extensions(self):
+        f = CompiledURLFilter(
+            include=["*docs*"],
+            blocked=["*login*", "*/tag/?*"],
+            skip_extensions=[".pdf"],
+        )
+        self.assertTrue(f.check("https://example.com/docs/intro"))
+        self.assertFalse(f.check("https://example.com/blog/intro"))  # not included
+        self.assertFalse(f.check("https://example.com/docs/login"))
+        self.assertFalse(f.check("https://example.com/docs/tag/x"))  # glob
+        self.assertFalse(f.check("https://example.com/docs/manual.PDF"))
+
+    def test_aho_corasick_reports_overlapping_patterns(self):
+        ac = AhoCorasick(["he", "she", "hers"])
+        self.assertEqual(ac.find("ushers"), {0, 1, 2})
+        self.assertEqual(ac.find("xyz"), set())
+
+
+class TieredFetcherTest(unittest.TestCase):
+    PAGES = {
+        "/static": "<html><body><p>" + "plain server-rendered text " * 60 + "</p></body></html>",
+        "/spa": '<html><body><div id="root"></div></body></html>',
+        "/boom": '<html><body><div id="app"></div></body></html>',
+    }
+
+    def setUp(self):
+        pages = self.PAGES
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path, "").encode()
+                self.send_response(200 if body else 404)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    class Browser:
+        """Stands in for the headless tier: renders SPAs, crashes on /boom."""
+
+        def __init__(self):
+            self.urls = []
+
+        async def arun(self, url, config=None):
+            self.urls.append(url)
+            if url.endswith("/boom"):
+                raise RuntimeError("Target page, context or browser has been closed")
+            return SimpleNamespace(
+                url=url, success=True, markdown="rendered " * 100, metadata=None, status_code=200
+            )
+
+    def test_http_first_escalation_and_browser_failure(self):
+        browser = self.Browser()
+        urls = [f"{self.base}{p}" for p in ("/static", "/spa", "/boom")]
+
+        async def run():
+            async with TieredFetcher(user_agent="tests", min_chars=200) as fetcher:
+                results = [
+                    r async for r in fetcher.fetch_many(urls, browser, CrawlerRunConfig())
+                ]
+                return fetcher, results
+
+        fetcher, results = asyncio.run(run())
+        by_url = {r.url: r for r in results}
+        self.assertEqual(set(by_url), set(urls))
+        self.assertEqual(by_url[urls[0]].metadata["tier"], "http")
+        self.assertTrue(by_url[urls[1]].success)
+        self.assertEqual(by_url[urls[1]].metadata["tier"], "browser")
+        self.assertFalse(by_url[urls[2]].success)  # failed result, batch kept going
+        self.assertEqual(sorted(browser.urls), sorted(urls[1:]))
+        self.assertEqual(fetcher.stats()["escalated"], 2)
+        self.assertEqual(fetcher.stats()["failed"], 1)
+
+
+class RecrawlTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "recrawl.sqlite"
+
+    def _page(self, etag=None, last_modified=None, links=()):
+        headers = {}
+        if etag:
+            headers["ETag"] = etag
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        return SimpleNamespace(
+            response_headers=headers,
+            links={"internal": [{"href": href} for href in links] + [{"text": "no href"}]},
+        )
+
+    def test_store_round_trips_validators(self):
+        store = RecrawlStore(self.path)
+        url = "https://example.com/a"
+        page = self._page('"v1"', "Wed, 01 Jan 2025 00:00:00 GMT", ["https://example.com/b"])
+        store.put(url, page, content_hash("# a"), "md/a.md")
+        store.close()
+
+        store = RecrawlStore(self.path)
+        self.addCleanup(store.close)
+        self.assertEqual(
+            store.get(url),
+            {
+                "etag": '"v1"',
+                "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT",
+                "md_hash": content_hash("# a"),
+                "path_md": "md/a.md",
+                "links": ["https://example.com/b"],
+            },
+        )
+        self.assertTrue(store.unchanged(url, content_hash("# a")))
+        self.assertFalse(store.unchanged(url, content_hash("# b")))
+        self.assertIsNone(store.get("https://example.com/missing"))
+
+        store.put(url, self._page('"v2"'), content_hash("# b"))  # path kept
+        rec = store.get(url)
+        self.assertEqual((rec["etag"], rec["last_modified"]), ('"v2"', None))
+        self.assertEqual((rec["path_md"], rec["links"]), ("md/a.md", []))
+
+    def _server(self):
+        """Local server that answers 304 to If-None-Match "v1", 200 otherwise."""
+        seen = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                seen.append((self.path, self.headers.get("If-None-Match")))
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = b"changed"
+                self.send_response(200)
+                self.send_header("ETag", '"v2"')
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}", seen
+
+    def test_precheck_skips_304_and_fetches_200(self):
+        base, seen = self._server()
+        store = RecrawlStore(self.path)
+        self.addCleanup(store.close)
+        same, changed, new = f"{base}/same", f"{base}/changed", f"{base}/new"
+        store.put(same, self._page('"v1"', links=[f"{base}/next"]), content_hash("same"))
+        store.put(changed, self._page('"v0"'), content_hash("old"))
+        precheck = ConditionalPrecheck(store, user_agent="tests")
+
+        async def run():
+            try:
+                return await precheck.unchanged([same, changed, new])
+            finally:
+                await precheck.close()
+
+        self.assertEqual(asyncio.run(run()), {same: [f"{base}/next"]})
+        self.assertEqual(precheck.skipped, 1)
+        # no validators stored for /new: left to the crawl, never requested
+        self.assertEqual(sorted(seen), [("/changed", '"v0"'), ("/same", '"v1"')])
+
+    def test_unchanged_pages_are_done_without_a_fetch(self):
+        base, _ = self._server()
+        seed, changed = f"{base}/same", f"{base}/changed"
+        recrawl = RecrawlStore(self.path)
+        self.addCleanup(recrawl.close)
+        recrawl.put(seed, self._page('"v1"', links=[changed]), content_hash("same"))
+        recrawl.put(changed, self._page('"v0"'), content_hash("old"))
+        frontier = FrontierStore(":memory:")
+        self.addCleanup(frontier.close)
+        precheck = ConditionalPrecheck(recrawl, user_agent="tests")
+        strategy = FrontierCrawlStrategy(frontier, seed, max_depth=1, precheck=precheck)
+        browser = FrontierStrategyTest.Browser()
+
+        async def run():
+            try:
+                return [r async for r in strategy._arun_stream(seed, browser, CrawlerRunConfig())]
+            finally:
+                await precheck.close()
+
+        results = asyncio.run(run())
+        self.assertEqual(browser.fetched, [changed])  # the 304 never reached the browser
+        self.assertEqual([r.url for r in results], [changed])
+        self.assertEqual(strategy.skipped_unchanged, 1)
+        self.assertEqual(frontier.count(seed, SKIPPED), 1)
+        self.assertEqual(frontier.count(seed, DONE), 1)
+        self.assertEqual(frontier.count(seed, PENDING), 0)
+
+class SegmentsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name) / "segments"
+
+    def _read_all(self):
+        reader = SegmentReader(self.root)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_two_writers_share_a_directory(self):
+        # two seeds of one domain write to the same segments/ concurrently
+        a = SegmentWriter(self.root, max_segment_bytes=600)
+        b = SegmentWriter(self.root, max_segment_bytes=600)
+        urls = []
+        for i in range(20):
+            for name, w in (("a", a), ("b", b)):
+                url = f"https://example.com/{name}/{i}"
+                w.put(url, f"page {name} {i} " * 10)
+                urls.append(url)
+        a.close()
+        b.put("https://example.com/late", "written after the other writer closed")
+        b.close()
+        urls.append("https://example.com/late")
+
+        reader = self._read_all()
+        self.assertGreater(len(list(self.root.glob("seg-*.dat"))), 1)  # rolled over
+        self.assertEqual(reader.count, len(urls))
+        self.assertEqual(sorted(r["url"] for r in reader.scan()), sorted(urls))
+        for url in urls:
+            self.assertEqual(reader.get(url)["url"], url)
+        self.assertEqual(reader.get("https://example.com/b/7")["markdown"], "page b 7 " * 10)
+
+    def test_threads_writing_one_directory(self):
+        writers = [SegmentWriter(self.root, max_segment_bytes=4096) for _ in range(4)]
+
+        def work(n, w):
+            for i in range(50):
+                w.put(f"https://example.com/{n}/{i}", "x" * (i * 7))
+
+        threads = [threading.Thread(target=work, args=(n, w)) for n, w in enumerate(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for w in writers:
+            w.close()
+
+        reader = self._read_all()
+        self.assertEqual(reader.count, 200)
+        self.assertEqual(len(list(reader.scan())), 200)
+        self.assertEqual(reader.get("https://example.com/3/49")["markdown"], "x" * 343)
+
+
+class PageBudgetTest(unittest.TestCase):
+    class Browser:
+        """arun_many stand-in: every page links to 20 new pages."""
+
+        def __init__(self):
+            self.fetched = []
+
+        async def arun_many(self, urls, config=None):
+            async def results():
+                for url in urls:
+                    self.fetched.append(url)
+                    await asyncio.sleep(0)
+                    links = [{"href": f"{url.rstrip('/')}/{i}"} for i in range(20)]
+                    yield SimpleNamespace(
+                        url=url, success=True, metadata=None, links={"internal": links}
+                    )
+
+            return results()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = FrontierStore(Path(self.tmp.name) / "frontier.sqlite")
+        self.addCleanup(self.store.close)
+
+    def _strategy(self, budget):
+        return FrontierCrawlStrategy(
+            self.store, "https://example.com/", max_depth=5, batch_size=10, budget=budget
+        )
+
+    def test_weighted_grants_and_domain_caps(self):
+        budget = PageBudget(100, domain_caps={"b.com": 5})
+        budget.register("a", "a.com", 3.0, None)
+        budget.register("b", "b.com", 1.0, None)
+        self.assertEqual(budget.reserve("a.com", 100), 75)
+        self.assertEqual(budget.reserve("b.com", 100), 5)  # capped
+        self.assertEqual(budget.reserve("b.com", 1), 0)
+        budget.refund("a.com", 10)
+        self.assertEqual(budget.used, 70)
+        budget.unregister("b")
+        self.assertEqual(budget.reserve("a.com", 10), 10)
+        self.assertEqual(budget.remaining(), 20)
+        self.assertFalse(budget.exhausted)
+
+    def test_refunded_reservations_can_be_reserved_again(self):
+        async def run():
+            budget = PageBudget(5)
+            task = asyncio.create_task(asyncio.sleep(10))
+            budget.register("stock", "b.com", 1.0, None, task)
+            self.assertEqual(budget.reserve("a.com", 10), 5)
+            self.assertFalse(budget.exhausted)  # a reservation is not a fetch
+            budget.refund("a.com", 4)
+            self.assertEqual(budget.remaining(), 4)
+            self.assertEqual(budget.reserve("a.com", 10), 4)
+            budget.refund("a.com", 1)
+            self.assertTrue(budget.consume("b.com"))  # the last page, fetched
+            self.assertTrue(budget.exhausted)
+            self.assertFalse(budget.consume("b.com"))
+            await asyncio.sleep(0)
+            self.assertTrue(task.cancelled())
+            budget.refund("a.com", 2)
+            self.assertFalse(budget.exhausted)
+            self.assertEqual(budget.remaining(), 2)
+
+        asyncio.run(run())
+
+    def test_reserving_crawl_finishes_its_batch(self):
+        budget = PageBudget(15)
+        strategy = self._strategy(budget)
+        browser = self.Browser()
+
+        async def run():
+            seed = "https://example.com/"
+            budget.register(seed, "example.com", 1.0, strategy, asyncio.current_task())
+            return [r async for r in strategy._arun_stream(seed, browser, CrawlerRunConfig())]
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 15)  # the batch that spent the budget completed
+        self.assertEqual(budget.remaining(), 0)
+        self.assertTrue(strategy.out_of_budget)
+        self.assertEqual(budget.used, 15)
+        self.assertEqual(budget.cancelled, 0)
+
+    def test_stopped_batch_refunds_unfetched_pages(self):
+        budget = PageBudget(100)
+        strategy = self._strategy(budget)
+        browser = self.Browser()
+
+        async def run():
+            seen = 0
+            stream = strategy._arun_stream("https://example.com/", browser, CrawlerRunConfig())
+            async for _ in stream:
+                seen += 1
+                if seen == 3:  # seed page + 2 of the next batch of 10
+                    await strategy.shutdown()
+            return seen
+
+        self.assertEqual(asyncio.run(run()), 3)
+        self.assertEqual(budget.used, 3)
+
+
+class DistributedTest(unittest.TestCase):
+    SEED = "https://example.com/"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.coordinator = Coordinator(
+            Path(self.tmp.name) / "coordinator.sqlite", seeds=[{"url": self.SEED}]
+        )
+        self.addCleanup(self.coordinator.close)
+
+    def _serve(self, token):
+        server = serve(self.coordinator, "127.0.0.1", 0, token=token)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address
+
+    def test_token_is_required_off_loopback(self):
+        with self.assertRaises(ValueError):
+            serve(self.coordinator, "0.0.0.0", 0)
+
+    def test_requests_without_the_token_are_refused(self):
+        host, port = self._serve("s3cret")
+        good = SocketTransport(host, port, token="s3cret")
+        bad = SocketTransport(host, port, token="guess")
+        self.addCleanup(good.close)
+        self.addCleanup(bad.close)
+        self.assertEqual(good.count(self.SEED, 0), 1)
+        with self.assertRaisesRegex(RuntimeError, "token"):
+            bad.count(self.SEED, 0)
+
+    def test_remote_frontier_calls_run_off_the_event_loop(self):
+        threads = []
+        coordinator = self.coordinator
+
+        class Transport:
+            def __getattr__(self, op):
+                def call(*args):
+                    threads.append(threading.current_thread())
+                    return getattr(coordinator, op)(*args)
+
+                return call
+
+        frontier = RemoteFrontier(Transport(), "w1")
+
+        async def run():
+            await frontier.load([self.SEED])
+            rows = await frontier.pop(self.SEED, 5, True)
+            frontier.add(self.SEED, [("https://example.com/a", 1, 0.5, self.SEED)])
+            frontier.done(self.SEED, rows[0][0])
+            frontier.flush()
+            pending = await frontier.count(self.SEED, 0)
+            await frontier.aclose()
+            return rows, pending
+
+        rows, pending = asyncio.run(run())
+        self.assertEqual([r[0] for r in rows], [self.SEED])
+        self.assertEqual(pending, 1)  # the report landed before the count
+        self.assertEqual(frontier.seed_state(self.SEED)["written"], 0)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+
+class NormalizeUrlTest(unittest.TestCase):
+    def test_canonical_form(self):
+        self.assertEqual(
+            _normalize_url("HTTP://Example.com:80/a/../b?utm_source=x&b=2&a=1#top"),
+            "http://example.com/b?a=1&b=2",
+        )
+        self.assertEqual(_normalize_url("https://example.com:8443"), "https://example.com:8443/")
+        self.assertEqual(_normalize_url("https://example.com/a/./b/.."), "https://example.com/a/")
+        self.assertEqual(_normalize_url("https://example.com/%7ea"), "https://example.com/%7Ea")
+        self.assertEqual(_normalize_url("mailto:someone@example.com"), "mailto:someone@example.com")
+        self.assertEqual(_normalize_url("  "), "")
+
+    def test_query_pairs_are_kept_as_written(self):
+        self.assertEqual(
+            _normalize_url("https://example.com/?q=a%2fb%20c&flag&fbclid=1&q=x+y"),
+            "https://example.com/?flag&q=a%2Fb%20c&q=x+y",
+        )
+        self.assertEqual(_normalize_url("https://example.com/?&&utm_medium=x"), "https://example.com/")
+        self.assertEqual(
+            _normalize_url("https://example.com/?b&a="), "https://example.com/?a=&b"
+        )
+
+
+class VisitedSetTest(unittest.TestCase):
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        keys = [f"https://example.com/{i}" for i in range(1000)]
+        self.assertTrue(all(bloom.add(k) for k in keys[:10]))
+        for k in keys:
+            bloom.add(k)
+        self.assertTrue(all(k in bloom for k in keys))
+        self.assertGreater(bloom.count, 980)  # a few adds collided (false positives)
+        misses = sum(f"https://other.com/{i}" in bloom for i in range(10000))
+        self.assertLess(misses, 300)  # ~1% designed error rate
+
+    def test_filters_chain_and_hits_are_confirmed(self):
+        stored = set()
+        visited = VisitedSet(exact=stored.__contains__, capacity=100)
+        for i in range(500):
+            key = f"https://example.com/{i}"
+            stored.add(key)
+            visited.add(key)
+        self.assertGreater(len(visited.filters), 1)
+        self.assertTrue(all(f"https://example.com/{i}" in visited for i in range(500)))
+        self.assertFalse(any(f"https://other.com/{i}" in visited for i in range(500)))
+        stats = visited.stats()
+        self.assertEqual(stats["keys"], 500)
+        self.assertEqual(stats["disk_checks"], 500 + stats["false_positives"])
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name) / "index"
+
+    def _index(self):
+        index = SearchIndex(self.root)
+        self.addCleanup(index.close)
+        return index
+
+    def test_bm25_ranking_and_newest_copy_wins(self):
+        writer = IndexWriter(self.root, flush_docs=2)
+        writer.add("https://example.com/shoes", "Running shoes. Shoes for trail running.")
+        writer.add("https://example.com/about", "About our company and its running club.")
+        writer.add("https://example.com/socks", "Socks to wear with shoes.")
+        writer.add("https://example.com/about", "About us: now selling shoes too.")
+        writer.close()
+
+        index = self._index()
+        hits = [h["url"] for h in index.search("shoes")]
+        self.assertEqual(hits[0], "https://example.com/shoes")
+        self.assertEqual(set(hits), {
+            "https://example.com/shoes", "https://example.com/socks", "https://example.com/about"
+        })
+        self.assertEqual(
+            index.urls_containing(["running"]), {"https://example.com/shoes"}
+        )  # the re-crawled /about no longer mentions it
+        self.assertEqual(
+            [h["url"] for h in index.search("running shoes", require_all=True)],
+            ["https://example.com/shoes"],
+        )
+
+    def test_compaction_keeps_segments_flushed_meanwhile_newer(self):
+        writer = IndexWriter(self.root, flush_docs=1)
+        writer.add("https://example.com/a", "old apple")
+        writer.add("https://example.com/b", "banana")
+        index = self._index()
+        real_write = search._write_segment
+        racing = []
+
+        def write_during_merge(*args, **kwargs):
+            if not racing:
+                # a crawler flushes a newer copy of /a while the merge is running
+                racing.append(True)
+                writer.add("https://example.com/a", "new cherry")
+            return real_write(*args, **kwargs)
+
+        with mock.patch("search._write_segment", side_effect=write_during_merge):
+            index.compact()
+        self.assertEqual(len(index.segments), 2)
+        self.assertEqual(index.urls_containing(["cherry"]), {"https://example.com/a"})
+        self.assertEqual(index.urls_containing(["apple"]), set())
+
+    def test_concurrent_compactions(self):
+        writer = IndexWriter(self.root, flush_docs=1)
+        for i in range(6):
+            writer.add(f"https://example.com/{i}", f"page number {i}")
+        indexes = [SearchIndex(self.root) for _ in range(3)]
+        errors = []
+
+        def compact(index):
+            try:
+                index.compact()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                index.close()
+
+        threads = [threading.Thread(target=compact, args=(ix,)) for ix in indexes]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        index = self._index()
+        self.assertEqual(len(index.segments), 1)
+        self.assertEqual(index.n_docs, 6)
+
+
+class LinkScorerTest(unittest.TestCase):
+    def test_features_fold_digits_and_keep_anchor_words(self):
+        feats = link_features("https://example.com/product/123/red-shoe?x=1", "Buy now", ["shoe"])
+        self.assertIn("s:product", feats)
+        self.assertIn("s:#", feats)
+        self.assertIn("p:product/#", feats)
+        self.assertIn("q", feats)
+        self.assertIn("a:buy", feats)
+        self.assertIn("k:shoe", feats)
+
+    def test_feedback_moves_scores(self):
+        scorer = LinkScorer(keywords=["pricing"])
+        good, bad = "https://example.com/docs/page-1", "https://example.com/tag/page-1"
+        before = scorer.score_many([good, bad])
+        self.assertAlmostEqual(before[0], before[1])
+        self.assertGreater(
+            scorer.score_many(["https://example.com/pricing"])[0], before[0]
+        )  # keyword prior
+        for i in range(30):
+            scorer.update(f"https://example.com/docs/page-{i}", True)
+            scorer.update(f"https://example.com/tag/page-{i}", False)
+        after = scorer.score_many(["https://example.com/docs/new", "https://example.com/tag/new"])
+        self.assertGreater(after[0], 0.5)
+        self.assertLess(after[1], 0.5)
+        self.assertEqual(scorer.stats()["saved_share"], 0.5)
+
+    def test_pages_filtered_after_fetch_count_as_not_saved(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            seed = {
+                "url": "https://example.com/",
+                "out_dir": out,
+                "md_dir": out / "md",
+                "jsonl_path": out / "index.jsonl",
+                "allowed_domain": "example.com",
+                "priority": 1.0,
+            }
+            crawler = Crawler(seed)
+            crawler.link_scorer = mock.Mock()
+            crawler.url_filter = mock.Mock(savable=lambda url: False)
+            page = SimpleNamespace(url="https://example.com/tag/a", markdown="# text")
+            with open(seed["jsonl_path"], "a", encoding="utf-8") as jf:
+                self.assertFalse(crawler.save_result(jf, page))
+        crawler.link_scorer.update.assert_called_once_with(page.url, False)
+
+
+class QuantileTest(unittest.TestCase):
+    def test_interpolates_inside_buckets(self):
+        buckets = [0] * (len(BOUNDS) + 1)
+        self.assertIsNone(quantile(buckets, 0.5))
+        buckets[0] = 10  # all under 1ms
+        self.assertAlmostEqual(quantile(buckets, 0.5), BOUNDS[0] / 2)
+        buckets[3] = 10
+        self.assertAlmostEqual(quantile(buckets, 0.75), BOUNDS[2] + (BOUNDS[3] - BOUNDS[2]) / 2)
+        self.assertLessEqual(quantile(buckets, 1.0), BOUNDS[3])
+        overflow = [0] * len(BOUNDS) + [5]
+        self.assertEqual(quantile(overflow, 0.9), BOUNDS[-1])
+
+
+class MetricsTest(unittest.TestCase):
+    def test_bytes_fetched_counts_encoded_html(self):
+        metrics = Metrics()
+        page = lambda html: SimpleNamespace(
+            url="https://example.com/", html=html, success=True, status_code=200
+        )
+        metrics.page(page("<p>café – 日本</p>"))
+        metrics.page(page(None))
+        self.assertEqual(metrics.bytes_fetched, len("<p>café – 日本</p>".encode("utf-8")))
+        self.assertEqual(metrics.pages, 2)
+
+
+class ChunkMarkdownTest(unittest.TestCase):
+    def test_chunks_keep_paragraphs_and_offsets(self):
+        paras = [f"Paragraph {i} " + "word " * 30 for i in range(10)]
+        md = "\n\n".join(p.strip() for p in paras)
+        chunks = chunk_markdown(md, target_chars=400, with_offsets=True)
+        self.assertGreater(len(chunks), 1)
+        for offset, text, size in chunks:
+            self.assertEqual(md[offset : offset + len(text)], text)
+            self.assertEqual(size, len(text) - text.count("\n\n") * 2)
+        self.assertEqual("".join(t for _, t, _ in chunks).count("Paragraph"), 10)
+        self.assertEqual(chunk_markdown("x" * 50, target_chars=20), ["x" * 20, "x" * 20, "x" * 10])
+
+    @staticmethod
+    def _paragraphs(*sizes):
+        """Paragraphs of distinct one-token words: w<paragraph>x<word>."""
+        return "\n\n".join(" ".join(f"w{p}x{i}" for i in range(n)) for p, n in enumerate(sizes))
+
+    def test_token_chunks_stay_within_the_target(self):
+        md = self._paragraphs(60, 45, 30, 70, 10)
+        chunks = chunk_markdown(md, target_tokens=100, with_offsets=True)
+        for _, text, size in chunks:
+            self.assertEqual(size, count_tokens(text))
+            self.assertLessEqual(size, 100)
+        self.assertEqual(sum(size for _, _, size in chunks), count_tokens(md))
+
+    def test_overlap_is_a_token_window(self):
+        md = self._paragraphs(90, 90, 400)
+        chunks = chunk_markdown(md, target_tokens=100, overlap_tokens=20, with_offsets=True)
+        self.assertGreater(len(chunks), 5)
+        for (_, prev, _), (_, text, size) in zip(chunks, chunks[1:]):
+            self.assertLessEqual(size, 100)
+            self.assertEqual(text.split()[:20], prev.split()[-20:])
+        # every window of the 400-token paragraph overlaps the one before
+        self.assertTrue(chunks[-1][1].endswith("w2x399"))
+
+
+class ServiceJobFrontierTest(unittest.TestCase):
+    def test_each_service_job_gets_a_frontier_strategy(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp)
+            seed = {
+                "url": "https://example.com/",
+                "out_dir": out,
+                "md_dir": out / "md",
+                "jsonl_path": out / "index.jsonl",
+                "allowed_domain": "example.com",
+                "priority": 1.0,
+            }
+            (out / "md").mkdir()
+            strategies, stores = [], []
+
+            async def crawl(self, url):
+                self.strategy = self.get_strategy()
+                strategies.append(self.strategy)
+
+            class Resources:
+                scheduler = HostScheduler(
+                    base_delay=0, jitter_min=0, jitter_max=0, per_host_concurrency=2, tab_budget=4
+                )
+
+                def crawler(self, seed_dict, **kwargs):
+                    stores.append(kwargs["frontier"])
+                    return Crawler(seed_dict, **kwargs)
+
+            async def run():
+                # two jobs of the long-lived service, side by side
+                jobs = [crawl_seeded.run_scraper([dict(seed)], resources=Resources()) for _ in "ab"]
+                return await asyncio.gather(*jobs)
+
+            with mock.patch.object(Crawler, "crawl", crawl), mock.patch.object(
+                crawl_seeded, "CATALOGUE_DB", None
+            ):
+                asyncio.run(run())
+
+        self.assertEqual(len(strategies), 2)
+        self.assertTrue(all(isinstance(s, FrontierCrawlStrategy) for s in strategies))
+        self.assertIsNot(stores[0], stores[1])
+        self.assertTrue(all(store.path == ":memory:" for store in stores))
+
+
+class ServiceApiTest(unittest.TestCase):
+    class Service:
+        def status(self):
+            return {"ok": True}
+
+    def _serve(self, token):
+        server = service.serve(self.Service(), "127.0.0.1", 0, token=token)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+        return f"http://{host}:{port}/status"
+
+    def _get(self, url, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as resp:
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def test_token_is_required_off_loopback(self):
+        with self.assertRaises(ValueError):
+            service.serve(self.Service(), "0.0.0.0", 0)
+
+    def test_requests_without_the_token_are_refused(self):
+        url = self._serve("s3cret")
+        self.assertEqual(self._get(url, "s3cret"), 200)
+        self.assertEqual(self._get(url, "guess"), 401)
+        self.assertEqual(self._get(url), 401)
+
+    def test_loopback_without_a_token_stays_open(self):
+        self.assertEqual(self._get(self._serve("")), 200)
+
+    def test_job_progress_reads_while_seeds_finish(self):
+        job = service.Job({}, [{"url": f"https://s{i}.example/"} for i in range(2000)], {})
+        job.started = 1.0
+        errors, stop = [], threading.Event()
+
+        def read():
+            while not stop.is_set():
+                try:
+                    job.progress(seeds=True)
+                except RuntimeError as e:  # dict changed size during iteration
+                    errors.append(e)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for seed in job.seeds:
+            crawler = SimpleNamespace(seed_dict=seed, counters=lambda: {"written": 1})
+            job.seed_started(crawler)
+            job.seed_finished({"seed": seed["url"], "written": 1})
+        stop.set()
+        reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(job.progress()["written"], 2000)
+
+
+class ReadinessTest(unittest.TestCase):
+    class Page:
+        """Page stand-in whose settle script reports `quiet_after` ms (None: never)."""
+
+        url = "https://busy.example.com/"
+
+        def __init__(self, quiet_after):
+            self.quiet_after = quiet_after
+            self.max_ms = []
+
+        async def evaluate(self, script, args):
+            self.max_ms.append(args["maxMs"])
+            timed_out = self.quiet_after is None or self.quiet_after > args["maxMs"]
+            waited = args["maxMs"] if timed_out else self.quiet_after
+            return {"waited": waited, "timedOut": timed_out, "lazy": False, "scrollable": False}
+
+    def _waits(self, engine, page, n):
+        async def run():
+            for _ in range(n):
+                await engine.wait(page)
+
+        asyncio.run(run())
+        return page.max_ms
+
+    def test_hosts_that_never_go_quiet_get_a_short_wait(self):
+        engine = ReadinessEngine(max_ms=4000, busy_after=3, busy_ms=1000)
+        waits = self._waits(engine, self.Page(None), 25)
+        self.assertEqual(waits[:3], [4000] * 3)
+        self.assertEqual(waits[3:20], [1000] * 17)
+        self.assertEqual(waits[20], 4000)  # periodic re-probe of the full ceiling
+        self.assertTrue(engine.stats()["hosts"]["busy.example.com"]["busy"])
+
+    def test_a_settling_page_ends_the_busy_streak(self):
+        engine = ReadinessEngine(max_ms=4000, busy_after=3, busy_ms=1000, learn_after=50)
+        page = self.Page(None)
+        self._waits(engine, page, 4)
+        page.quiet_after = 500
+        waits = self._waits(engine, page, 2)
+        self.assertEqual(waits[-2:], [1000, 4000])
+        self.assertFalse(engine.profile("busy.example.com").busy(3))
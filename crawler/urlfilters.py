@@ -0,0 +1,155 @@
+# urlfilters.py
+# One compiled pre-fetch URL matcher (extensions + include/block/required keywords)
+
+import fnmatch
+import re
+from collections import deque
+from urllib.parse import urlsplit
+
+from crawl4ai.deep_crawling.filters import URLFilter
+
+
+class AhoCorasick:
+    """Multi-substring matcher: one pass over the text, whatever the no. of patterns."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [set()]
+        for pid, pat in enumerate(patterns):
+            node = 0
+            for ch in pat:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                node = nxt
+            self.out[node].add(pid)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] |= self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> set:
+        """Ids of every pattern occurring in `text` (overlaps included)."""
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.out[node]:
+                found |= self.out[node]
+        return found
+
+
+def _substring(pattern: str):
+    """`*kw*` -> `kw`; None if the glob needs a real wildcard match."""
+    core = pattern.strip("*")
+    if core and not any(c in core for c in "*?["):
+        return core
+    return None
+
+
+class CompiledURLFilter(URLFilter):
+    """
+    Pre-fetch replacement for the checks `save_json` used to do after the
+    page was already rendered. A URL is fetched (`check`/`apply`) when:
+
+    - its path does not end with one of `skip_extensions`
+    - it matches none of `blocked` (wildcard patterns, e.g. BLOCKED_KEYWORDS)
+    - it matches at least one of `include` if given (e.g. URL_FILTERS)
+
+    and saved (`savable`) when it also contains every one of `required`
+    (e.g. KEYWORDS). Required keywords are not checked before the fetch:
+    listing pages without them are how a deep crawl reaches the pages
+    that have them.
+
+    All substring patterns share one Aho-Corasick automaton and any real
+    globs one regex per role, so per-URL cost does not grow with the lists.
+    Matching is case-insensitive.
+    """
+
+    def __init__(
+        self,
+        include=(),
+        blocked=(),
+        required=(),
+        skip_extensions=(),
+        name=None,
+    ):
+        super().__init__(name=name)
+        self.skip_extensions = tuple(e.lower() for e in skip_extensions)
+
+        # substring patterns of every role share one automaton; real globs
+        # (rare: CLI patterns are always `*kw*`) get one regex per role
+        substrings = []
+        self.roles = {"include": set(), "blocked": set(), "required": set()}
+        globs = {"include": [], "blocked": []}
+        for role, patterns in (
+            ("include", include),
+            ("blocked", blocked),
+            ("required", required),
+        ):
+            for p in patterns:
+                p = p.lower()
+                if not p.strip("*"):
+                    continue
+                sub = p if role == "required" else _substring(p)
+                if sub is None:
+                    globs[role].append(p)
+                    continue
+                self.roles[role].add(len(substrings))
+                substrings.append(sub)
+
+        self.automaton = AhoCorasick(substrings) if substrings else None
+        self.glob_re = {
+            role: re.compile("|".join(fnmatch.translate(g) for g in pats))
+            for role, pats in globs.items()
+            if pats
+        }
+
+    def _hit(self, role: str, url: str, hits: set) -> bool:
+        if hits & self.roles[role]:
+            return True
+        rx = self.glob_re.get(role)
+        return bool(rx and rx.match(url))
+
+    def check(self, url: str) -> bool:
+        if self.skip_extensions and urlsplit(url).path.lower().endswith(
+            self.skip_extensions
+        ):
+            return False
+        url = url.lower()
+        hits = self.automaton.find(url) if self.automaton else set()
+        if self._hit("blocked", url, hits):
+            return False
+        if (self.roles["include"] or "include" in self.glob_re) and not self._hit(
+            "include", url, hits
+        ):
+            return False
+        return True
+
+    def savable(self, url: str) -> bool:
+        """`check` plus the required keywords (applied to fetched pages)."""
+        if not self.check(url):
+            return False
+        if not self.roles["required"]:
+            return True
+        hits = self.automaton.find(url.lower())
+        return self.roles["required"] <= hits
+
+    def apply(self, url: str) -> bool:
+        passed = self.check(url)
+        self._update_stats(passed)
+        return passed
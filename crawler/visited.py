@@ -0,0 +1,96 @@
+# visited.py
+# Compact visited-URL set: Bloom filters in memory, exact answers from disk
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings (~1.2 bytes per key at 1% error).
+    Uses double hashing of one 128-bit blake2b digest for the `k` positions.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.m = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key: str) -> bool:
+        """Set `key`'s bits; True if any was unset (the key is certainly new)."""
+        new = False
+        for p in self._positions(key):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class VisitedSet:
+    """
+    Membership test in front of an exact (usually on-disk) store.
+
+    A Bloom miss means "never seen" and costs no I/O; only Bloom hits are
+    confirmed with `exact(key)`, so false positives never drop a URL. When
+    the current filter reaches its capacity a new one, twice as large and
+    with half the error rate, is chained on (scalable Bloom filter), so the
+    error stays bounded without knowing the crawl size up front.
+    """
+
+    def __init__(self, exact=None, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.exact = exact  # callable(key) -> bool; None -> trust the filter
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(capacity, error_rate / 2)]
+        self.lookups = 0
+        self.disk_checks = 0
+        self.false_positives = 0
+
+    def add(self, key: str):
+        if any(key in f for f in self.filters[:-1]):
+            return
+        current = self.filters[-1]
+        if current.full:
+            current = BloomFilter(current.capacity * 2, current.error_rate / 2)
+            self.filters.append(current)
+        current.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        self.lookups += 1
+        if not any(key in f for f in self.filters):
+            return False
+        if self.exact is None:
+            return True
+        self.disk_checks += 1
+        if self.exact(key):
+            return True
+        self.false_positives += 1
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "keys": sum(f.count for f in self.filters),
+            "filters": len(self.filters),
+            "memory_bytes": sum(len(f.bits) for f in self.filters),
+            "lookups": self.lookups,
+            "disk_checks": self.disk_checks,
+            "false_positives": self.false_positives,
+        }
@@ -1,7 +1,9 @@
 # webview_gui/app.py
 import webview
-from flask import Flask, render_template, request, jsonify
-import threading, subprocess, json, uuid, sys, platform, os
+from flask import Flask, Response, render_template, request, jsonify
+import threading, subprocess, json, sys, platform, os
+from collections import deque
+from itertools import islice
 from pathlib import Path
 import time
 
@@ -11,20 +13,128 @@ app.config["TEMPLATES_AUTO_RELOAD"] = True
 
 PROJECT_ROOT   = Path(__file__).resolve().parent.parent
 CRAWLER_ROOT   = PROJECT_ROOT / "crawler"
-CRAWLER_SCRIPT = CRAWLER_ROOT / "crawl_seeded.py"
 SCRAPED_ROOT   = CRAWLER_ROOT / "scraped"
 SEEDS_FILE     = CRAWLER_ROOT / "seeds.txt"
 
-CRAWL = {"running": False, "logs": [], "results": [], "proc": None}
+LOG_BUFFER        = 2000   # log lines kept for (re)connecting clients
+PUSH_MIN_INTERVAL = 0.25   # coalesce chatty log bursts into one event
+PING_INTERVAL     = 15.0   # keep idle event streams open
+RECENT_JOBS       = 10     # jobs shown in the page
+JOBS_MIN_INTERVAL = 1.0    # running jobs' counters change all the time
+
+CRAWL = {"running": False, "started": 0.0}
+LOGS = deque(maxlen=LOG_BUFFER)  # ring buffer; ids keep counting up
+EVENTS = {"cursor": 0, "version": 0}  # last log id; bumped on running/catalogue changes
+CHANGED = threading.Condition()
+COUNTERS = {"mtime": None, "prev": None, "data": {}, "lock": threading.Lock()}
+
+sys.path.insert(0, str(CRAWLER_ROOT))
+from search import SearchIndex, INDEX_ROOT
+from metrics import render_prometheus
+from catalogue import Catalogue
+from config import CATALOGUE_DB
+from crawl_seeded import logger as crawler_logger
+from service import CrawlService
+
+SEARCH = {"index": None, "lock": threading.Lock()}
+CATALOGUE = {"db": None, "lock": threading.Lock()}
+SERVICE = {"svc": None, "lock": threading.Lock()}
 
 def log(msg: str, level: str = "info"):
     colors = {"info": "blue", "error": "red", "success": "green", "debug": "gray"}
-    CRAWL["logs"].append({
-        "id": str(uuid.uuid4()),
-        "msg": str(msg),
-        "level": colors.get(level, "blue"),
-        "time": __import__("time").strftime("%H:%M:%S")
-    })
+    with CHANGED:
+        EVENTS["cursor"] += 1
+        LOGS.append({
+            "id": EVENTS["cursor"],
+            "msg": str(msg),
+            "level": colors.get(level, "blue"),
+            "time": time.strftime("%H:%M:%S")
+        })
+        CHANGED.notify_all()
+
+def set_state(**fields):
+    with CHANGED:
+        CRAWL.update(fields)
+        EVENTS["version"] += 1
+        CHANGED.notify_all()
+
+def logs_after(cursor: int):
+    """(entries with id > cursor, no. of entries already dropped from the buffer)"""
+    with CHANGED:
+        first = LOGS[0]["id"] if LOGS else EVENTS["cursor"] + 1
+        missed = max(0, first - cursor - 1)
+        return list(islice(LOGS, max(0, cursor - first + 1), None)), missed
+
+def counters():
+    """Live numbers from the crawl's metrics.json, re-read only when it changes."""
+    path = CRAWLER_ROOT / "metrics.json"
+    with COUNTERS["lock"]:
+        try:
+            mtime = path.stat().st_mtime
+            if mtime == COUNTERS["mtime"]:
+                return COUNTERS["data"]
+            snap = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return COUNTERS["data"]
+        COUNTERS["mtime"] = mtime
+        if snap.get("started", 0) < CRAWL["started"] - 1:
+            return COUNTERS["data"]  # left over from an earlier crawl
+        prev = COUNTERS["prev"]
+        rate = snap["pages_per_sec"]
+        if prev and prev["started"] == snap["started"]:
+            dt = snap["elapsed_sec"] - prev["elapsed_sec"]
+            if dt > 0:
+                rate = (snap["pages"] - prev["pages"]) / dt  # recent, not run average
+        COUNTERS["prev"] = snap
+        COUNTERS["data"] = {
+            "pages": snap["pages"],
+            "pages_per_sec": round(rate, 2),
+            "queue_depth": snap.get("queue_depth", 0),
+            "bytes_written": snap["bytes_written"],
+            "errors": sum(h["errors"] for h in snap["hosts"].values()),
+        }
+        return COUNTERS["data"]
+
+def _forward_logs(records):
+    """AsyncLogger sink: the in-process crawler's log lines go to the page."""
+    levels = {"ERROR": "error", "WARNING": "error", "DEBUG": "debug"}
+    for _, level, msg, _ in records:
+        log(msg, levels.get(level, "info"))
+
+def _job_event(event: str, job: dict):
+    head = f"[job {job['id']}]"
+    if event == "started":
+        log(f"=== JOB {job['id']} STARTED ({job['seeds_total']} seeds) ===", "success")
+    elif event == "seed":
+        log(f"{head} {job['seeds_done']}/{job['seeds_total']} seeds, "
+            f"{job['written']} pages written", "info")
+    elif event == "done":
+        log(f"{head} finished: {job['written']} pages in {job['elapsed_sec']:.0f}s", "success")
+    else:
+        log(f"{head} {event}{': ' + job['error'] if job['error'] else ''}", "error")
+    set_state(running=SERVICE["svc"].active_jobs() > 0)
+
+def _service() -> CrawlService:
+    """The in-process crawl service; browsers are launched on first use."""
+    with SERVICE["lock"]:
+        if SERVICE["svc"] is None:
+            os.chdir(CRAWLER_ROOT)  # the crawler's stores and metrics.json are relative
+            svc = CrawlService()
+            svc.listeners.append(_job_event)
+            crawler_logger.add_sink(_forward_logs)
+            log("Starting crawl service (launching browsers) …", "info")
+            svc.start()
+            SERVICE["svc"] = svc
+            set_state(started=svc.resources.metrics.started)
+        return SERVICE["svc"]
+
+def recent_jobs() -> list:
+    svc = SERVICE["svc"]
+    return svc.list_jobs()[:RECENT_JOBS] if svc is not None else []
+
+def _sse(event: str, data, id=None) -> str:
+    head = f"id: {id}\n" if id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # ----------------------------------------------------------------------
 # Routes
@@ -35,126 +145,206 @@ def index():
 
 @app.route("/start", methods=["POST"])
 def start():
-    if CRAWL["running"]:
-        return jsonify({"error": "A crawl is already running"}), 400
-
-    data = request.json
-    cmd = [sys.executable, str(CRAWLER_SCRIPT)]
-
+    # Empty form fields mean "use the default"
+    data = {k: v for k, v in (request.json or {}).items() if v not in (None, "")}
     if data.get("url"):
-        cmd += ["--url", data["url"].strip()]
+        spec = {**data, "url": data["url"].strip()}
+        spec.pop("seedfile", None)
     elif data.get("seedfile"):
-        seed_path = data["seedfile"].strip() or str(SEEDS_FILE)
-        cmd += ["--seedfile", seed_path]
+        spec = {**data, "seedfile": data["seedfile"].strip() or str(SEEDS_FILE)}
     else:
         return jsonify({"error": "Provide URL or seed file"}), 400
 
-    if data.get("prioritize"): 
-        cmd += ["--prioritize", data["prioritize"].strip()]
-    if data.get("depth") is not None: 
-        cmd += ["--depth", str(int(data["depth"]))]
-    if data.get("maxpages") is not None: 
-        cmd += ["--maxpages", str(int(data["maxpages"]))]
-    if data.get("blocked"):
-        blocked = [b.strip() for b in data["blocked"].split() if b.strip()]
-        if blocked: cmd += ["--blocked"] + blocked
-    if data.get("urlpattern"):
-        pat = data["urlpattern"].strip()
-        if pat: 
-            cmd += ["--urlpattern", pat]
-    if data.get("blockedpattern"):
-        pat = data["blockedpattern"].strip()
-        if pat:
-            cmd += ["--blockedpattern", pat]
-
-    CRAWL["running"] = True
-    CRAWL["logs"] = []
-    log("=== NEW CRAWL STARTED ===", "success")
-    log(f"Target: {data.get('url') or data.get('seedfile') or 'unknown'}", "info")
-    CRAWL["results"] = []
-    log("Crawler started …", "success")
-
-    def _run():
-        try:
-            print("Command: ", cmd)
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                cwd=CRAWLER_ROOT
-            )
-            CRAWL["proc"] = proc
-            for line in proc.stdout:
-                line = line.rstrip()
-                if not line: continue
-                if "[ERROR]" in line: log(line, "error")
-                elif "Done" in line or "wrote" in line: log(line, "success")
-                else: log(line, "info")
-            proc.wait()
-            if proc.returncode == 0:
-                log("Crawl finished", "success")
-                _load_results()
-            else:
-                log(f"Exited with code {proc.returncode}", "error")
-        except Exception as e:
-            log(f"Exception: {e}", "error")
-        finally:
-            CRAWL["running"] = False
-            CRAWL["proc"] = None
-
-    threading.Thread(target=_run, daemon=True).start()
-    return jsonify({"status": "started"})
+    try:
+        job = _service().submit(spec)
+    except ValueError as e:
+        log(f"Job rejected: {e}", "error")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log(f"Crawl service unavailable: {e}", "error")
+        return jsonify({"error": str(e)}), 500
+    log(f"Target: {spec.get('url') or spec.get('seedfile')}", "info")
+    set_state(running=True)
+    return jsonify({"status": "started", "job": job})
 
 @app.route("/stop", methods=["POST"])
 def stop():
-    if CRAWL["proc"]:
-        CRAWL["proc"].terminate()
-        log("Crawler stopped by user", "error")
-        CRAWL["running"] = False
-    return jsonify({"status": "stopped"})
+    # One job ({"job": id}) or all of them
+    svc = SERVICE["svc"]
+    if svc is None:
+        return jsonify({"status": "stopped", "jobs": []})
+    job_id = (request.get_json(silent=True) or {}).get("job")
+    ids = [job_id] if job_id else [j["id"] for j in svc.list_jobs()]
+    cancelled = [j for j in map(svc.cancel, ids) if j and j["status"] in ("queued", "running")]
+    if cancelled:
+        log(f"Stopping {len(cancelled)} job(s) …", "error")
+    return jsonify({"status": "stopped", "jobs": [j["id"] for j in cancelled]})
+
+@app.route("/jobs")
+def jobs():
+    svc = SERVICE["svc"]
+    return jsonify({
+        "jobs": svc.list_jobs() if svc is not None else [],
+        "service": svc.status() if svc is not None else {"running": False},
+    })
+
+@app.route("/jobs/<job_id>")
+def job(job_id):
+    svc = SERVICE["svc"]
+    found = svc.job(job_id) if svc is not None else None
+    if found is None:
+        return jsonify({"error": "No such job"}), 404
+    return jsonify(found)
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    svc = SERVICE["svc"]
+    found = svc.cancel(job_id) if svc is not None else None
+    if found is None:
+        return jsonify({"error": "No such job"}), 404
+    return jsonify(found)
 
 @app.route("/status")
 def status():
+    # One-shot snapshot for scripts; the page itself listens on /events
+    logs, missed = logs_after(request.args.get("cursor", 0, type=int))
     return jsonify({
         "running": CRAWL["running"],
-        "logs": CRAWL["logs"][-200:],
-        "results": CRAWL["results"]
+        "jobs": recent_jobs(),
+        "logs": logs,
+        "missed": missed,
+        "cursor": logs[-1]["id"] if logs else EVENTS["cursor"],
+        "counters": counters(),
     })
 
+@app.route("/events")
+def events():
+    """
+    Server-Sent Events: `logs` (entries after the client's cursor; the
+    event id is the new cursor, so EventSource resumes after a reconnect),
+    `state` (running flag; the page then re-reads /catalogue), `counters`
+    (pages, pages/sec, queue depth, ... whenever metrics.json changes) and
+    `jobs` (progress of the recent service jobs, at most every second).
+    """
+    cursor = request.args.get("cursor", type=int)
+    if cursor is None:
+        cursor = request.headers.get("Last-Event-ID", 0, type=int)
 
-def _load_results():
-    results = []
-    for dir_path in SCRAPED_ROOT.iterdir():
-        if not dir_path.is_dir():
-            continue
-        jsonl = dir_path / "index.jsonl"
-        if not jsonl.exists():
-            continue
-
-        seed_url = None
-        with jsonl.open(encoding="utf-8") as f:
-            first = f.readline()
-            if first:
-                try:
-                    seed_url = json.loads(first).get("url")
-                except:
-                    pass
-
-        if not seed_url:
-            seed_url = f"http://{dir_path.name.replace('_single', '')}"
-
-        # STORE **ABSOLUTE PATH** as string
-        abs_path = str(dir_path.resolve())
-
-        results.append({
-            "seed": seed_url,
-            "directory": str(dir_path.relative_to(PROJECT_ROOT)),  # for display
-            "abs_path": abs_path  # for opening
-        })
+    def stream(cursor):
+        version, sent_counters, sent_jobs = None, None, None
+        last_sent = last_jobs = time.monotonic()
+        while True:
+            with CHANGED:
+                if EVENTS["cursor"] == cursor and EVENTS["version"] == version:
+                    CHANGED.wait(timeout=1.0)  # wakes on log()/set_state(); 1s for counters
+            out = []
+            logs, missed = logs_after(cursor)
+            if logs or missed:
+                cursor = logs[-1]["id"] if logs else cursor + missed
+                out.append(_sse("logs", {"logs": logs, "missed": missed}, id=cursor))
+            if EVENTS["version"] != version:
+                version = EVENTS["version"]
+                out.append(_sse("state", {"running": CRAWL["running"]}))
+            current = counters()
+            if current != sent_counters:
+                sent_counters = current
+                out.append(_sse("counters", current))
+            if time.monotonic() - last_jobs >= JOBS_MIN_INTERVAL or sent_jobs is None:
+                current = recent_jobs()
+                if current != sent_jobs:
+                    sent_jobs, last_jobs = current, time.monotonic()
+                    out.append(_sse("jobs", {"jobs": current}))
+            if not out and time.monotonic() - last_sent >= PING_INTERVAL:
+                out.append(": ping\n\n")
+            if out:
+                last_sent = time.monotonic()
+                yield "".join(out)
+            time.sleep(PUSH_MIN_INTERVAL)
+
+    return Response(
+        stream(cursor),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/search")
+def search():
+    q = request.args.get("q", "").strip()
+    k = request.args.get("k", 20, type=int)
+    if not q:
+        return jsonify({"results": [], "ms": 0})
+    t0 = time.perf_counter()
+    with SEARCH["lock"]:
+        if SEARCH["index"] is None:
+            SEARCH["index"] = SearchIndex(INDEX_ROOT)
+        else:
+            SEARCH["index"].refresh()  # pick up segments flushed mid-crawl
+        results = SEARCH["index"].search(
+            q, k=k, require_all=request.args.get("all") == "1"
+        )
+    return jsonify({
+        "results": results,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+    })
+
+
+def _catalogue():
+    # Catalogue serialises its own connection; the lock only guards creation
+    with CATALOGUE["lock"]:
+        if CATALOGUE["db"] is None:
+            CATALOGUE["db"] = Catalogue(CRAWLER_ROOT / CATALOGUE_DB)
+        return CATALOGUE["db"]
+
+@app.route("/catalogue/seeds")
+def catalogue_seeds():
+    # Latest result per output directory unless ?all=1 or ?run=ID
+    args = request.args
+    run_id = args.get("run", type=int)
+    result = _catalogue().seeds(
+        page=args.get("page", 1, type=int),
+        per_page=args.get("per_page", 20, type=int),
+        q=args.get("q", "").strip() or None,
+        domain=args.get("domain") or None,
+        status=args.get("status") or None,
+        run_id=run_id,
+        latest=run_id is None and args.get("all") != "1",
+    )
+    for item in result["items"]:
+        try:
+            item["directory"] = str(Path(item["out_dir"]).relative_to(PROJECT_ROOT))
+        except ValueError:
+            item["directory"] = item["out_dir"]
+    return jsonify(result)
+
+@app.route("/catalogue/runs")
+def catalogue_runs():
+    return jsonify(_catalogue().runs(
+        page=request.args.get("page", 1, type=int),
+        per_page=request.args.get("per_page", 20, type=int),
+        status=request.args.get("status") or None,
+    ))
+
+@app.route("/catalogue/runs/<int:run_id>")
+def catalogue_run(run_id):
+    run = _catalogue().run(run_id)
+    if run is None:
+        return jsonify({"error": "No such run"}), 404
+    return jsonify(run)
+
+
+@app.route("/metrics")
+def metrics():
+    # Written by the running crawl (merged across --workers)
+    path = CRAWLER_ROOT / "metrics.json"
+    try:
+        snap = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        snap = {}
+    return app.response_class(
+        render_prometheus(snap), mimetype="text/plain; version=0.0.4"
+    )
 
-    CRAWL["results"] = results
 
 # ----------------------------------------------------------------------
 # PYWEBVIEW API CLASS
@@ -185,6 +375,7 @@ def _flask():
 # ----------------------------------------------------------------------
 if __name__ == "__main__":
     threading.Thread(target=_flask, daemon=True).start()
+    threading.Thread(target=_service, daemon=True).start()  # warm browsers before the first job
 
     time.sleep(1) # Give flask time to start
     # Create window and attach API